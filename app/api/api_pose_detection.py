@@ -10,25 +10,48 @@ Author: MEMOTION Team
 Version: 3.0.0 (Simplified Real-time Only)
 """
 
+import asyncio
 import logging
+import os
+import shutil
 import time
 import json
-from typing import Any
+import uuid
+from typing import Any, Dict, Optional
 
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, File, Form, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
+from app.core.config import settings
 from app.helpers.exception_handler import CustomException
 from app.schemas.sche_base import DataResponse
 from app.schemas.sche_pose import (
     StartSessionRequest, StartSessionResponse,
-    ProcessFrameRequest, ProcessFrameResponse,
-    SessionResultsResponse, PoseHealthResponse
+    ProcessFrameResponse,
+    SessionResultsResponse, PoseHealthResponse,
+    AnalysisJobResponse, AnalysisJobStatusResponse
 )
-from app.services.srv_pose import pose_detection_service
+from app.helpers.serializers import FastJSONResponse, get_frame_serializer, loads_json
+from app.helpers.pose_protocol import (
+    FRAME_HEADER_SIZE, DeltaEncoder, parse_frame_header, parse_detector_heads,
+    parse_landmark_message
+)
+from app.services.srv_pose import (
+    pose_detection_service, decode_frame_data_timed, decode_frame_bytes_timed, FrameBuffer
+)
+from app.services.pose_executor import pose_inference_executor
+from app.services.pose_shard_host import pose_shard_host
+from app.services.pose_admission import pose_admission_controller
+from app.services.pose_checkpoint_store import pose_checkpoint_store
+from app.services.pose_metrics import pose_stage_metrics
+from app.services.pose_session_registry import pose_session_registry
+from app.services.srv_pose_analysis import pose_analysis_service, ANALYSIS_VIDEO_EXTENSIONS
+from app.services.ws_manager import FrameMailbox
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(default_response_class=FastJSONResponse)
 
 
 # ==================== HEALTH CHECK ====================
@@ -49,23 +72,60 @@ def health_check() -> Any:
 
 
 @router.get("/ws-stats")
-def get_websocket_stats() -> Any:
+async def get_websocket_stats() -> Any:
     """
     Get WebSocket connection statistics.
     
     Returns real-time WebSocket connection stats including total connections
-    and connections per session.
+    and connections per session, plus inference executor queue stats.
     """
     from app.services.ws_manager import ws_connection_manager
     
     try:
         ws_stats = ws_connection_manager.get_stats()
+        ws_stats["executor"] = pose_inference_executor.get_stats()
+        ws_stats["shards"] = pose_shard_host.get_stats()
+        ws_stats["checkpoints"] = pose_checkpoint_store.get_stats()
+        ws_stats["registry"] = pose_session_registry.get_stats()
+        ws_stats["sessions"] = pose_detection_service.get_reaper_stats()
+        ws_stats["admission"] = pose_admission_controller.get_stats()
+        ws_stats["stages"] = pose_stage_metrics.get_summary()
         return DataResponse().success_response(data=ws_stats)
     except Exception as e:
         logger.error(f"get_websocket_stats error: {str(e)}", exc_info=True)
         raise CustomException(http_code=500, code='500', message=str(e))
 
 
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> Any:
+    """
+    Prometheus metrics (text format 0.0.4).
+    
+    Per-stage, per-phase frame latency histograms (``pose_stage_latency_ms``)
+    plus WebSocket and session gauges. Metrics are per worker process.
+    Async so the histograms are read on the event loop that writes them.
+    """
+    from app.services.ws_manager import ws_connection_manager
+    
+    ws_stats = ws_connection_manager.get_stats()
+    executor_stats = pose_inference_executor.get_stats()
+    session_stats = pose_detection_service.get_reaper_stats()
+    gauges = [
+        ("pose_ws_connections", "Open pose WebSocket connections", ws_stats["total_connections"]),
+        ("pose_ws_sessions_connected", "Sessions with at least one WebSocket", ws_stats["sessions_with_connections"]),
+        ("pose_live_sessions", "Sessions with an engine in memory", session_stats["live_sessions"]),
+        ("pose_executor_pending", "Frames queued or running on the inference executor", executor_stats["pending"]),
+    ]
+    counters = [
+        ("pose_ws_dropped_frames_total", "Frames dropped by WebSocket frame mailboxes",
+         ws_stats["dropped_frames_total"]),
+    ]
+    return PlainTextResponse(
+        pose_stage_metrics.render_prometheus(gauges, counters),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 # ==================== SESSION MANAGEMENT ====================
 
 @router.post("/sessions", response_model=DataResponse[StartSessionResponse])
@@ -115,6 +175,86 @@ def end_session(session_id: str) -> Any:
         raise CustomException(http_code=500, code='500', message=str(e))
 
 
+# ==================== OFFLINE VIDEO ANALYSIS ====================
+
+@router.post("/analyses", response_model=DataResponse[AnalysisJobResponse])
+def start_analysis(
+    file: UploadFile = File(...),
+    default_joint: str = Form("left_shoulder")
+) -> Any:
+    """
+    Upload a recorded exercise video for offline analysis.
+    
+    The whole video is run through MemotionEngine at full decode/inference
+    speed on a background job. Follow progress with the SSE ``events_url``
+    (or poll ``status_url``); the last event carries the final report.
+    
+    Jobs are kept by the worker that accepted the upload: with several
+    workers, status and events requests must be routed to the same one.
+    """
+    extension = (file.filename or "").rsplit('.', 1)[-1].lower()
+    if extension not in ANALYSIS_VIDEO_EXTENSIONS:
+        raise CustomException(
+            http_code=400, code='400',
+            message=f"Unsupported video type. Allowed: {', '.join(sorted(ANALYSIS_VIDEO_EXTENSIONS))}"
+        )
+    
+    # Reject before writing the upload when the job queue is already full
+    pose_analysis_service.check_capacity()
+    
+    video_path = None
+    try:
+        upload_path = os.path.join(settings.UPLOAD_DIR, "pose_analysis")
+        os.makedirs(upload_path, exist_ok=True)
+        video_path = os.path.join(upload_path, f"{uuid.uuid4().hex}.{extension}")
+        with open(video_path, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer)
+        
+        job = pose_analysis_service.submit(video_path, default_joint=default_joint)
+    except Exception as e:
+        # Not queued (e.g. capacity filled up meanwhile): nothing else will delete it
+        if video_path is not None:
+            try:
+                os.remove(video_path)
+            except OSError:
+                pass
+        if isinstance(e, CustomException):
+            raise
+        logger.error(f"start_analysis error: {str(e)}", exc_info=True)
+        raise CustomException(http_code=500, code='500', message=str(e))
+    
+    response = AnalysisJobResponse(
+        job_id=job.job_id,
+        status=job.status,
+        status_url=f"/api/pose/analyses/{job.job_id}",
+        events_url=f"/api/pose/analyses/{job.job_id}/events"
+    )
+    return DataResponse().success_response(data=response)
+
+
+@router.get("/analyses/{job_id}", response_model=DataResponse[AnalysisJobStatusResponse])
+def get_analysis(job_id: str) -> Any:
+    """Current progress of an analysis job (final report once completed)."""
+    job = pose_analysis_service.get_job(job_id)
+    return DataResponse().success_response(data=AnalysisJobStatusResponse(**job.to_dict()))
+
+
+@router.get("/analyses/{job_id}/events")
+def stream_analysis_events(job_id: str) -> Any:
+    """
+    Server-Sent Events stream for an analysis job.
+    
+    Events: ``progress`` (job status, frames processed, phase), then one
+    ``result`` (status + final report) or ``error`` event before the stream ends.
+    """
+    pose_analysis_service.get_job(job_id)  # 404 before the stream starts
+    return StreamingResponse(
+        pose_analysis_service.stream_events(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # ==================== WEBSOCKET REAL-TIME STREAMING ====================
 
 @router.websocket("/sessions/{session_id}/ws")
@@ -129,23 +269,59 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
     4. DELETE /sessions/{id} → get final results
     
     **Protocol**:
-    - Client sends: {"frame_data": "<base64>", "timestamp_ms": 1234}
-    - Server sends: {"phase": 1, "phase_name": "detection", "data": {...}, "fps": 30}
+    - Client sends (text): {"frame_data": "<base64>", "timestamp_ms": 1234, "seq": 1}
+    - Client sends (binary): 14-byte header (version, codec, seq, timestamp_ms)
+      followed by raw JPEG/WebP/PNG bytes, see app.helpers.pose_protocol
+    - Sessions started with input_mode="landmarks" send on-device pose
+      landmarks instead: {"landmarks": [[x, y, z, vis], ...], "timestamp_ms": 1234}
+      (no decode, no MediaPipe on the server)
+    - Server sends: {"phase": 1, "phase_name": "detection", "data": {...}, "seq": 1, "fps": 30}
     
     **Performance**:
     - Latency: ~10-30ms per frame
     - Recommended: 30fps
+    - Decode/inference run on the inference executor; when its queue is
+      full the server replies {"error": ..., "code": "503"} for that frame
+    - Backpressure: frames go through a single-slot mailbox. With the default
+      policy (POSE_FRAME_POLICY=drop_oldest) a newer frame replaces one that
+      is still waiting and ``dropped_frames`` is reported next to ``fps``;
+      ``?policy=block`` stops reading the socket until the slot is free.
+    - Encoding (``?encoding=``): json (default), orjson, or msgpack (responses
+      sent as binary messages); an encoding the server cannot produce is
+      rejected with close code 4015 instead of being replaced
+    - Delta mode (``?delta=1``): only fields that changed are sent, with
+      "type": "keyframe" | "delta"; ``?delta=ack`` diffs against the last
+      state the client acknowledged with {"ack": <frame_number>}
+    - Detector heads follow the phase (face landmarker only in Phase 3, at
+      POSE_FACE_ANALYSIS_HZ); override per connection with ``?heads=pose`` or
+      per message with {"heads": {"face": false}}
+    - Stage timings (``?timings=1``): each response carries "timings" with
+      the decode / inference / phase-logic milliseconds of that frame
     """
     from app.services.ws_manager import ws_connection_manager
     
     logger.info(f"websocket_endpoint: Connection request for session_id={session_id}")
     
-    # Validate session before accepting
+    # Validate session before accepting (may restore it from a checkpoint, off the event loop)
     try:
-        session = pose_detection_service.get_session(session_id)
+        session = await run_in_threadpool(pose_detection_service.get_session, session_id)
     except CustomException as e:
-        logger.warning(f"websocket_endpoint: Session not found: {session_id}")
-        await websocket.close(code=4004, reason=str(e.message))
+        # 409: session still streaming on another worker (multi-worker registry)
+        close_code = 4009 if e.http_code == 409 else 4004
+        logger.warning(f"websocket_endpoint: Session unavailable ({e.http_code}): {session_id}")
+        await websocket.close(code=close_code, reason=str(e.message))
+        return
+    
+    # Response encoding: ?encoding=json | orjson | msgpack (binary messages).
+    # A requested encoding is never substituted; only the server default falls back.
+    requested_encoding = websocket.query_params.get("encoding")
+    try:
+        serializer = get_frame_serializer(
+            requested_encoding or settings.POSE_WS_ENCODING, fallback=not requested_encoding
+        )
+    except ValueError as e:
+        logger.warning(f"websocket_endpoint: Rejected {session_id}: {e}")
+        await websocket.close(code=4015, reason=str(e))
         return
     
     # Register connection
@@ -161,38 +337,148 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
     
     logger.info(f"websocket_endpoint: Connected session_id={session_id}")
     
+    landmarks_mode = session.input_mode == "landmarks"
+    
+    # Decode straight to RGB; reuse one destination buffer per connection
+    # (not across a process pool, where results are pickled anyway)
+    frame_rgb = session.frame_rgb
+    frame_buffer = FrameBuffer() if pose_inference_executor.mode == "thread" else None
+    
+    # Latest-frame-wins mailbox between receive loop and processing loop
+    mailbox = FrameMailbox(policy=websocket.query_params.get("policy") or settings.POSE_FRAME_POLICY)
+    
+    # Connection-wide detector head override (?heads=pose), per-message "heads" wins
+    try:
+        connection_heads = parse_detector_heads(websocket.query_params.get("heads"))
+    except ValueError as e:
+        logger.warning(f"websocket_endpoint: Ignoring heads param for {session_id}: {e}")
+        connection_heads = None
+    
+    # Opt-in delta responses: ?delta=1 (diff vs last sent) | ?delta=ack (diff vs last acked)
+    delta_param = (websocket.query_params.get("delta") or "").lower()
+    delta_encoder = None
+    if delta_param in ("1", "true", "ack"):
+        delta_encoder = DeltaEncoder(
+            keyframe_interval=settings.POSE_DELTA_KEYFRAME_INTERVAL,
+            require_ack=delta_param == "ack"
+        )
+    
+    connection.serializer = serializer
+    send_lock = asyncio.Lock()
+    
+    # Opt-in per-frame stage timings in responses (?timings=1)
+    send_timings = (websocket.query_params.get("timings") or "").lower() in ("1", "true")
+    
     # Frame processing metrics
     frame_count = 0
     start_time = time.time()
     last_fps_calc = start_time
     current_fps = 0.0
     
-    try:
+    async def send(payload: dict, timings: Optional[Dict[str, float]] = None) -> None:
+        started = time.perf_counter()
+        data = serializer.dumps(payload)
+        serialized = time.perf_counter()
+        async with send_lock:
+            if serializer.binary:
+                await websocket.send_bytes(data)
+            else:
+                await websocket.send_text(data)
+        if timings is not None:
+            timings["serialize"] = (serialized - started) * 1000.0
+            timings["send"] = (time.perf_counter() - serialized) * 1000.0
+    
+    async def receive_frames() -> None:
+        """Read frames from the socket into the mailbox (never blocks on inference)."""
         while True:
-            # Receive frame data
-            try:
-                data = await websocket.receive_json()
-            except json.JSONDecodeError:
-                await websocket.send_json({"error": "Invalid JSON format", "code": "400"})
-                continue
+            # Receive frame data (text = JSON/base64, bytes = binary frame protocol)
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
             
-            # Validate required fields
-            if 'frame_data' not in data:
-                await websocket.send_json({"error": "Missing field: frame_data", "code": "400"})
-                continue
-            
-            # Get timestamp
-            timestamp_ms = data.get('timestamp_ms', int(time.time() * 1000))
+            frame_bytes = message.get("bytes")
+            if frame_bytes is not None:
+                if landmarks_mode:
+                    await send({"error": "Session expects landmarks, not image frames", "code": "400"})
+                    continue
+                try:
+                    header = parse_frame_header(frame_bytes)
+                except ValueError as e:
+                    await send({"error": str(e), "code": "400"})
+                    continue
+                
+                seq = header.seq
+                timestamp_ms = header.timestamp_ms or int(time.time() * 1000)
+                heads = connection_heads
+                decode_fn = decode_frame_bytes_timed
+                decode_args = (frame_bytes, FRAME_HEADER_SIZE, frame_rgb, frame_buffer)
+                process_fn = pose_detection_service.process_frame_wire
+            else:
+                try:
+                    data = loads_json(message.get("text") or "")
+                except json.JSONDecodeError:
+                    await send({"error": "Invalid JSON format", "code": "400"})
+                    continue
+                
+                # Delta mode acknowledgement: {"ack": <frame_number>}
+                if isinstance(data, dict) and 'ack' in data and 'frame_data' not in data:
+                    if delta_encoder is not None and isinstance(data['ack'], int):
+                        delta_encoder.ack(data['ack'])
+                    continue
+                
+                # Validate required fields
+                required = 'landmarks' if landmarks_mode else 'frame_data'
+                if not isinstance(data, dict) or required not in data:
+                    await send({"error": f"Missing field: {required}", "code": "400"})
+                    continue
+                
+                try:
+                    heads = parse_detector_heads(data.get('heads')) or connection_heads
+                except ValueError as e:
+                    await send({"error": str(e), "code": "400"})
+                    continue
+                
+                seq = data.get('seq')
+                timestamp_ms = data.get('timestamp_ms', int(time.time() * 1000))
+                if landmarks_mode:
+                    # Already decoded on the device: validate here, nothing to decode later
+                    try:
+                        decode_fn, decode_args = None, (parse_landmark_message(data),)
+                    except ValueError as e:
+                        await send({"error": str(e), "code": "400"})
+                        continue
+                    process_fn = pose_detection_service.process_landmarks_wire
+                else:
+                    decode_fn = decode_frame_data_timed
+                    decode_args = (data['frame_data'], frame_rgb, frame_buffer)
+                    process_fn = pose_detection_service.process_frame_wire
             
-            # Create request and process
-            request = ProcessFrameRequest(
-                session_id=session_id,
-                frame_data=data['frame_data'],
-                timestamp_ms=timestamp_ms
-            )
+            # Stale frame (if any) is replaced here, before it is ever decoded
+            await mailbox.put((seq, timestamp_ms, heads, decode_fn, decode_args, process_fn))
+            connection.set_dropped(mailbox.dropped)
+    
+    async def process_frames() -> None:
+        """Process the newest frame from the mailbox and send the result."""
+        nonlocal frame_count, last_fps_calc, current_fps
+        
+        while True:
+            seq, timestamp_ms, heads, decode_fn, decode_args, process_fn = await mailbox.get()
             
             try:
-                response = pose_detection_service.process_frame(request)
+                # Decode + inference run on the inference executor, never on the event loop
+                async with pose_inference_executor.session_slot(session_id):
+                    if decode_fn is None:
+                        frame, timings = decode_args[0], {}
+                    else:
+                        try:
+                            frame, timings = await pose_inference_executor.run_stateless(decode_fn, *decode_args)
+                        except Exception as e:
+                            raise CustomException(http_code=400, code='400', message=f"Invalid frame data: {str(e)}")
+                    
+                    # Wire-ready dict straight from the engine (no Pydantic on this path)
+                    message = await pose_inference_executor.run_stateful(
+                        process_fn, session_id, frame, timestamp_ms, heads
+                    )
                 frame_count += 1
                 
                 # Calculate FPS every second
@@ -201,34 +487,51 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                     current_fps = frame_count / (current_time - start_time)
                     last_fps_calc = current_time
                 
-                # Send response
-                await websocket.send_json({
-                    "phase": response.phase,
-                    "phase_name": response.phase_name,
-                    "data": response.data,
-                    "message": response.message,
-                    "warning": response.warning,
-                    "timestamp": response.timestamp,
-                    "frame_number": frame_count,
-                    "fps": round(current_fps, 1)
-                })
+                # Send response (full state, or only what changed in delta mode)
+                phase_name = message["phase_name"]
+                phase = message["phase"]
+                timings.update(message.pop("timings", None) or {})
+                if delta_encoder is not None:
+                    timestamp = message.pop("timestamp")
+                    is_keyframe, state = delta_encoder.encode(frame_count, message)
+                    message = {**state, "timestamp": timestamp,
+                               "type": "keyframe" if is_keyframe else "delta"}
+                message["frame_number"] = frame_count
+                message["seq"] = seq
+                message["fps"] = round(current_fps, 1)
+                message["dropped_frames"] = mailbox.dropped
+                if send_timings:
+                    message["timings"] = {stage: round(ms, 3) for stage, ms in timings.items()}
+                await send(message, timings)
+                pose_stage_metrics.observe_frame(phase, timings)
                 
                 # Check if session completed
-                if response.phase_name == "completed":
+                if phase_name == "completed":
                     logger.info(f"websocket_endpoint: Session completed: {session_id}")
-                    await websocket.send_json({
+                    await send({
                         "event": "session_completed",
                         "message": "Call DELETE /sessions/{id} for final results."
                     })
                     
             except CustomException as e:
-                await websocket.send_json({"error": e.message, "code": e.code})
+                await send({"error": e.message, "code": e.code})
+            except WebSocketDisconnect:
+                raise
             except Exception as e:
                 logger.error(f"websocket_endpoint: Processing error: {e}", exc_info=True)
-                await websocket.send_json({"error": f"Processing failed: {str(e)}", "code": "500"})
+                await send({"error": f"Processing failed: {str(e)}", "code": "500"})
+    
+    tasks = [asyncio.ensure_future(receive_frames()), asyncio.ensure_future(process_frames())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
                 
     except WebSocketDisconnect:
-        logger.info(f"websocket_endpoint: Disconnected session_id={session_id}, frames={frame_count}")
+        logger.info(
+            f"websocket_endpoint: Disconnected session_id={session_id}, "
+            f"frames={frame_count}, dropped={mailbox.dropped}"
+        )
     except Exception as e:
         logger.error(f"websocket_endpoint error: {str(e)}", exc_info=True)
         try:
@@ -236,5 +539,21 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
         except:
             pass
     finally:
+        for task in tasks:
+            task.cancel()
+        # A frame already on a pool thread cannot be cancelled: wait until it has
+        # finished (its task keeps the session lane until then)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Latest state for a reconnect (possibly on another worker), never
+        # concurrently with a frame of another connection to this session.
+        # Last connection gone: its detector goes back to the pool until the next frame.
+        try:
+            async with pose_inference_executor.session_exclusive(session_id):
+                await pose_inference_executor.run_stateful(pose_detection_service.checkpoint_session, session_id)
+                if ws_connection_manager.get_session_count(session_id) <= 1:
+                    await pose_inference_executor.run_stateful(pose_detection_service.release_detector, session_id)
+        except Exception as e:
+            logger.warning(f"websocket_endpoint: Checkpoint on disconnect failed for {session_id}: {e}")
         await ws_connection_manager.disconnect(websocket, session_id)
+        pose_inference_executor.release_session(session_id)
         logger.info(f"websocket_endpoint: Cleanup completed: session_id={session_id}")
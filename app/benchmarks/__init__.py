@@ -0,0 +1 @@
+"""Micro-benchmarks for the pose detection hot path (run as python -m app.benchmarks.<name>)."""
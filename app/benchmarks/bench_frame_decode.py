@@ -0,0 +1,93 @@
+"""
+Frame ingestion: encoded JPEG -> RGB pixels handed to MediaPipe.
+
+before: cv2.imdecode (BGR) -> cv2.cvtColor BGR->RGB in VisionDetector
+        (two full-frame allocations per frame)
+after:  decode straight to RGB (cv2.IMREAD_COLOR_RGB when this OpenCV has
+        it, else imdecode + cvtColor into a reused per-connection buffer)
+
+Reports time per frame, bytes allocated per frame (tracemalloc sees the
+numpy-backed arrays OpenCV returns) and the same expressed in full frames.
+
+Usage:
+    python -m app.benchmarks.bench_frame_decode --iterations 500 --width 1280 --height 720
+"""
+
+import argparse
+import timeit
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from app.services.srv_pose import FrameBuffer, _IMREAD_COLOR_RGB, decode_frame_bytes
+
+
+def build_jpeg(width: int, height: int) -> bytes:
+    """Smooth gradient + noise, compresses like a camera frame."""
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    image = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    image += rng.normal(0, 8, size=image.shape)
+    image = np.clip(image, 0, 255).astype(np.uint8)
+    return cv2.imencode(".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), 80])[1].tobytes()
+
+
+def before(payload: bytes, buffer: FrameBuffer) -> np.ndarray:
+    """Previous path: BGR decode, detector converts to a new RGB array."""
+    bgr = decode_frame_bytes(payload)
+    return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+
+
+def after(payload: bytes, buffer: FrameBuffer) -> np.ndarray:
+    """Current path: RGB decode (no conversion in the detector)."""
+    return decode_frame_bytes(payload, 0, True, buffer)
+
+
+def allocated_bytes(fn, payload: bytes, buffer: FrameBuffer, rounds: int = 50) -> float:
+    """Average bytes allocated while producing one RGB frame."""
+    fn(payload, buffer)  # first call allocates the reusable buffer
+    tracemalloc.start()
+    total = 0
+    try:
+        for _ in range(rounds):
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            frame = fn(payload, buffer)
+            _, peak = tracemalloc.get_traced_memory()
+            total += peak - base
+            del frame
+    finally:
+        tracemalloc.stop()
+    return total / rounds
+
+
+def run(iterations: int, width: int, height: int) -> None:
+    payload = build_jpeg(width, height)
+    frame_bytes = width * height * 3
+    print(f"{width}x{height} JPEG {len(payload)} B, IMREAD_COLOR_RGB "
+          f"{'available' if _IMREAD_COLOR_RGB is not None else 'unavailable (cvtColor into buffer)'}")
+    # Native RGB decode may round the colour conversion differently by 1
+    diff = before(payload, FrameBuffer()).astype(np.int16) - after(payload, FrameBuffer())
+    assert np.abs(diff).max() <= 1
+
+    print(f"{'path':<10}{'ms/frame':>10}{'bytes/frame':>14}{'frames/frame':>14}")
+    for name, fn in (("before", before), ("after", after)):
+        buffer = FrameBuffer()
+        seconds = timeit.timeit(lambda: fn(payload, buffer), number=iterations)
+        allocated = allocated_bytes(fn, payload, buffer)
+        print(f"{name:<10}{seconds / iterations * 1e3:>10.3f}{allocated:>14.0f}{allocated / frame_bytes:>14.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    args = parser.parse_args()
+    run(args.iterations, args.width, args.height)
+
+
+if __name__ == "__main__":
+    main()
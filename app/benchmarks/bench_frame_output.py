@@ -0,0 +1,152 @@
+"""
+Per-frame output path: EngineOutput -> WebSocket message.
+
+before: to_dict() -> phase data re-shaping -> Pydantic ProcessFrameResponse
+        -> envelope dict rebuilt in the endpoint
+after:  to_wire() -> envelope fields added in place
+
+Reports time per frame, the peak transient memory allocated while
+building one message (tracemalloc) and the number of memory blocks each
+message leaves allocated (sys.getallocatedblocks delta).
+
+Usage:
+    python -m app.benchmarks.bench_frame_output --iterations 20000
+"""
+
+import argparse
+import gc
+import sys
+import time
+import timeit
+import tracemalloc
+
+from app.mediapipe.mediapipe_be.service.schemas import (
+    EngineOutput, WIRE_FIELDS, WIRE_DEFAULT_MESSAGES,
+)
+from app.schemas.sche_pose import ProcessFrameResponse
+
+PHASE_KEYS = {1: 'detection', 2: 'calibration', 3: 'sync', 4: 'final_report'}
+
+
+def build_outputs() -> dict:
+    """Representative engine outputs for Phase 2 and Phase 3."""
+    joints = ['left_shoulder', 'right_shoulder', 'left_elbow', 'right_elbow', 'left_knee', 'right_knee']
+    calibration = {
+        'current_joint': 'left_elbow', 'current_joint_name': 'Khuyu tay trai', 'queue_index': 2,
+        'total_joints': 6, 'progress': 0.4, 'overall_progress': 0.4, 'current_angle': 120.5,
+        'user_max_angle': 135.0, 'countdown_remaining': None, 'status': 'measuring',
+        'position_instruction': 'Moi ba dung NGANG',
+        'joints_status': [{'joint': name, 'status': 'done', 'max_angle': 120.0} for name in joints],
+        'message': 'Dang do khop...',
+    }
+    sync = {
+        'user_angle': 95.3, 'target_angle': 110.0, 'error': 14.7, 'current_score': 82.4,
+        'average_score': 80.1, 'motion_phase': 'eccentric', 'rep_count': 3, 'video_progress': 0.41,
+        'video_paused': False, 'pain_level': 'NONE', 'fatigue_level': 'FRESH',
+        'joint_errors': [
+            {'joint_name': name, 'user_angle': 95.3, 'target_angle': 110.0, 'error': 14.7}
+            for name in joints
+        ],
+        'active_joints_count': 6, 'feedback_text': 'TOT', 'direction_hint': 'raise',
+        'warning': None, 'status': 'syncing', 'is_free_training': False,
+        'is_predicted': False, 'prediction_error': None,
+    }
+    return {
+        'phase2': EngineOutput(current_phase=2, phase_name='calibration', calibration=calibration),
+        'phase3': EngineOutput(current_phase=3, phase_name='sync', sync=sync),
+    }
+
+
+def legacy_message(output: EngineOutput, frame_number: int) -> dict:
+    """Previous path: to_dict, re-shape, Pydantic, rebuild envelope."""
+    output_dict = output.to_dict()
+    phase = output_dict.get('phase', 1)
+    nested = output_dict.get(PHASE_KEYS.get(phase), {}) or {}
+    data = {name: nested.get(name, default) for name, default in WIRE_FIELDS.get(phase, ())}
+    message = nested.get('message') or output_dict.get('message') or WIRE_DEFAULT_MESSAGES.get(phase)
+    response = ProcessFrameResponse(
+        session_id='pose_bench', phase=phase, phase_name=output_dict.get('phase_name'),
+        data=data, message=message, warning=output_dict.get('warning'), timestamp=time.time()
+    )
+    state = {
+        "phase": response.phase,
+        "phase_name": response.phase_name,
+        "data": response.data,
+        "message": response.message,
+        "warning": response.warning,
+    }
+    envelope = {
+        "timestamp": response.timestamp,
+        "frame_number": frame_number,
+        "seq": frame_number,
+        "fps": 29.8,
+        "dropped_frames": 0,
+    }
+    return {**state, **envelope}
+
+
+def lean_message(output: EngineOutput, frame_number: int) -> dict:
+    """Current path: engine wire dict, envelope added in place."""
+    message = output.to_wire()
+    message["timestamp"] = time.time()
+    message["frame_number"] = frame_number
+    message["seq"] = frame_number
+    message["fps"] = 29.8
+    message["dropped_frames"] = 0
+    return message
+
+
+def peak_bytes(fn, output: EngineOutput, rounds: int = 200) -> float:
+    """Average peak traced memory while building one message."""
+    fn(output, 0)  # warm caches (Pydantic validators, etc.)
+    tracemalloc.start()
+    total = 0
+    try:
+        for i in range(rounds):
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            fn(output, i)
+            _, peak = tracemalloc.get_traced_memory()
+            total += peak - base
+    finally:
+        tracemalloc.stop()
+    return total / rounds
+
+
+def allocated_blocks(fn, output: EngineOutput, rounds: int = 200) -> float:
+    """Average memory blocks held by one built message (messages kept alive, no GC)."""
+    fn(output, 0)
+    messages = [None] * rounds
+    gc.disable()
+    try:
+        before = sys.getallocatedblocks()
+        for i in range(rounds):
+            messages[i] = fn(output, i)
+        after = sys.getallocatedblocks()
+    finally:
+        gc.enable()
+    return (after - before) / rounds
+
+
+def run(iterations: int) -> None:
+    for label, output in build_outputs().items():
+        assert legacy_message(output, 1).keys() == lean_message(output, 1).keys()
+        print(f"\n== {label} ==")
+        print(f"{'path':<10}{'us/frame':>10}{'peak bytes/frame':>18}{'blocks/frame':>14}")
+        for name, fn in (("before", legacy_message), ("after", lean_message)):
+            seconds = timeit.timeit(lambda: fn(output, 1), number=iterations)
+            print(
+                f"{name:<10}{seconds / iterations * 1e6:>10.2f}{peak_bytes(fn, output):>18.0f}"
+                f"{allocated_blocks(fn, output):>14.1f}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    run(args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Joint angles of one pose frame, and of a whole reference sequence.
+
+before: one calculate_angle() call per joint (3 conversions, 2 norms and an
+        arccos in scalar NumPy each)
+after:  compute_joint_angles() - all joints, or all frames x joints, in one
+        NumPy expression
+
+Usage:
+    python -m app.benchmarks.bench_joint_angles --iterations 5000 --frames 900
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+
+from app.mediapipe.mediapipe_be.core.kinematics import (
+    JOINT_DEFINITIONS, JOINT_ORDER, calculate_angle, compute_joint_angles,
+)
+
+
+def before(landmarks: np.ndarray) -> np.ndarray:
+    """Previous path: scalar angle per joint."""
+    angles = []
+    for joint in JOINT_ORDER:
+        d = JOINT_DEFINITIONS[joint]
+        angles.append(calculate_angle(landmarks[d.proximal], landmarks[d.vertex], landmarks[d.distal]))
+    return np.array(angles)
+
+
+def before_batch(sequence: np.ndarray) -> np.ndarray:
+    return np.array([before(frame) for frame in sequence])
+
+
+def run(iterations: int, frames: int) -> None:
+    rng = np.random.default_rng(0)
+    frame = rng.random((33, 3)).astype(np.float32)
+    sequence = rng.random((frames, 33, 3)).astype(np.float32)
+    assert np.allclose(before(frame), compute_joint_angles(frame), atol=1e-3)
+    assert np.allclose(before_batch(sequence[:50]), compute_joint_angles(sequence[:50]), atol=1e-3)
+
+    print(f"{len(JOINT_ORDER)} joints")
+    print(f"{'case':<22}{'before':>12}{'after':>12}{'speedup':>10}")
+    cases = (
+        ("1 frame (us)", lambda: before(frame), lambda: compute_joint_angles(frame), iterations, 1e6),
+        (f"{frames} frames (ms)", lambda: before_batch(sequence), lambda: compute_joint_angles(sequence),
+         max(1, iterations // 500), 1e3),
+    )
+    for name, slow, fast, number, scale in cases:
+        t_before = timeit.timeit(slow, number=number) / number
+        t_after = timeit.timeit(fast, number=number) / number
+        print(f"{name:<22}{t_before * scale:>12.2f}{t_after * scale:>12.2f}{t_before / t_after:>9.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--frames", type=int, default=900, help="Frames in the batch case (30 s at 30 fps)")
+    args = parser.parse_args()
+    run(args.iterations, args.frames)
+
+
+if __name__ == "__main__":
+    main()
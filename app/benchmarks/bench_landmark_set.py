@@ -0,0 +1,79 @@
+"""
+Per-frame landmark handling: MediaPipe output -> LandmarkSet -> arrays.
+
+before: one frozen Point3D per landmark, to_numpy() rebuilds an array from
+        the objects on every call
+after:  one (N, 5) float32 array built once, to_numpy() is a view
+
+Each frame converts 33 pose + 478 face landmarks and calls to_numpy() the
+number of times a phase 2/3 frame does (--reads).
+
+Usage:
+    python -m app.benchmarks.bench_landmark_set --iterations 2000 --reads 3
+"""
+
+import argparse
+import timeit
+from types import SimpleNamespace
+from typing import List
+
+import numpy as np
+
+from app.mediapipe.mediapipe_be.core.data_types import LandmarkSet, LandmarkType, Point3D
+
+
+def fake_landmarks(count: int, seed: int) -> List[SimpleNamespace]:
+    """Objects shaped like MediaPipe NormalizedLandmark."""
+    rng = np.random.default_rng(seed)
+    return [
+        SimpleNamespace(x=float(x), y=float(y), z=float(z), visibility=float(v), presence=float(p))
+        for x, y, z, v, p in rng.random((count, 5))
+    ]
+
+
+def before(landmarks, landmark_type: LandmarkType, reads: int) -> None:
+    """Previous path: Point3D per landmark, array rebuilt per to_numpy()."""
+    points = [
+        Point3D(x=lm.x, y=lm.y, z=lm.z * 1.0, visibility=lm.visibility, presence=lm.presence)
+        for lm in landmarks
+    ]
+    for _ in range(reads):
+        np.array([p.to_array() for p in points], dtype=np.float32)
+
+
+def after(landmarks, landmark_type: LandmarkType, reads: int) -> None:
+    """Current path: one array, to_numpy() views."""
+    nan = float("nan")
+    data = np.array(
+        [(lm.x, lm.y, lm.z,
+          nan if lm.visibility is None else lm.visibility,
+          nan if lm.presence is None else lm.presence) for lm in landmarks],
+        dtype=np.float32
+    ).reshape(-1, 5)
+    landmark_set = LandmarkSet(data, landmark_type, 0)
+    for _ in range(reads):
+        landmark_set.to_numpy()
+
+
+def run(iterations: int, reads: int) -> None:
+    pose = fake_landmarks(33, 0)
+    face = fake_landmarks(478, 1)
+    print(f"{'path':<10}{'us/frame':>10}")
+    for name, fn in (("before", before), ("after", after)):
+        def frame() -> None:
+            fn(pose, LandmarkType.POSE, reads)
+            fn(face, LandmarkType.FACE, 1)
+        seconds = timeit.timeit(frame, number=iterations)
+        print(f"{name:<10}{seconds / iterations * 1e6:>10.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=3, help="to_numpy() calls per pose set")
+    args = parser.parse_args()
+    run(args.iterations, args.reads)
+
+
+if __name__ == "__main__":
+    main()
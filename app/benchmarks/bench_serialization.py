@@ -0,0 +1,125 @@
+"""
+Per-frame serialization cost of pose WebSocket responses.
+
+Compares the previous path (Pydantic ProcessFrameResponse -> dict ->
+stdlib json.dumps, as done by websocket.send_json) with the negotiated
+encodings from app.helpers.serializers.
+
+Usage:
+    python -m app.benchmarks.bench_serialization --iterations 20000
+"""
+
+import argparse
+import json
+import random
+import time
+import timeit
+
+from app.helpers.serializers import SERIALIZERS
+from app.schemas.sche_pose import ProcessFrameResponse
+
+
+def build_phase1_data() -> dict:
+    """Phase 1 payload with 33 pose landmarks (largest per-frame message)."""
+    return {
+        'pose_detected': True,
+        'stable_count': 25,
+        'progress': 0.83,
+        'countdown_remaining': None,
+        'status': 'detecting',
+        'message': 'Dang phat hien tu the...',
+        'landmarks': [
+            {'x': random.random(), 'y': random.random(), 'z': random.random() - 0.5,
+             'visibility': random.random()}
+            for _ in range(33)
+        ],
+    }
+
+
+def build_phase3_data() -> dict:
+    """Phase 3 payload with per-joint errors."""
+    joints = ['left_shoulder', 'right_shoulder', 'left_elbow', 'right_elbow', 'left_knee', 'right_knee']
+    return {
+        'video_frame': 412,
+        'current_score': 82.4,
+        'rep_count': 3,
+        'fatigue_level': 'FRESH',
+        'joint_errors': [
+            {'joint_name': name, 'user_angle': 95.3, 'target_angle': 110.0,
+             'error': 14.7, 'score': 71.2, 'direction': 'raise'}
+            for name in joints
+        ],
+        'motion_phase': 'eccentric',
+        'feedback': 'TOT',
+        'is_predicted': False,
+        'prediction_error': None,
+    }
+
+
+def legacy_message(data: dict, frame_number: int) -> str:
+    """Previous path: Pydantic model, dict rebuild, stdlib json (send_json)."""
+    response = ProcessFrameResponse(
+        session_id='pose_bench', phase=3, phase_name='sync', data=data,
+        message=None, warning=None, timestamp=time.time()
+    )
+    return json.dumps({
+        "phase": response.phase,
+        "phase_name": response.phase_name,
+        "data": response.data,
+        "message": response.message,
+        "warning": response.warning,
+        "timestamp": response.timestamp,
+        "frame_number": frame_number,
+        "seq": frame_number,
+        "fps": 29.8,
+        "dropped_frames": 0,
+    })
+
+
+def message_dict(data: dict, frame_number: int) -> dict:
+    return {
+        "phase": 3,
+        "phase_name": "sync",
+        "data": data,
+        "message": None,
+        "warning": None,
+        "timestamp": time.time(),
+        "frame_number": frame_number,
+        "seq": frame_number,
+        "fps": 29.8,
+        "dropped_frames": 0,
+    }
+
+
+def run(iterations: int) -> None:
+    payloads = {"phase1 (33 landmarks)": build_phase1_data(), "phase3 (6 joints)": build_phase3_data()}
+
+    for label, data in payloads.items():
+        print(f"\n== {label} ==")
+        print(f"{'path':<28}{'us/frame':>10}{'bytes':>8}")
+
+        seconds = timeit.timeit(lambda: legacy_message(data, 1), number=iterations)
+        size = len(legacy_message(data, 1).encode("utf-8"))
+        print(f"{'pydantic + json (before)':<28}{seconds / iterations * 1e6:>10.2f}{size:>8}")
+
+        message = message_dict(data, 1)
+        for name, serializer in SERIALIZERS.items():
+            seconds = timeit.timeit(lambda: serializer.dumps(message), number=iterations)
+            encoded = serializer.dumps(message)
+            size = len(encoded if serializer.binary else encoded.encode("utf-8"))
+            print(f"{name:<28}{seconds / iterations * 1e6:>10.2f}{size:>8}")
+
+    missing = [name for name in ("orjson", "msgpack") if name not in SERIALIZERS]
+    if missing:
+        print(f"\n(not installed: {', '.join(missing)})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    run(args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Reference video playback cost per user frame in Phase 3.
+
+decode:   VideoEngine(path) - reads a frame when one is due; while paused
+          every call re-reads the current frame (served from the decoded-frame
+          ring buffer after the first read, previously seek-read-seek each call)
+headless: VideoEngine(path, headless=True) - frame index / checkpoints /
+          loops advanced from timestamps only, no decoder
+
+Both are driven with simulated 30 fps user frame timestamps (get_frame(now)).
+
+Usage:
+    python -m app.benchmarks.bench_video_timeline --iterations 300 --video exercise.mp4
+"""
+
+import argparse
+import os
+import tempfile
+import timeit
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from app.mediapipe.mediapipe_be.modules.video_engine import VideoEngine
+
+
+def write_video(path: str, frames: int, width: int, height: int) -> None:
+    """Synthetic H.264/mp4v clip (moving gradient)."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 30.0, (width, height))
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    for i in range(frames):
+        row = ((x + i * 4) % 256).astype(np.uint8)
+        writer.write(np.repeat(np.repeat(row[None, :, None], height, axis=0), 3, axis=2))
+    writer.release()
+
+
+def drive(engine: VideoEngine, iterations: int, paused: bool) -> float:
+    """Seconds per get_frame() call with 30 fps user timestamps."""
+    engine.seek(0)
+    engine.play()
+    if paused:
+        engine.get_frame(0.0)
+        engine.pause()
+    clock = {"now": 0.0}
+
+    def tick() -> None:
+        clock["now"] += 1 / 30
+        engine.get_frame(clock["now"])
+
+    return timeit.timeit(tick, number=iterations) / iterations
+
+
+def run(iterations: int, video: Optional[str]) -> None:
+    path = video
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix=".mp4")
+        os.close(fd)
+        write_video(path, iterations + 60, 1280, 720)
+    try:
+        print(f"{'mode':<10}{'state':<10}{'ms/call':>10}")
+        for mode, headless in (("decode", False), ("headless", True)):
+            for state, paused in (("playing", False), ("paused", True)):
+                engine = VideoEngine(path, headless=headless)
+                try:
+                    seconds = drive(engine, iterations, paused)
+                finally:
+                    engine.release()
+                print(f"{mode:<10}{state:<10}{seconds * 1e3:>10.3f}")
+    finally:
+        if video is None:
+            os.unlink(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--video", help="Reference video (default: synthetic 720p clip)")
+    args = parser.parse_args()
+    run(args.iterations, args.video)
+
+
+if __name__ == "__main__":
+    main()
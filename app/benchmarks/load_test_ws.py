@@ -0,0 +1,248 @@
+"""
+Concurrent WebSocket load test for a running pose service.
+
+Opens N sessions (POST /sessions + /ws) per step, streams JPEG frames at a
+target fps from a recorded video (or synthetic images) and reports, per
+session count:
+
+    throughput     responses/s over all sessions
+    rtt p50/95/99  send -> response for the same seq (ms)
+    answered       responses / frames sent (rest replaced in the server
+                   mailbox, rejected with 503, or still in flight at the end)
+    dropped        server-reported dropped_frames (sum over sessions)
+    server fps     mean of the last "fps" reported per session
+    rejected       sessions refused by admission control (503)
+
+Run it against a staging node with increasing --sessions to find the step
+where rtt p95 or the answered ratio breaks down.
+
+Usage:
+    python -m app.benchmarks.load_test_ws --base-url http://localhost:8000 \\
+        --sessions 1,2,4,8,16 --fps 15 --duration 30 --video recorded.mp4
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+import cv2
+import numpy as np
+
+from app.helpers.pose_protocol import pack_frame_header
+
+
+def load_frames(video: Optional[str], width: int, height: int, quality: int, max_frames: int) -> List[bytes]:
+    """JPEG-encoded frames from a video file, or synthetic noise images."""
+    params = [int(cv2.IMWRITE_JPEG_QUALITY), quality]
+    frames: List[bytes] = []
+
+    if video:
+        capture = cv2.VideoCapture(video)
+        try:
+            while len(frames) < max_frames:
+                ok, image = capture.read()
+                if not ok:
+                    break
+                image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+                frames.append(cv2.imencode(".jpg", image, params)[1].tobytes())
+        finally:
+            capture.release()
+        if not frames:
+            raise SystemExit(f"No frames read from {video}")
+        return frames
+
+    rng = np.random.default_rng(0)
+    for _ in range(min(max_frames, 30)):
+        image = rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+        frames.append(cv2.imencode(".jpg", image, params)[1].tobytes())
+    return frames
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100.0 * (len(ordered) - 1))))]
+
+
+class SessionStats:
+    """Counters of one simulated client."""
+
+    def __init__(self):
+        self.sent = 0
+        self.received = 0
+        self.errors = 0
+        self.rtts_ms: List[float] = []
+        self.server_fps = 0.0
+        self.dropped = 0
+        self.rejected = False
+        self.failed: Optional[str] = None
+
+
+async def run_client(
+    http: aiohttp.ClientSession,
+    args: argparse.Namespace,
+    frames: List[bytes],
+    stats: SessionStats,
+    stop_at: float
+) -> None:
+    """One patient: start a session, stream frames until ``stop_at``, end it."""
+    async with http.post(f"{args.base_url}/api/pose/sessions", json={"user_id": "loadtest"}) as response:
+        if response.status == 503:
+            stats.rejected = True
+            return
+        if response.status != 200:
+            stats.failed = f"start_session HTTP {response.status}"
+            return
+        data = (await response.json())["data"]
+    session_id = data["session_id"]
+
+    ws_base = args.base_url.replace("http", "ws", 1)
+    separator = "&" if "?" in data["websocket_url"] else "?"
+    ws_url = f"{ws_base}{data['websocket_url']}{separator}policy={args.policy}"
+    sent_at: Dict[int, float] = {}
+
+    try:
+        async with http.ws_connect(ws_url, max_msg_size=0) as ws:
+            async def sender() -> None:
+                interval = 1.0 / args.fps
+                next_at = time.perf_counter() + random.random() * interval  # de-synchronize clients
+                seq = 0
+                while time.perf_counter() < stop_at:
+                    await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+                    next_at += interval
+                    seq += 1
+                    payload = frames[seq % len(frames)]
+                    timestamp_ms = int(time.time() * 1000)
+                    sent_at[seq] = time.perf_counter()
+                    if args.protocol == "binary":
+                        await ws.send_bytes(pack_frame_header(seq, timestamp_ms) + payload)
+                    else:
+                        await ws.send_str(json.dumps({
+                            "frame_data": base64.b64encode(payload).decode("ascii"),
+                            "timestamp_ms": timestamp_ms, "seq": seq,
+                        }))
+                    stats.sent += 1
+
+            async def receiver() -> None:
+                async for message in ws:
+                    if message.type != aiohttp.WSMsgType.TEXT:
+                        continue
+                    data = json.loads(message.data)
+                    if "error" in data:
+                        stats.errors += 1
+                        continue
+                    started = sent_at.pop(data.get("seq"), None)
+                    if started is None:
+                        continue
+                    stats.received += 1
+                    stats.rtts_ms.append((time.perf_counter() - started) * 1000.0)
+                    stats.server_fps = data.get("fps", stats.server_fps)
+                    stats.dropped = data.get("dropped_frames", stats.dropped)
+
+            receive_task = asyncio.ensure_future(receiver())
+            await sender()
+            # Let in-flight frames come back before closing
+            await asyncio.sleep(args.drain)
+            receive_task.cancel()
+    except aiohttp.ClientError as e:
+        stats.failed = f"websocket: {e}"
+    finally:
+        try:
+            async with http.delete(f"{args.base_url}/api/pose/sessions/{session_id}"):
+                pass
+        except aiohttp.ClientError:
+            pass
+
+
+async def run_step(args: argparse.Namespace, frames: List[bytes], sessions: int) -> Dict[str, Any]:
+    stats = [SessionStats() for _ in range(sessions)]
+    stop_at = time.perf_counter() + args.duration
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=30)
+    async with aiohttp.ClientSession(timeout=timeout) as http:
+        results = await asyncio.gather(
+            *(run_client(http, args, frames, s, stop_at) for s in stats), return_exceptions=True
+        )
+    for s, result in zip(stats, results):
+        if isinstance(result, Exception) and not s.failed:
+            s.failed = repr(result)
+    active = [s for s in stats if not s.rejected and not s.failed]
+    rtts = [rtt for s in active for rtt in s.rtts_ms]
+    sent = sum(s.sent for s in active)
+    received = sum(s.received for s in active)
+    return {
+        "sessions": sessions,
+        "active": len(active),
+        "rejected": sum(1 for s in stats if s.rejected),
+        "failed": sum(1 for s in stats if s.failed),
+        "throughput_fps": round(received / args.duration, 1),
+        "rtt_p50_ms": percentile(rtts, 50),
+        "rtt_p95_ms": percentile(rtts, 95),
+        "rtt_p99_ms": percentile(rtts, 99),
+        "answered": round(received / sent, 3) if sent else None,
+        "dropped": sum(s.dropped for s in active),
+        "errors": sum(s.errors for s in active),
+        "server_fps": round(sum(s.server_fps for s in active) / len(active), 1) if active else None,
+        "failures": sorted({s.failed for s in stats if s.failed}),
+    }
+
+
+def print_row(row: Dict[str, Any]) -> None:
+    def fmt(value: Any) -> str:
+        return "-" if value is None else f"{value:.1f}" if isinstance(value, float) else str(value)
+    print(
+        f"{row['sessions']:>8}{row['active']:>8}{row['rejected']:>9}{fmt(row['throughput_fps']):>10}"
+        f"{fmt(row['rtt_p50_ms']):>9}{fmt(row['rtt_p95_ms']):>9}{fmt(row['rtt_p99_ms']):>9}"
+        f"{fmt(row['answered']):>10}{row['dropped']:>9}{row['errors']:>8}{fmt(row['server_fps']):>11}"
+    )
+    for failure in row["failures"]:
+        print(f"        failure: {failure}")
+
+
+async def run(args: argparse.Namespace) -> None:
+    frames = load_frames(args.video, args.width, args.height, args.quality, args.max_frames)
+    print(f"{len(frames)} frames, {sum(map(len, frames)) // len(frames)} B avg, "
+          f"{args.fps} fps/session, {args.duration}s per step, protocol={args.protocol}")
+    print(f"{'sessions':>8}{'active':>8}{'rejected':>9}{'resp/s':>10}{'p50':>9}{'p95':>9}{'p99':>9}"
+          f"{'answered':>10}{'dropped':>9}{'errors':>8}{'srv fps':>11}")
+
+    rows = []
+    for sessions in args.sessions:
+        row = await run_step(args, frames, sessions)
+        print_row(row)
+        rows.append(row)
+        await asyncio.sleep(args.pause)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--sessions", type=lambda v: [int(n) for n in v.split(",")], default=[1, 2, 4, 8],
+                        help="Comma separated session counts, one step each")
+    parser.add_argument("--fps", type=float, default=15.0, help="Target frames per second per session")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of streaming per step")
+    parser.add_argument("--video", help="Recorded video to stream (default: synthetic images)")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--quality", type=int, default=80, help="JPEG quality")
+    parser.add_argument("--max-frames", type=int, default=300, help="Frames kept in memory (looped)")
+    parser.add_argument("--protocol", choices=("binary", "json"), default="binary")
+    parser.add_argument("--policy", choices=("drop_oldest", "block"), default="drop_oldest")
+    parser.add_argument("--drain", type=float, default=1.0, help="Seconds to wait for in-flight responses")
+    parser.add_argument("--pause", type=float, default=2.0, help="Seconds between steps")
+    parser.add_argument("--json", help="Write the result rows to this file")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
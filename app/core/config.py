@@ -27,8 +27,87 @@ class Settings(BaseSettings):
         os.path.join(BASE_DIR, 'app', 'mediapipe', 'mediapipe_be', 'data', 'logs')
     )
     POSE_SESSION_TIMEOUT = int(os.getenv('POSE_SESSION_TIMEOUT', '3600'))  # 1 hour default
+    # Background reaper: expire sessions and evict idle engines (LRU) over the limits
+    POSE_REAPER_INTERVAL = float(os.getenv('POSE_REAPER_INTERVAL', '30'))
+    POSE_MAX_LIVE_SESSIONS = int(os.getenv('POSE_MAX_LIVE_SESSIONS', '32'))  # 0 = unlimited
+    POSE_MAX_RSS_MB = int(os.getenv('POSE_MAX_RSS_MB', '0'))  # 0 = no memory limit (per engine process)
+    POSE_EVICT_BATCH = int(os.getenv('POSE_EVICT_BATCH', '2'))  # memory evictions per process per reaper pass
+    POSE_EVICT_TIMEOUT = float(os.getenv('POSE_EVICT_TIMEOUT', '5'))  # seconds to wait for a session's lane
+    # Admission control for new sessions (CPU budget in cores per worker, 0 = 80% of CPUs)
+    POSE_ADMISSION_ENABLED = os.getenv('POSE_ADMISSION_ENABLED', 'true').lower() == 'true'
+    POSE_ADMISSION_CPU_BUDGET = float(os.getenv('POSE_ADMISSION_CPU_BUDGET', '0'))
+    POSE_ADMISSION_SESSION_COST = float(os.getenv('POSE_ADMISSION_SESSION_COST', '0.5'))  # until measured
+    POSE_ADMISSION_LANDMARKS_SESSION_COST = float(os.getenv('POSE_ADMISSION_LANDMARKS_SESSION_COST', '0.05'))
+    POSE_ADMISSION_MAX_QUEUE = int(os.getenv('POSE_ADMISSION_MAX_QUEUE', '8'))
+    POSE_ADMISSION_QUEUE_TIMEOUT = float(os.getenv('POSE_ADMISSION_QUEUE_TIMEOUT', '10'))
     POSE_DETECTION_ENABLED = os.getenv('POSE_DETECTION_ENABLED', 'true').lower() == 'true'
     MEDIAPIPE_MODEL_COMPLEXITY = int(os.getenv('MEDIAPIPE_MODEL_COMPLEXITY', '1'))
 
+    # Pose inference executor (offloads decode + MediaPipe from the event loop)
+    POSE_EXECUTOR_MODE = os.getenv('POSE_EXECUTOR_MODE', 'thread').lower()  # thread | process
+    POSE_EXECUTOR_WORKERS = int(os.getenv('POSE_EXECUTOR_WORKERS', str(os.cpu_count() or 4)))
+    POSE_EXECUTOR_MAX_PENDING = int(os.getenv('POSE_EXECUTOR_MAX_PENDING', '64'))
+    POSE_EXECUTOR_MAX_PENDING_PER_SESSION = int(os.getenv('POSE_EXECUTOR_MAX_PENDING_PER_SESSION', '2'))
+    # Per-connection frame mailbox: drop_oldest (latest frame wins) | block (backpressure)
+    POSE_FRAME_POLICY = os.getenv('POSE_FRAME_POLICY', 'drop_oldest').lower()
+    # Delta-mode WebSocket responses: full keyframe every N frames
+    POSE_DELTA_KEYFRAME_INTERVAL = int(os.getenv('POSE_DELTA_KEYFRAME_INTERVAL', '30'))
+    # Default pose WebSocket response encoding: json | orjson | msgpack
+    POSE_WS_ENCODING = os.getenv('POSE_WS_ENCODING', 'json').lower()
+
+    # Multi-process engine sharding (0 = engines run in the API process)
+    POSE_SHARD_WORKERS = int(os.getenv('POSE_SHARD_WORKERS', '0'))
+    POSE_SHARD_RING_SLOTS = int(os.getenv('POSE_SHARD_RING_SLOTS', '8'))
+    POSE_SHARD_SLOT_BYTES = int(os.getenv('POSE_SHARD_SLOT_BYTES', str(1920 * 1080 * 3)))
+    POSE_SHARD_TIMEOUT = float(os.getenv('POSE_SHARD_TIMEOUT', '30'))
+
+    # Pre-warmed VisionDetector pool (per process / per shard worker)
+    POSE_DETECTOR_POOL_ENABLED = os.getenv('POSE_DETECTOR_POOL_ENABLED', 'true').lower() == 'true'
+    POSE_DETECTOR_POOL_SIZE = int(os.getenv('POSE_DETECTOR_POOL_SIZE', '8'))
+    POSE_DETECTOR_POOL_PREWARM = int(os.getenv('POSE_DETECTOR_POOL_PREWARM', '2'))
+    POSE_DETECTOR_LEASE_TIMEOUT = float(os.getenv('POSE_DETECTOR_LEASE_TIMEOUT', '10'))
+    # Face landmarker rate in phases that use it (Hz, 0 = every frame)
+    POSE_FACE_ANALYSIS_HZ = float(os.getenv('POSE_FACE_ANALYSIS_HZ', '5'))
+    # Decode frames straight to RGB for MediaPipe (no BGR -> RGB copy in the detector)
+    POSE_RGB_DECODE = os.getenv('POSE_RGB_DECODE', 'true').lower() == 'true'
+    # Crop frames to the patient's region (from the previous pose) before inference
+    POSE_ROI_ENABLED = os.getenv('POSE_ROI_ENABLED', 'false').lower() == 'true'
+    POSE_ROI_MAX_SIDE = int(os.getenv('POSE_ROI_MAX_SIDE', '640'))
+    # Phase 3 keyframe inference: detect every N frames (adaptive), predict in between
+    POSE_KEYFRAME_MODE = os.getenv('POSE_KEYFRAME_MODE', 'false').lower() == 'true'
+    POSE_KEYFRAME_MAX_INTERVAL = int(os.getenv('POSE_KEYFRAME_MAX_INTERVAL', '3'))
+    # Reference video motion (joint angles, phase frames) extracted once, cached as <video>.motion.npz
+    POSE_REFERENCE_CACHE_ENABLED = os.getenv('POSE_REFERENCE_CACHE_ENABLED', 'true').lower() == 'true'
+    # Landmarks in frame responses (skeleton overlay): none | full | compact | compact_bin
+    POSE_LANDMARK_FORMAT = os.getenv('POSE_LANDMARK_FORMAT', 'none').lower()
+    # Per-stage latency histograms (GET /api/pose/metrics, ?timings=1 per frame)
+    POSE_METRICS_ENABLED = os.getenv('POSE_METRICS_ENABLED', 'true').lower() == 'true'
+
+    # Session checkpoints (resume after reconnect / on another worker without recalibrating)
+    POSE_CHECKPOINT_ENABLED = os.getenv('POSE_CHECKPOINT_ENABLED', 'true').lower() == 'true'
+    POSE_CHECKPOINT_DIR = os.getenv(
+        'POSE_CHECKPOINT_DIR',
+        os.path.join(BASE_DIR, 'app', 'mediapipe', 'mediapipe_be', 'data', 'checkpoints')
+    )
+    POSE_CHECKPOINT_INTERVAL = float(os.getenv('POSE_CHECKPOINT_INTERVAL', '10'))  # seconds, Phases 2-3 (phase changes checkpoint from Phase 2 on)
+
+    # Multi-worker session affinity (uvicorn --workers N on one host)
+    POSE_REGISTRY_ENABLED = os.getenv('POSE_REGISTRY_ENABLED', 'false').lower() == 'true'
+    POSE_REGISTRY_PATH = os.getenv(
+        'POSE_REGISTRY_PATH',
+        os.path.join(BASE_DIR, 'app', 'mediapipe', 'mediapipe_be', 'data', 'pose_sessions.db')
+    )
+    POSE_WORKER_ID = os.getenv('POSE_WORKER_ID', '')
+    POSE_REGISTRY_WORKER_TIMEOUT = float(os.getenv('POSE_REGISTRY_WORKER_TIMEOUT', '10'))
+    POSE_REGISTRY_HANDOFF_TIMEOUT = float(os.getenv('POSE_REGISTRY_HANDOFF_TIMEOUT', '5'))
+    # A session streaming more recently than this is not handed to another worker
+    POSE_REGISTRY_HANDOFF_IDLE = float(os.getenv('POSE_REGISTRY_HANDOFF_IDLE', '2'))
+
+    # Offline recorded-video analysis jobs
+    POSE_ANALYSIS_WORKERS = int(os.getenv('POSE_ANALYSIS_WORKERS', '1'))
+    POSE_ANALYSIS_MAX_JOBS = int(os.getenv('POSE_ANALYSIS_MAX_JOBS', '8'))
+    POSE_ANALYSIS_DECODE_QUEUE = int(os.getenv('POSE_ANALYSIS_DECODE_QUEUE', '16'))
+    POSE_ANALYSIS_RETENTION = int(os.getenv('POSE_ANALYSIS_RETENTION', '3600'))
+
 
 settings = Settings()
@@ -37,7 +37,8 @@ class CustomException(Exception):
 async def http_exception_handler(request: Request, exc: CustomException):
     return JSONResponse(
         status_code=exc.http_code,
-        content=jsonable_encoder(ResponseSchemaBase().custom_response(exc.code, exc.message))
+        content=jsonable_encoder(ResponseSchemaBase().custom_response(exc.code, exc.message)),
+        headers=getattr(exc, "headers", None)
     )
 
 
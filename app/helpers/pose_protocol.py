@@ -0,0 +1,260 @@
+"""
+Pose WebSocket wire protocol helpers.
+
+Binary frame message (client -> server), little-endian:
+
+    offset  size  field
+    0       1     version       (FRAME_PROTOCOL_VERSION)
+    1       1     codec         (FrameCodec)
+    2       4     seq           (uint32, client frame sequence number)
+    6       8     timestamp_ms  (uint64)
+    14      ...   encoded image bytes (JPEG / WebP / PNG)
+
+The image payload is handed to ``np.frombuffer`` with an offset, so the
+received message buffer is never copied before ``cv2.imdecode``.
+
+Landmarks message (sessions started with ``input_mode="landmarks"``): the
+client runs the pose model on-device and sends JSON instead of images:
+
+    {"landmarks": [[x, y, z, visibility], ... 33 rows], "timestamp_ms": 1234,
+     "seq": 1, "face_landmarks": [[x, y, z], ...]}   # face optional, >= 468 rows
+
+Coordinates are normalized to the camera frame as MediaPipe reports them;
+an empty / null "landmarks" means no person was found.
+
+Delta mode (``?delta=1`` / ``?delta=ack``): server responses carry only the
+fields that changed since the base state, with periodic full keyframes,
+see DeltaEncoder.
+"""
+
+import enum
+import struct
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+FRAME_PROTOCOL_VERSION = 1
+
+DETECTOR_HEADS = ("pose", "face")
+
+_FRAME_HEADER = struct.Struct("<BBIQ")
+FRAME_HEADER_SIZE = _FRAME_HEADER.size
+
+
+class FrameCodec(enum.IntEnum):
+    AUTO = 0
+    JPEG = 1
+    WEBP = 2
+    PNG = 3
+
+
+class FrameHeader(NamedTuple):
+    version: int
+    codec: FrameCodec
+    seq: int
+    timestamp_ms: int
+
+
+def parse_frame_header(buffer: bytes) -> FrameHeader:
+    """
+    Parse the fixed header of a binary frame message.
+
+    Raises:
+        ValueError: If the message is too short, the version is unsupported,
+            the codec is unknown or there is no image payload.
+    """
+    if len(buffer) <= FRAME_HEADER_SIZE:
+        raise ValueError(f"Binary frame too short ({len(buffer)} bytes)")
+
+    version, codec, seq, timestamp_ms = _FRAME_HEADER.unpack_from(buffer, 0)
+    if version != FRAME_PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported frame protocol version: {version}")
+    try:
+        codec = FrameCodec(codec)
+    except ValueError:
+        raise ValueError(f"Unknown frame codec: {codec}")
+
+    return FrameHeader(version, codec, seq, timestamp_ms)
+
+
+def pack_frame_header(seq: int, timestamp_ms: int, codec: FrameCodec = FrameCodec.JPEG) -> bytes:
+    """Build a binary frame header (used by clients and test tools)."""
+    return _FRAME_HEADER.pack(FRAME_PROTOCOL_VERSION, int(codec), seq & 0xFFFFFFFF, timestamp_ms)
+
+
+def parse_detector_heads(value: Any) -> Optional[Dict[str, bool]]:
+    """
+    Normalize a detector head override.
+
+    Accepts a JSON object ({"face": false}) or a comma separated list of the
+    heads to run ("pose" -> pose on, face off). Empty / None -> no override.
+
+    Raises:
+        ValueError: If a head name is unknown.
+    """
+    if value is None or value == "":
+        return None
+
+    if isinstance(value, dict):
+        heads = {str(k): bool(v) for k, v in value.items()}
+    elif isinstance(value, str):
+        enabled = {name.strip() for name in value.split(",") if name.strip()}
+        unknown = enabled - set(DETECTOR_HEADS)
+        if unknown:
+            raise ValueError(f"Unknown detector heads: {', '.join(sorted(unknown))}")
+        heads = {name: name in enabled for name in DETECTOR_HEADS}
+    else:
+        raise ValueError("heads must be an object or a comma separated string")
+
+    unknown = set(heads) - set(DETECTOR_HEADS)
+    if unknown:
+        raise ValueError(f"Unknown detector heads: {', '.join(sorted(unknown))}")
+    return heads
+
+
+# ==================== CLIENT LANDMARKS ====================
+
+POSE_LANDMARK_COUNT = 33
+FACE_LANDMARK_MIN = 468
+
+
+def _landmark_array(value: Any, name: str) -> Optional[np.ndarray]:
+    """(N, 3..5) float32 array from nested lists, None when empty."""
+    if value is None or (isinstance(value, (list, tuple)) and len(value) == 0):
+        return None
+    try:
+        array = np.asarray(value, dtype=np.float32)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a list of [x, y, z(, visibility(, presence))] rows")
+    if array.ndim != 2 or not 3 <= array.shape[1] <= 5:
+        raise ValueError(f"{name} must be a list of [x, y, z(, visibility(, presence))] rows")
+    if not np.isfinite(array).all():
+        raise ValueError(f"{name} contains non-finite values")
+    return array
+
+
+def parse_landmark_message(data: Dict[str, Any]) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    """
+    Validate a landmarks message.
+
+    Returns:
+        (pose, face): (33, 3..5) and (N >= 468, 3..5) float32 arrays, or None.
+
+    Raises:
+        ValueError: On malformed arrays or wrong landmark counts.
+    """
+    pose = _landmark_array(data.get("landmarks"), "landmarks")
+    if pose is not None and len(pose) != POSE_LANDMARK_COUNT:
+        raise ValueError(f"landmarks must have {POSE_LANDMARK_COUNT} points, got {len(pose)}")
+
+    face = _landmark_array(data.get("face_landmarks"), "face_landmarks")
+    if face is not None and len(face) < FACE_LANDMARK_MIN:
+        raise ValueError(f"face_landmarks must have at least {FACE_LANDMARK_MIN} points, got {len(face)}")
+    return pose, face
+
+
+# ==================== DELTA-ENCODED RESPONSES ====================
+
+DELTA_REMOVED_KEY = "_removed"
+
+
+def diff_state(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Changed fields of ``current`` relative to ``previous``.
+
+    Nested dicts are diffed recursively; any other value (lists included)
+    is sent whole when it differs. Keys missing from ``current`` are listed
+    under ``"_removed"``. An empty dict means nothing changed.
+    """
+    delta: Dict[str, Any] = {}
+    for key, value in current.items():
+        if key not in previous:
+            delta[key] = value
+            continue
+        old = previous[key]
+        if isinstance(value, dict) and isinstance(old, dict):
+            nested = diff_state(old, value)
+            if nested:
+                delta[key] = nested
+        elif value != old:
+            delta[key] = value
+
+    removed = [key for key in previous if key not in current]
+    if removed:
+        delta[DELTA_REMOVED_KEY] = removed
+    return delta
+
+
+def apply_delta(base: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Client-side inverse of diff_state (returns a new dict)."""
+    state = dict(base)
+    for key in delta.get(DELTA_REMOVED_KEY, ()):
+        state.pop(key, None)
+    for key, value in delta.items():
+        if key == DELTA_REMOVED_KEY:
+            continue
+        if isinstance(value, dict) and isinstance(state.get(key), dict):
+            state[key] = apply_delta(state[key], value)
+        else:
+            state[key] = value
+    return state
+
+
+class DeltaEncoder:
+    """
+    Per-connection encoder for delta-mode WebSocket responses.
+
+    Each frame's state is sent either whole (keyframe) or as diff_state()
+    against a base state. The base is the last sent state, or - with
+    ``require_ack`` - the last state the client acknowledged by
+    ``frame_number``. A keyframe is forced every ``keyframe_interval``
+    frames, on phase change and while there is no base.
+    """
+
+    def __init__(self, keyframe_interval: int = 30, require_ack: bool = False, max_pending: int = 64):
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.require_ack = require_ack
+        self.max_pending = max_pending
+        self._base: Optional[Dict[str, Any]] = None
+        self._pending: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._since_keyframe = 0
+
+    def encode(self, frame_number: int, state: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Returns:
+            (is_keyframe, payload) - payload is the full state or the diff.
+        """
+        base = self._base
+        keyframe = (
+            base is None
+            or self._since_keyframe + 1 >= self.keyframe_interval
+            or base.get("phase") != state.get("phase")
+        )
+        if keyframe:
+            self._since_keyframe = 0
+            payload = state
+        else:
+            self._since_keyframe += 1
+            payload = diff_state(base, state)
+
+        if self.require_ack:
+            self._pending[frame_number] = state
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+        else:
+            self._base = state
+        return keyframe, payload
+
+    def ack(self, frame_number: int) -> bool:
+        """Client confirmed ``frame_number``: it becomes the diff base."""
+        state = self._pending.get(frame_number)
+        if state is None:
+            return False
+        # Older pending states can never become the base any more
+        while self._pending:
+            number, _ = self._pending.popitem(last=False)
+            if number == frame_number:
+                break
+        self._base = state
+        return True
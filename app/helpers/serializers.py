@@ -0,0 +1,115 @@
+"""
+Fast serializers for the pose WebSocket and REST responses.
+
+orjson and msgpack are optional: when they are not installed the
+``json`` encoding (stdlib) is used and ``FastJSONResponse`` falls back to
+Starlette's JSONResponse.
+
+WebSocket encodings (negotiated with ``?encoding=``):
+    json     stdlib json, text messages (default, what clients had before)
+    orjson   same JSON document produced by orjson, text messages
+    msgpack  MessagePack, binary messages
+
+An encoding the client asks for explicitly is never substituted: an
+unavailable one is an error, so clients never receive a format they did
+not request.
+"""
+
+import base64
+import json
+import logging
+from typing import Any, Callable, Dict, Union
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(obj: Any) -> Any:
+    """numpy scalars / arrays leaking into payloads; raw bytes as base64."""
+    if isinstance(obj, (bytes, bytearray)):
+        return base64.b64encode(obj).decode("ascii")
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if hasattr(obj, "item"):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+class FrameSerializer:
+    """Encode one WebSocket message; ``binary`` selects send_bytes vs send_text."""
+
+    def __init__(self, name: str, dumps: Callable[[Any], Union[str, bytes]], binary: bool):
+        self.name = name
+        self.dumps = dumps
+        self.binary = binary
+
+
+def _stdlib_dumps(payload: Any) -> str:
+    return json.dumps(payload, default=_json_default, separators=(",", ":"), ensure_ascii=False)
+
+
+def _orjson_dumps(payload: Any) -> str:
+    # Text frames must be str; decoding the UTF-8 bytes is cheap next to encoding
+    return orjson.dumps(
+        payload, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    ).decode("utf-8")
+
+
+def _msgpack_dumps(payload: Any) -> bytes:
+    return msgpack.packb(payload, default=_json_default, use_bin_type=True)
+
+
+SERIALIZERS: Dict[str, FrameSerializer] = {"json": FrameSerializer("json", _stdlib_dumps, binary=False)}
+if ORJSON_AVAILABLE:
+    SERIALIZERS["orjson"] = FrameSerializer("orjson", _orjson_dumps, binary=False)
+if MSGPACK_AVAILABLE:
+    SERIALIZERS["msgpack"] = FrameSerializer("msgpack", _msgpack_dumps, binary=True)
+
+
+def get_frame_serializer(encoding: str = None, fallback: bool = False) -> FrameSerializer:
+    """
+    Serializer for an encoding (default json).
+
+    Raises ValueError for unknown or unavailable encodings. With
+    ``fallback`` (server-configured default, not a client request) they are
+    replaced by orjson when installed, otherwise by stdlib json.
+    """
+    name = (encoding or "json").lower()
+    serializer = SERIALIZERS.get(name)
+    if serializer is None:
+        if not fallback:
+            raise ValueError(
+                f"Unsupported encoding '{name}', available: {', '.join(SERIALIZERS)}"
+            )
+        fallback = "orjson" if ORJSON_AVAILABLE else "json"
+        logger.warning(f"get_frame_serializer: encoding '{name}' not available, using {fallback}")
+        serializer = SERIALIZERS[fallback]
+    return serializer
+
+
+def loads_json(data: Union[str, bytes]) -> Any:
+    """Parse an incoming JSON message (orjson when available)."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+if ORJSON_AVAILABLE:
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+else:
+    FastJSONResponse = JSONResponse
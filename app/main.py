@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import os
 
@@ -66,6 +67,38 @@ def get_application() -> FastAPI:
     application.include_router(router, prefix=settings.API_PREFIX)
     application.add_exception_handler(CustomException, http_exception_handler)
 
+    @application.on_event("startup")
+    def start_pose_shards():
+        from app.services.pose_shard_host import pose_shard_host
+        from app.services.pose_session_registry import pose_session_registry
+        from app.services.srv_pose import pose_detection_service
+        pose_shard_host.start()
+        pose_session_registry.start()
+        pose_detection_service.warm_up()
+
+    @application.on_event("startup")
+    async def start_pose_reaper():
+        from app.services.srv_pose import pose_detection_service
+        pose_detection_service.bind_event_loop(asyncio.get_running_loop())
+        application.state.pose_reaper = asyncio.create_task(pose_detection_service.run_reaper())
+
+    @application.on_event("shutdown")
+    async def stop_pose_reaper():
+        reaper = getattr(application.state, "pose_reaper", None)
+        if reaper is not None:
+            reaper.cancel()
+
+    @application.on_event("shutdown")
+    def shutdown_pose_executor():
+        from app.services.pose_executor import pose_inference_executor
+        from app.services.pose_shard_host import pose_shard_host
+        from app.services.srv_pose_analysis import pose_analysis_service
+        from app.services.pose_session_registry import pose_session_registry
+        pose_session_registry.stop()
+        pose_inference_executor.shutdown(wait=False)
+        pose_shard_host.shutdown()
+        pose_analysis_service.shutdown()
+
     # Health check endpoint
     @application.get("/health")
     async def health_check():
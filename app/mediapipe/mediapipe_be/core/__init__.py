@@ -3,6 +3,9 @@ Core Module for MEMOTION.
 
 Chứa các thành phần cốt lõi:
 - VisionDetector: Wrapper cho MediaPipe Tasks API
+- DetectorPool: Pool detector pre-warm, lease/release theo session
+- LandmarkPredictor: Kalman dự đoán landmarks giữa các keyframe
+- Landmark Codec: Mã hoá landmarks gọn (uint16) cho client
 - Procrustes Analysis: Chuẩn hóa skeleton
 - Kinematics: Tính toán góc khớp
 - Synchronizer: FSM đồng bộ chuyển động
@@ -26,6 +29,26 @@ from .data_types import (
 from .detector import (
     VisionDetector,
     DetectorConfig,
+    RoiTracker,
+)
+
+from .detector_pool import (
+    DetectorPool,
+    DetectorPoolExhausted,
+    get_detector_pool,
+    get_detector_pool_stats,
+)
+
+from .landmark_predictor import (
+    LandmarkPredictor,
+    KeyframeScheduler,
+)
+
+from .landmark_codec import (
+    LANDMARK_FORMATS,
+    encode_landmarks,
+    decode_compact_landmarks,
+    resolve_landmark_indices,
 )
 
 from .procrustes import (
@@ -40,10 +63,12 @@ from .kinematics import (
     JointType,
     JointDefinition,
     JOINT_DEFINITIONS,
+    JOINT_ORDER,
     calculate_angle,
     calculate_angle_safe,
     calculate_joint_angle,
     calculate_all_joint_angles,
+    compute_joint_angles,
     compute_angle_velocity,
     is_angle_in_normal_range,
 )
@@ -83,6 +108,20 @@ __all__ = [
     # Detector
     "VisionDetector",
     "DetectorConfig",
+    "RoiTracker",
+    # Detector Pool
+    "DetectorPool",
+    "DetectorPoolExhausted",
+    "get_detector_pool",
+    "get_detector_pool_stats",
+    # Keyframe inference
+    "LandmarkPredictor",
+    "KeyframeScheduler",
+    # Landmark codec
+    "LANDMARK_FORMATS",
+    "encode_landmarks",
+    "decode_compact_landmarks",
+    "resolve_landmark_indices",
     # Procrustes
     "normalize_skeleton",
     "align_skeleton_to_reference",
@@ -93,10 +132,12 @@ __all__ = [
     "JointType",
     "JointDefinition",
     "JOINT_DEFINITIONS",
+    "JOINT_ORDER",
     "calculate_angle",
     "calculate_angle_safe",
     "calculate_joint_angle",
     "calculate_all_joint_angles",
+    "compute_joint_angles",
     "compute_angle_velocity",
     "is_angle_in_normal_range",
     # Synchronizer
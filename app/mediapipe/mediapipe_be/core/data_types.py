@@ -9,7 +9,7 @@ Version: 1.0.0
 """
 
 from dataclasses import dataclass, field
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from enum import Enum, auto
 import numpy as np
 
@@ -49,33 +49,118 @@ class Point3D:
         return (self.x, self.y)
 
 
-@dataclass
+# Các cột của LandmarkSet.data
+LANDMARK_COLUMNS = ("x", "y", "z", "visibility", "presence")
+
+
 class LandmarkSet:
     """
     Tập hợp các landmarks của một loại (pose/face/hand).
     
+    Dữ liệu nằm trong một mảng float32 duy nhất shape (N, 5) với các cột
+    x, y, z, visibility, presence (NaN = MediaPipe không trả về giá trị đó).
+    Danh sách Point3D (``landmarks``) chỉ được tạo khi có code cần đến,
+    còn các phép tính góc / mã hóa đọc thẳng từ mảng.
+    
     Attributes:
-        landmarks: Danh sách các điểm Point3D.
+        data: Mảng (N, 5) float32.
         landmark_type: Loại landmark (POSE, FACE, etc.).
         timestamp_ms: Timestamp của frame (milliseconds).
     """
-    landmarks: List[Point3D]
-    landmark_type: LandmarkType
-    timestamp_ms: int = 0
+    
+    def __init__(
+        self,
+        data,
+        landmark_type: LandmarkType,
+        timestamp_ms: int = 0
+    ):
+        """
+        Args:
+            data: Mảng (N, 5) float32, hoặc danh sách Point3D (tương thích cũ).
+            landmark_type: Loại landmark.
+            timestamp_ms: Timestamp của frame.
+        """
+        if not isinstance(data, np.ndarray):
+            points = list(data)
+            data = np.array(
+                [
+                    (p.x, p.y, p.z,
+                     np.nan if p.visibility is None else p.visibility,
+                     np.nan if p.presence is None else p.presence)
+                    for p in points
+                ],
+                dtype=np.float32
+            ).reshape(len(points), len(LANDMARK_COLUMNS))
+        self.data = data
+        self.landmark_type = landmark_type
+        self.timestamp_ms = timestamp_ms
+        self._points: Optional[List[Point3D]] = None
     
     def __len__(self) -> int:
-        return len(self.landmarks)
+        return self.data.shape[0]
+    
+    def __repr__(self) -> str:
+        return (f"LandmarkSet({self.landmark_type.name}, n={len(self)}, "
+                f"timestamp_ms={self.timestamp_ms})")
+    
+    @property
+    def landmarks(self) -> List[Point3D]:
+        """Danh sách Point3D, tạo lười một lần từ ``data``."""
+        if self._points is None:
+            self._points = [
+                Point3D(
+                    x=x, y=y, z=z,
+                    visibility=None if v != v else v,
+                    presence=None if p != p else p,
+                )
+                for x, y, z, v, p in self.data.tolist()
+            ]
+        return self._points
+    
+    @property
+    def visibility(self) -> np.ndarray:
+        """Cột visibility shape (N,), NaN nếu không có."""
+        return self.data[:, 3]
+    
+    @property
+    def presence(self) -> np.ndarray:
+        """Cột presence shape (N,), NaN nếu không có."""
+        return self.data[:, 4]
+    
+    @classmethod
+    def from_numpy(
+        cls,
+        array: np.ndarray,
+        landmark_type: LandmarkType,
+        timestamp_ms: int = 0
+    ) -> "LandmarkSet":
+        """
+        Tạo LandmarkSet từ numpy array (vd. landmarks client gửi lên).
+        
+        Args:
+            array: Shape (N, 3..5), các cột x, y, z[, visibility[, presence]].
+            landmark_type: Loại landmark.
+            timestamp_ms: Timestamp của frame.
+            
+        Returns:
+            LandmarkSet: N điểm, các cột thiếu là NaN.
+        """
+        array = np.asarray(array, dtype=np.float32)
+        columns = min(array.shape[1], len(LANDMARK_COLUMNS))
+        data = np.full((array.shape[0], len(LANDMARK_COLUMNS)), np.nan, dtype=np.float32)
+        data[:, :columns] = array[:, :columns]
+        return cls(data, landmark_type, timestamp_ms)
     
     def to_numpy(self) -> np.ndarray:
         """
-        Chuyển đổi toàn bộ landmarks sang numpy array.
+        Tọa độ của toàn bộ landmarks (không copy).
         
         Returns:
-            np.ndarray: Ma trận shape (N, 3) với N là số landmarks.
+            np.ndarray: View chỉ đọc shape (N, 3) float32 của ``data``.
         """
-        if not self.landmarks:
-            return np.array([], dtype=np.float32).reshape(0, 3)
-        return np.array([lm.to_array() for lm in self.landmarks], dtype=np.float32)
+        coords = self.data[:, :3]
+        coords.flags.writeable = False
+        return coords
     
     def get_visibility_mask(self, threshold: float = 0.5) -> np.ndarray:
         """
@@ -85,15 +170,10 @@ class LandmarkSet:
             threshold: Ngưỡng visibility tối thiểu.
             
         Returns:
-            np.ndarray: Boolean mask shape (N,).
+            np.ndarray: Boolean mask shape (N,), True nếu không có visibility.
         """
-        mask = []
-        for lm in self.landmarks:
-            if lm.visibility is not None:
-                mask.append(lm.visibility >= threshold)
-            else:
-                mask.append(True)
-        return np.array(mask, dtype=bool)
+        visibility = self.visibility
+        return np.isnan(visibility) | (visibility >= threshold)
 
 
 @dataclass
@@ -110,6 +190,8 @@ class DetectionResult:
         timestamp_ms: Timestamp của frame.
         is_valid: True nếu detection thành công.
         error_message: Thông báo lỗi nếu có.
+        timings: Thời gian từng stage của detector (ms): rgb_convert,
+                 pose_inference, face_inference.
     """
     pose_landmarks: Optional[LandmarkSet] = None
     face_landmarks: Optional[LandmarkSet] = None
@@ -119,6 +201,7 @@ class DetectionResult:
     timestamp_ms: int = 0
     is_valid: bool = False
     error_message: Optional[str] = None
+    timings: Optional[Dict[str, float]] = None
     
     def has_pose(self) -> bool:
         """Kiểm tra có pose landmarks không."""
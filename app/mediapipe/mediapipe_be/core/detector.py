@@ -8,10 +8,12 @@ Author: MEMOTION Team
 Version: 1.0.0
 """
 
+import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Union
+from typing import Dict, Optional, Tuple, Union
 import numpy as np
+import cv2
 
 try:
     import mediapipe as mp
@@ -23,7 +25,6 @@ except ImportError as e:
     ) from e
 
 from .data_types import (
-    Point3D,
     LandmarkSet,
     LandmarkType,
     DetectionResult,
@@ -45,6 +46,10 @@ class DetectorConfig:
         num_poses: Số lượng người tối đa detect.
         num_faces: Số lượng khuôn mặt tối đa detect.
         running_mode: Chế độ chạy (IMAGE, VIDEO, LIVE_STREAM).
+        use_roi: Crop theo vùng người từ frame trước (RoiTracker).
+        roi_padding: Padding quanh bounding box pose (tỉ lệ theo cạnh box).
+        roi_min_visibility: Visibility tối thiểu để landmark được tính vào box.
+        roi_max_side: Cạnh dài tối đa của ảnh đưa vào model (0 = không resize).
     """
     pose_model_path: Optional[str] = None
     face_model_path: Optional[str] = None
@@ -55,6 +60,131 @@ class DetectorConfig:
     num_poses: int = 1
     num_faces: int = 1
     running_mode: str = "VIDEO"  # IMAGE, VIDEO, LIVE_STREAM
+    use_roi: bool = False
+    roi_padding: float = 0.25
+    roi_min_visibility: float = 0.5
+    roi_max_side: int = 640
+
+
+# (x0, y0, x1, y1) pixel, x1/y1 exclusive
+Roi = Tuple[int, int, int, int]
+
+
+class RoiTracker:
+    """
+    Theo dõi vùng chứa người từ pose landmarks của frame trước.
+    
+    Box được giữ cố định (hysteresis) khi người vẫn nằm trong vùng an toàn,
+    để ảnh đưa vào MediaPipe ổn định giữa các frame (tracking nội bộ của
+    landmarker không bị nhảy). Mất tracking -> quay về full frame.
+    
+    Example:
+        >>> tracker = RoiTracker(padding=0.25)
+        >>> roi = tracker.get_roi(1280, 720)  # None = full frame
+        >>> tracker.update(result.pose_landmarks, 1280, 720)
+    """
+    
+    # Box nhỏ hơn tỉ lệ này so với frame thì không đáng để crop
+    MIN_GAIN = 0.85
+    
+    def __init__(self, padding: float = 0.25, min_visibility: float = 0.5):
+        self.padding = padding
+        self.min_visibility = min_visibility
+        self._roi: Optional[Roi] = None
+        
+        # Metrics
+        self.roi_frames = 0
+        self.full_frames = 0
+        self.losses = 0
+    
+    def get_roi(self, frame_width: int, frame_height: int) -> Optional[Roi]:
+        """ROI cho frame tiếp theo (None = full frame)."""
+        roi = self._roi
+        if roi is not None and (roi[2] > frame_width or roi[3] > frame_height):
+            # Đổi độ phân giải giữa chừng
+            roi = self._roi = None
+        if roi is None:
+            self.full_frames += 1
+        else:
+            self.roi_frames += 1
+        return roi
+    
+    def update(
+        self,
+        landmarks: Optional[LandmarkSet],
+        frame_width: int,
+        frame_height: int
+    ) -> None:
+        """
+        Cập nhật ROI từ pose landmarks (full-frame normalized).
+        
+        Args:
+            landmarks: Pose landmarks vừa detect, None nếu mất pose.
+            frame_width: Chiều rộng frame gốc.
+            frame_height: Chiều cao frame gốc.
+        """
+        box = self._landmark_box(landmarks, frame_width, frame_height)
+        if box is None:
+            if self._roi is not None:
+                self.losses += 1
+            self._roi = None
+            return
+        
+        bx0, by0, bx1, by1 = box
+        roi = self._roi
+        if roi is not None:
+            # Giữ nguyên ROI khi box còn nằm trong vùng an toàn (nửa padding)
+            mx = (roi[2] - roi[0]) * self.padding / (2 * (1 + 2 * self.padding))
+            my = (roi[3] - roi[1]) * self.padding / (2 * (1 + 2 * self.padding))
+            if (bx0 >= roi[0] + mx and by0 >= roi[1] + my
+                    and bx1 <= roi[2] - mx and by1 <= roi[3] - my):
+                return
+        
+        pad_x = (bx1 - bx0) * self.padding
+        pad_y = (by1 - by0) * self.padding
+        x0 = max(0, int(bx0 - pad_x))
+        y0 = max(0, int(by0 - pad_y))
+        x1 = min(frame_width, int(bx1 + pad_x) + 1)
+        y1 = min(frame_height, int(by1 + pad_y) + 1)
+        
+        if (x1 - x0) * (y1 - y0) >= self.MIN_GAIN * frame_width * frame_height:
+            self._roi = None
+        else:
+            self._roi = (x0, y0, x1, y1)
+    
+    def _landmark_box(
+        self,
+        landmarks: Optional[LandmarkSet],
+        frame_width: int,
+        frame_height: int
+    ) -> Optional[Tuple[float, float, float, float]]:
+        """Bounding box pixel của các landmark đủ visibility."""
+        if landmarks is None or len(landmarks) == 0:
+            return None
+        
+        xy = landmarks.data[landmarks.get_visibility_mask(self.min_visibility), :2]
+        
+        # Quá ít điểm tin cậy -> coi như mất tracking
+        if xy.shape[0] < 4:
+            return None
+        
+        (x0, y0), (x1, y1) = xy.min(axis=0), xy.max(axis=0)
+        return (
+            float(x0) * frame_width, float(y0) * frame_height,
+            float(x1) * frame_width, float(y1) * frame_height,
+        )
+    
+    def reset(self) -> None:
+        """Quay về full frame."""
+        self._roi = None
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Số frame crop / full frame / số lần mất tracking."""
+        return {
+            "roi_frames": self.roi_frames,
+            "full_frames": self.full_frames,
+            "losses": self.losses,
+        }
 
 
 class VisionDetector:
@@ -88,6 +218,19 @@ class VisionDetector:
         self._face_landmarker: Optional[mp_vision.FaceLandmarker] = None
         self._frame_count = 0
         
+        # Timestamp rebasing: MediaPipe VIDEO mode needs strictly increasing
+        # timestamps for the lifetime of a landmarker, even across sessions
+        self._last_timestamp_ms = -1
+        self._timestamp_offset: Optional[int] = 0
+        
+        # ROI crop theo pose frame trước (chỉ khi bật use_roi)
+        self._roi_tracker: Optional[RoiTracker] = None
+        if config.use_roi:
+            self._roi_tracker = RoiTracker(
+                padding=config.roi_padding,
+                min_visibility=config.roi_min_visibility,
+            )
+        
         self._init_pose_landmarker()
         self._init_face_landmarker()
     
@@ -162,7 +305,8 @@ class VisionDetector:
         self,
         landmarks,
         landmark_type: LandmarkType,
-        timestamp_ms: int
+        timestamp_ms: int,
+        transform: Optional[Tuple[float, float, float, float]] = None
     ) -> LandmarkSet:
         """
         Chuyển đổi MediaPipe landmarks sang LandmarkSet.
@@ -171,45 +315,67 @@ class VisionDetector:
             landmarks: MediaPipe NormalizedLandmarkList hoặc tương tự.
             landmark_type: Loại landmark.
             timestamp_ms: Timestamp của frame.
+            transform: (offset_x, offset_y, scale_x, scale_y) để map tọa độ
+                       normalized của ảnh crop về full frame, None = giữ nguyên.
             
         Returns:
-            LandmarkSet chứa các Point3D.
+            LandmarkSet (mảng (N, 5) float32).
         """
-        points = []
-        for lm in landmarks:
-            point = Point3D(
-                x=lm.x,
-                y=lm.y,
-                z=lm.z,
-                visibility=getattr(lm, 'visibility', None),
-                presence=getattr(lm, 'presence', None),
-            )
-            points.append(point)
+        ox, oy, sx, sy = transform or (0.0, 0.0, 1.0, 1.0)
+        nan = float("nan")
+        # Một tuple mỗi điểm (không tạo Point3D), biến đổi tọa độ trên cả mảng
+        data = np.array(
+            [
+                (lm.x, lm.y, lm.z,
+                 nan if getattr(lm, 'visibility', None) is None else lm.visibility,
+                 nan if getattr(lm, 'presence', None) is None else lm.presence)
+                for lm in landmarks
+            ],
+            dtype=np.float32
+        ).reshape(-1, 5)
+        if transform is not None:
+            data[:, 0] = ox + data[:, 0] * sx
+            data[:, 1] = oy + data[:, 1] * sy
+            data[:, 2] *= sx  # z cùng thang đo với x (theo chiều rộng ảnh)
         
-        return LandmarkSet(
-            landmarks=points,
-            landmark_type=landmark_type,
-            timestamp_ms=timestamp_ms,
-        )
+        return LandmarkSet(data, landmark_type, timestamp_ms)
+    
+    @property
+    def has_pose_model(self) -> bool:
+        """Detector có pose landmarker hay không."""
+        return self._pose_landmarker is not None
+    
+    @property
+    def has_face_model(self) -> bool:
+        """Detector có face landmarker hay không."""
+        return self._face_landmarker is not None
     
     def process_frame(
         self,
         image: np.ndarray,
-        timestamp_ms: Optional[int] = None
+        timestamp_ms: Optional[int] = None,
+        run_pose: bool = True,
+        run_face: bool = True,
+        rgb: bool = False
     ) -> DetectionResult:
         """
         Xử lý một frame ảnh và trả về detection results.
         
         Args:
-            image: Ảnh BGR từ OpenCV, shape (H, W, 3).
+            image: Ảnh BGR từ OpenCV (hoặc RGB nếu ``rgb``), shape (H, W, 3).
             timestamp_ms: Timestamp tính bằng milliseconds.
                          Nếu None, sẽ tự động tính từ frame count.
+            run_pose: Chạy pose landmarker cho frame này.
+            run_face: Chạy face landmarker cho frame này (bỏ qua để
+                      tiết kiệm inference khi không cần phân tích khuôn mặt).
+            rgb: Ảnh đã ở dạng RGB (decode thẳng ra RGB), bỏ bước
+                 chuyển BGR -> RGB (một lần cấp phát + copy cả frame).
         
         Returns:
             DetectionResult chứa pose và face landmarks.
             
         Note:
-            - Ảnh đầu vào phải ở định dạng BGR (từ OpenCV).
+            - Ảnh đầu vào mặc định ở định dạng BGR (từ OpenCV).
             - Landmarks trả về là normalized coordinates (0-1).
             - World landmarks có đơn vị meters với gốc tại hip center.
         """
@@ -223,25 +389,35 @@ class VisionDetector:
         if timestamp_ms is None:
             timestamp_ms = int(self._frame_count * (1000 / 30))  # Giả sử 30 FPS
         self._frame_count += 1
+        mp_timestamp_ms = self._to_landmarker_timestamp(timestamp_ms)
         
         frame_height, frame_width = image.shape[:2]
         
-        # Convert BGR to RGB cho MediaPipe
-        image_rgb = image[:, :, ::-1].copy()
-        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=image_rgb)
+        # Crop theo ROI (nếu có) + convert BGR to RGB cho MediaPipe
+        started = time.perf_counter()
+        roi = None
+        if self._roi_tracker is not None and run_pose:
+            roi = self._roi_tracker.get_roi(frame_width, frame_height)
+        mp_image, transform = self._prepare_image(image, roi, rgb)
+        
+        # Thời gian từng stage (ms) cho metrics
+        timings: Dict[str, float] = {}
+        stage_end = time.perf_counter()
+        timings["rgb_convert"] = (stage_end - started) * 1000.0
         
         result = DetectionResult(
             frame_width=frame_width,
             frame_height=frame_height,
             timestamp_ms=timestamp_ms,
             is_valid=True,
+            timings=timings,
         )
         
         # Process Pose
-        if self._pose_landmarker is not None:
+        if run_pose and self._pose_landmarker is not None:
             try:
                 pose_result = self._pose_landmarker.detect_for_video(
-                    mp_image, timestamp_ms
+                    mp_image, mp_timestamp_ms
                 )
                 
                 if pose_result.pose_landmarks and len(pose_result.pose_landmarks) > 0:
@@ -249,7 +425,8 @@ class VisionDetector:
                     result.pose_landmarks = self._convert_landmarks_to_set(
                         pose_result.pose_landmarks[0],
                         LandmarkType.POSE,
-                        timestamp_ms
+                        timestamp_ms,
+                        transform
                     )
                     
                     # World landmarks (real-world 3D coordinates)
@@ -261,25 +438,35 @@ class VisionDetector:
                         )
             except Exception as e:
                 result.error_message = f"Pose detection error: {str(e)}"
+            
+            # ROI cho frame sau (mất pose -> full frame)
+            if self._roi_tracker is not None:
+                self._roi_tracker.update(result.pose_landmarks, frame_width, frame_height)
+            
+            started, stage_end = stage_end, time.perf_counter()
+            timings["pose_inference"] = (stage_end - started) * 1000.0
         
         # Process Face
-        if self._face_landmarker is not None:
+        if run_face and self._face_landmarker is not None:
             try:
                 face_result = self._face_landmarker.detect_for_video(
-                    mp_image, timestamp_ms
+                    mp_image, mp_timestamp_ms
                 )
                 
                 if face_result.face_landmarks and len(face_result.face_landmarks) > 0:
                     result.face_landmarks = self._convert_landmarks_to_set(
                         face_result.face_landmarks[0],
                         LandmarkType.FACE,
-                        timestamp_ms
+                        timestamp_ms,
+                        transform
                     )
             except Exception as e:
                 if result.error_message:
                     result.error_message += f"; Face detection error: {str(e)}"
                 else:
                     result.error_message = f"Face detection error: {str(e)}"
+            
+            timings["face_inference"] = (time.perf_counter() - stage_end) * 1000.0
         
         # Đánh dấu valid nếu có ít nhất một detection
         result.is_valid = result.has_pose() or result.has_face()
@@ -359,9 +546,84 @@ class VisionDetector:
         
         return result
     
+    def _prepare_image(
+        self,
+        image: np.ndarray,
+        roi: Optional[Roi] = None,
+        rgb: bool = False
+    ) -> Tuple["mp.Image", Optional[Tuple[float, float, float, float]]]:
+        """
+        Crop theo ROI, thu nhỏ (khi bật use_roi) và chuyển BGR -> RGB
+        (ảnh RGB chỉ copy khi crop không liên tục trong bộ nhớ).
+        
+        Returns:
+            (mp.Image, transform) - transform map tọa độ crop về full frame,
+            None nếu dùng full frame.
+        """
+        frame_height, frame_width = image.shape[:2]
+        transform = None
+        
+        if roi is not None:
+            x0, y0, x1, y1 = roi
+            image = image[y0:y1, x0:x1]
+            transform = (
+                x0 / frame_width,
+                y0 / frame_height,
+                (x1 - x0) / frame_width,
+                (y1 - y0) / frame_height,
+            )
+        
+        # Landmarks normalized nên resize không cần map lại tọa độ
+        max_side = self._config.roi_max_side
+        if self._roi_tracker is not None and max_side > 0:
+            height, width = image.shape[:2]
+            scale = max_side / max(height, width)
+            if scale < 1.0:
+                image = cv2.resize(
+                    image,
+                    (max(1, int(width * scale)), max(1, int(height * scale))),
+                    interpolation=cv2.INTER_AREA,
+                )
+        
+        if rgb:
+            image_rgb = np.ascontiguousarray(image)
+        else:
+            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        return mp.Image(image_format=mp.ImageFormat.SRGB, data=image_rgb), transform
+    
+    def get_roi_stats(self) -> Optional[Dict[str, int]]:
+        """Thống kê ROI tracker (None nếu không bật use_roi)."""
+        if self._roi_tracker is None:
+            return None
+        return self._roi_tracker.get_stats()
+    
+    def _to_landmarker_timestamp(self, timestamp_ms: int) -> int:
+        """
+        Map caller timestamp sang timestamp tăng dần cho landmarker.
+        
+        Sau reset(), frame đầu tiên được rebase ngay sau timestamp cuối cùng
+        mà landmarker đã thấy, nên detector có thể tái sử dụng cho session mới
+        (timestamp bắt đầu lại từ đầu) mà không phải load lại model.
+        """
+        if self._timestamp_offset is None:
+            self._timestamp_offset = (self._last_timestamp_ms + 1) - timestamp_ms
+        
+        mp_timestamp_ms = timestamp_ms + self._timestamp_offset
+        if mp_timestamp_ms <= self._last_timestamp_ms:
+            mp_timestamp_ms = self._last_timestamp_ms + 1
+        self._last_timestamp_ms = mp_timestamp_ms
+        return mp_timestamp_ms
+    
     def reset(self) -> None:
-        """Reset frame counter và internal state."""
+        """
+        Reset frame counter và timestamp state.
+        
+        Gọi khi detector được trả về pool / giao cho session khác.
+        """
         self._frame_count = 0
+        self._timestamp_offset = None
+        if self._roi_tracker is not None:
+            self._roi_tracker.reset()
     
     def close(self) -> None:
         """Giải phóng tài nguyên."""
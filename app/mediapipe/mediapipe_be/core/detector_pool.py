@@ -0,0 +1,213 @@
+"""
+Detector Pool Module for MEMOTION.
+
+Pool VisionDetector dùng chung trong process: model .task chỉ load một lần
+(pre-warm lúc startup), session mượn detector (lease) và trả lại (release)
+khi kết thúc. Detector được reset timestamp state trước khi giao cho
+session khác, nên frame đầu tiên của session mới không bị stall vì load model.
+
+Example:
+    >>> pool = get_detector_pool(config, max_size=8)
+    >>> pool.prewarm(2)
+    >>> detector = pool.lease(timeout=5.0)
+    >>> try:
+    ...     result = detector.process_frame(frame, timestamp_ms)
+    ... finally:
+    ...     pool.release(detector)
+
+Author: MEMOTION Team
+Version: 1.0.0
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .detector import VisionDetector, DetectorConfig
+
+
+class DetectorPoolExhausted(RuntimeError):
+    """Không còn detector rảnh và pool đã đạt max_size."""
+
+
+class DetectorPool:
+    """
+    Pool VisionDetector thread-safe với lease/release.
+
+    Attributes:
+        max_size: Số detector tối đa (idle + đang cho mượn).
+    """
+
+    def __init__(self, config: DetectorConfig, max_size: int = 4):
+        """
+        Khởi tạo pool (chưa load model nào).
+
+        Args:
+            config: Cấu hình dùng để tạo mọi detector trong pool.
+            max_size: Số detector tối đa.
+        """
+        self._config = config
+        self.max_size = max(1, max_size)
+        self._idle: List[VisionDetector] = []
+        self._leased = 0
+        self._cond = threading.Condition()
+
+        # Metrics
+        self._created = 0
+        self._total_leases = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_time_s = 0.0
+        self._peak_leased = 0
+
+    @property
+    def size(self) -> int:
+        """Tổng số detector đã tạo (idle + leased)."""
+        return len(self._idle) + self._leased
+
+    def prewarm(self, count: int) -> int:
+        """
+        Load trước ``count`` detector (không vượt max_size).
+
+        Returns:
+            int: Số detector đã tạo thêm.
+        """
+        created = 0
+        while True:
+            with self._cond:
+                if self.size >= min(count, self.max_size):
+                    break
+                # Giữ chỗ trước khi load model (load ngoài lock)
+                self._leased += 1
+            try:
+                detector = VisionDetector(self._config)
+            except Exception:
+                with self._cond:
+                    self._leased -= 1
+                raise
+            with self._cond:
+                self._leased -= 1
+                self._created += 1
+                self._idle.append(detector)
+                self._cond.notify()
+            created += 1
+        return created
+
+    def lease(self, timeout: Optional[float] = None) -> VisionDetector:
+        """
+        Mượn một detector.
+
+        Dùng detector idle nếu có, tạo mới nếu chưa đạt max_size,
+        ngược lại chờ tối đa ``timeout`` giây.
+
+        Raises:
+            DetectorPoolExhausted: Hết detector sau khi chờ timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        wait_start = None
+
+        with self._cond:
+            while not self._idle and self.size >= self.max_size:
+                if wait_start is None:
+                    wait_start = time.monotonic()
+                    self._waits += 1
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._timeouts += 1
+                    raise DetectorPoolExhausted(
+                        f"Detector pool exhausted ({self.max_size} detectors in use)"
+                    )
+                self._cond.wait(remaining)
+
+            if wait_start is not None:
+                self._wait_time_s += time.monotonic() - wait_start
+
+            detector = self._idle.pop() if self._idle else None
+            self._leased += 1
+            self._total_leases += 1
+            self._peak_leased = max(self._peak_leased, self._leased)
+
+        if detector is None:
+            try:
+                detector = VisionDetector(self._config)
+            except Exception:
+                with self._cond:
+                    self._leased -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._created += 1
+
+        return detector
+
+    def release(self, detector: VisionDetector) -> None:
+        """Trả detector về pool (reset timestamp state)."""
+        detector.reset()
+        with self._cond:
+            self._leased = max(0, self._leased - 1)
+            self._idle.append(detector)
+            self._cond.notify()
+
+    def get_stats(self) -> Dict[str, float]:
+        """Thống kê sử dụng pool."""
+        with self._cond:
+            return {
+                "max_size": self.max_size,
+                "size": self.size,
+                "idle": len(self._idle),
+                "leased": self._leased,
+                "peak_leased": self._peak_leased,
+                "utilization": round(self._leased / self.max_size, 3),
+                "created": self._created,
+                "total_leases": self._total_leases,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "total_wait_seconds": round(self._wait_time_s, 3),
+            }
+
+    def close(self) -> None:
+        """Giải phóng các detector idle."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for detector in idle:
+            detector.close()
+
+
+# ==================== PROCESS-WIDE POOLS ====================
+
+_pools: Dict[Tuple, DetectorPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_detector_pool(config: DetectorConfig, max_size: int = 4) -> DetectorPool:
+    """
+    Lấy pool dùng chung trong process cho một cấu hình detector.
+
+    Pool được tạo lần đầu với ``max_size``; các lần gọi sau trả về
+    cùng pool (mỗi shard worker process có pool riêng của nó).
+    """
+    key = (
+        config.pose_model_path,
+        config.face_model_path,
+        config.running_mode.upper(),
+        config.num_poses,
+        config.num_faces,
+        config.use_roi,
+        config.roi_max_side,
+    )
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = DetectorPool(config, max_size=max_size)
+            _pools[key] = pool
+        return pool
+
+
+def get_detector_pool_stats() -> Dict[str, Dict[str, float]]:
+    """Thống kê tất cả pool trong process, key theo tên model."""
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {
+        f"{key[0]}|{key[1]}|{key[2]}": pool.get_stats()
+        for key, pool in pools
+    }
@@ -4,6 +4,7 @@ Kinematics Module for MEMOTION.
 Cung cấp các hàm tính toán động học cơ bản:
 - Tính góc giữa 3 điểm trong không gian 3D
 - Tính góc các khớp cơ thể từ pose landmarks
+- Tính góc tất cả khớp cho một frame / chuỗi frame (vector hóa)
 
 Công thức toán học:
     Góc giữa 3 điểm A, B, C (với B là đỉnh góc):
@@ -19,7 +20,7 @@ Version: 1.0.0
 """
 
 from dataclasses import dataclass
-from typing import Union, Tuple, Dict, List, Optional
+from typing import Union, Tuple, Dict, List, Optional, Sequence
 from enum import Enum
 import numpy as np
 
@@ -145,6 +146,79 @@ JOINT_DEFINITIONS: Dict[JointType, JointDefinition] = {
 }
 
 
+# Thứ tự khớp mặc định của compute_joint_angles (theo JOINT_DEFINITIONS)
+JOINT_ORDER: Tuple[JointType, ...] = tuple(JOINT_DEFINITIONS.keys())
+
+# Cache index (proximal, vertex, distal) theo tuple khớp; -1 = khớp chưa định nghĩa
+_JOINT_INDEX_CACHE: Dict[Tuple[JointType, ...], Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+
+def _joint_indices(joints: Tuple[JointType, ...]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Mảng index (proximal, vertex, distal) cho một tuple khớp (tính một lần)."""
+    indices = _JOINT_INDEX_CACHE.get(joints)
+    if indices is None:
+        rows = [
+            (int(d.proximal), int(d.vertex), int(d.distal)) if d is not None else (-1, -1, -1)
+            for d in (JOINT_DEFINITIONS.get(joint) for joint in joints)
+        ]
+        table = np.array(rows, dtype=np.intp).reshape(-1, 3)
+        indices = _JOINT_INDEX_CACHE[joints] = (table[:, 0], table[:, 1], table[:, 2])
+    return indices
+
+
+def compute_joint_angles(
+    landmarks: Union[np.ndarray, LandmarkSet],
+    joints: Optional[Sequence[JointType]] = None,
+    use_3d: bool = True
+) -> np.ndarray:
+    """
+    Tính góc của nhiều khớp cùng lúc (vector hóa, không vòng lặp Python).
+    
+    Cùng công thức với calculate_angle, áp dụng cho mọi bộ ba
+    (proximal, vertex, distal) trong một biểu thức NumPy, cho một frame
+    hoặc cả chuỗi frame.
+    
+    Args:
+        landmarks: Shape (N, 3+) một frame, (T, N, 3+) nhiều frame, hoặc LandmarkSet.
+        joints: Danh sách khớp (None = JOINT_ORDER).
+        use_3d: Sử dụng tọa độ 3D hay 2D.
+        
+    Returns:
+        np.ndarray: Góc (degrees) shape (J,) hoặc (T, J). NaN cho khớp không
+        tính được: điểm trùng nhau, landmark NaN, index ngoài N hoặc khớp
+        không có trong JOINT_DEFINITIONS.
+        
+    Example:
+        >>> angles = compute_joint_angles(landmarks)        # (8,)
+        >>> series = compute_joint_angles(video_landmarks)  # (T, 8)
+        >>> dict(zip(JOINT_ORDER, angles))
+    """
+    if isinstance(landmarks, LandmarkSet):
+        landmarks = landmarks.to_numpy()
+    points = np.asarray(landmarks, dtype=np.float64)
+    points = points[..., :3] if use_3d else points[..., :2]
+    
+    proximal, vertex, distal = _joint_indices(JOINT_ORDER if joints is None else tuple(joints))
+    
+    # Khớp không định nghĩa / thiếu landmark: tính trên index 0 rồi gán NaN
+    valid = (vertex >= 0) & (np.maximum(np.maximum(proximal, vertex), distal) < points.shape[-2])
+    if not valid.all():
+        proximal, vertex, distal = (np.where(valid, idx, 0) for idx in (proximal, vertex, distal))
+    
+    vector_ba = points[..., proximal, :] - points[..., vertex, :]
+    vector_bc = points[..., distal, :] - points[..., vertex, :]
+    norm_ba = np.linalg.norm(vector_ba, axis=-1)
+    norm_bc = np.linalg.norm(vector_bc, axis=-1)
+    dot_product = np.einsum("...k,...k->...", vector_ba, vector_bc)
+    
+    # Điểm trùng nhau (như ValueError của calculate_angle) -> NaN
+    degenerate = (norm_ba < 1e-10) | (norm_bc < 1e-10) | ~valid
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cos_angle = np.clip(dot_product / (norm_ba * norm_bc), -1.0, 1.0)
+    angles = np.degrees(np.arccos(cos_angle))
+    return np.where(degenerate, np.nan, angles)
+
+
 def calculate_angle(
     point_a: Union[np.ndarray, Point3D, Tuple[float, float, float]],
     point_b: Union[np.ndarray, Point3D, Tuple[float, float, float]],
@@ -297,21 +371,15 @@ def calculate_joint_angle(
         >>> # Tính góc khuỷu tay trái
         >>> angle = calculate_joint_angle(landmarks, JointType.LEFT_ELBOW)
     """
-    # Chuyển đổi LandmarkSet sang numpy nếu cần
-    if isinstance(landmarks, LandmarkSet):
-        landmarks = landmarks.to_numpy()
-    
-    # Lấy định nghĩa khớp
-    joint_def = JOINT_DEFINITIONS.get(joint_type)
-    if joint_def is None:
+    if joint_type not in JOINT_DEFINITIONS:
         raise ValueError(f"Joint type {joint_type} not defined")
     
-    # Trích xuất 3 điểm
-    point_a = landmarks[joint_def.proximal]
-    point_b = landmarks[joint_def.vertex]
-    point_c = landmarks[joint_def.distal]
-    
-    return calculate_angle(point_a, point_b, point_c, use_3d)
+    angle = compute_joint_angles(landmarks, (joint_type,), use_3d)[0]
+    if np.isnan(angle):
+        raise ValueError(
+            f"Không thể tính góc {joint_type.value}: landmark thiếu, NaN hoặc trùng nhau."
+        )
+    return float(angle)
 
 
 def calculate_all_joint_angles(
@@ -331,18 +399,15 @@ def calculate_all_joint_angles(
         Dict[JointType, float]: Mapping từ loại khớp đến góc.
     """
     if joints is None:
-        joints = list(JOINT_DEFINITIONS.keys())
-    
-    results = {}
-    for joint_type in joints:
-        try:
-            angle = calculate_joint_angle(landmarks, joint_type, use_3d)
-            results[joint_type] = angle
-        except (ValueError, IndexError):
-            # Skip joints that can't be calculated
-            pass
-    
-    return results
+        joints = JOINT_ORDER
+    
+    angles = compute_joint_angles(landmarks, joints, use_3d)
+    # Bỏ qua các khớp không tính được (NaN)
+    return {
+        joint_type: angle
+        for joint_type, angle in zip(joints, angles.tolist())
+        if angle == angle
+    }
 
 
 def _to_numpy(
@@ -0,0 +1,147 @@
+"""
+Landmark Codec Module for MEMOTION.
+
+Mã hoá pose landmarks gửi cho client để vẽ skeleton overlay.
+
+Formats:
+    none         Không gửi landmarks.
+    full         List dict {"x", "y", "z", "visibility"} (dễ đọc, ~2-3 KB/frame);
+                 khi chọn subset mỗi dict có thêm "index".
+    compact      uint16 fixed-point x/y + uint8 visibility, base64 (~220 B cho 33 điểm).
+    compact_bin  Như compact nhưng raw bytes (dùng với encoding msgpack).
+
+Compact layout (little-endian, 5 bytes/điểm, theo thứ tự ``indices``):
+    x_q: uint16, y_q: uint16, vis_q: uint8
+    x = x_q / 65535 * 2 - 0.5   (phủ [-0.5, 1.5] vì landmark có thể ra ngoài khung)
+    visibility = vis_q / 255
+
+Example:
+    >>> payload = encode_landmarks(result.pose_landmarks, "compact", [11, 12, 13, 14])
+    >>> points = decode_compact_landmarks(payload)  # (4, 3): x, y, visibility
+
+Author: MEMOTION Team
+Version: 1.0.0
+"""
+
+import base64
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .data_types import LandmarkSet, PoseLandmarkIndex
+
+
+LANDMARK_FORMATS = ("none", "full", "compact", "compact_bin")
+
+COMPACT_FORMAT_ID = "u16"
+_COMPACT_DTYPE = np.dtype([("x", "<u2"), ("y", "<u2"), ("v", "u1")])
+_COMPACT_MIN = -0.5
+_COMPACT_RANGE = 2.0
+
+
+def resolve_landmark_indices(
+    joints: Optional[Sequence[Union[int, str]]]
+) -> Optional[List[int]]:
+    """
+    Chuyển danh sách khớp (index hoặc tên, vd "left_elbow") sang index.
+
+    Returns:
+        List[int] hoặc None (= cả 33 điểm).
+
+    Raises:
+        ValueError: Tên/index không hợp lệ.
+    """
+    if not joints:
+        return None
+
+    indices = []
+    for joint in joints:
+        if isinstance(joint, str) and not joint.isdigit():
+            index = getattr(PoseLandmarkIndex, joint.upper(), None)
+            if not isinstance(index, int):
+                raise ValueError(f"Unknown pose landmark: {joint}")
+        else:
+            index = int(joint)
+        if not 0 <= index < 33:
+            raise ValueError(f"Pose landmark index out of range: {index}")
+        indices.append(index)
+    return indices
+
+
+def encode_landmarks(
+    landmarks: Optional[LandmarkSet],
+    fmt: str = "compact",
+    indices: Optional[Sequence[int]] = None
+) -> Any:
+    """
+    Mã hoá pose landmarks theo ``fmt``.
+
+    Args:
+        landmarks: Pose landmarks (full-frame normalized), None nếu không có pose.
+        fmt: Một trong LANDMARK_FORMATS.
+        indices: Subset landmark cần gửi (None = tất cả).
+
+    Returns:
+        list (full), dict (compact / compact_bin), hoặc None.
+        Với subset, index gửi kèm là các index thực sự có trong ``landmarks``
+        (khớp với số điểm).
+    """
+    if fmt == "none" or landmarks is None or len(landmarks) == 0:
+        return None
+
+    data = landmarks.data
+    if indices is not None:
+        indices = [i for i in indices if i < len(data)]
+        data = data[indices]
+
+    if fmt == "full":
+        points = [
+            {
+                "x": round(x, 4),
+                "y": round(y, 4),
+                "z": round(z, 4),
+                "visibility": round(v, 3) if v == v else None,  # NaN = không có
+            }
+            for x, y, z, v, _ in data.tolist()
+        ]
+        if indices is not None:
+            for point, index in zip(points, indices):
+                point["index"] = index
+        return points
+
+    xy = data[:, :2]
+    vis = np.nan_to_num(data[:, 3], nan=1.0)
+
+    packed = np.empty(len(data), dtype=_COMPACT_DTYPE)
+    q = np.clip((xy - _COMPACT_MIN) / _COMPACT_RANGE, 0.0, 1.0) * 65535.0
+    packed["x"] = np.rint(q[:, 0])
+    packed["y"] = np.rint(q[:, 1])
+    packed["v"] = np.rint(np.clip(vis, 0.0, 1.0) * 255.0)
+    raw = packed.tobytes()
+
+    payload: Dict[str, Any] = {
+        "fmt": COMPACT_FORMAT_ID,
+        "count": len(data),
+        "data": raw if fmt == "compact_bin" else base64.b64encode(raw).decode("ascii"),
+    }
+    if indices is not None:
+        payload["indices"] = indices
+    return payload
+
+
+def decode_compact_landmarks(payload: Dict[str, Any]) -> np.ndarray:
+    """
+    Giải mã payload compact (tham chiếu cho client / kiểm thử).
+
+    Returns:
+        np.ndarray: Shape (count, 3) - x, y, visibility.
+    """
+    data = payload["data"]
+    raw = data if isinstance(data, (bytes, bytearray)) else base64.b64decode(data)
+    packed = np.frombuffer(raw, dtype=_COMPACT_DTYPE, count=payload["count"])
+
+    out = np.empty((len(packed), 3), dtype=np.float32)
+    out[:, 0] = packed["x"] / 65535.0 * _COMPACT_RANGE + _COMPACT_MIN
+    out[:, 1] = packed["y"] / 65535.0 * _COMPACT_RANGE + _COMPACT_MIN
+    out[:, 2] = packed["v"] / 255.0
+    return out
@@ -0,0 +1,222 @@
+"""
+Landmark Predictor Module for MEMOTION.
+
+Keyframe inference: MediaPipe chỉ chạy mỗi N frame, các frame ở giữa
+dùng landmarks dự đoán bởi bộ lọc Kalman vận tốc không đổi
+(constant-velocity) cho từng toạ độ.
+
+N được điều chỉnh theo vận tốc góc của khớp chính (compute_angle_velocity):
+chuyển động chậm -> N lớn, chuyển động nhanh -> detect mọi frame.
+
+Example:
+    >>> predictor = LandmarkPredictor()
+    >>> scheduler = KeyframeScheduler(max_interval=3)
+    >>> if scheduler.should_detect() or not predictor.is_ready:
+    ...     landmarks = detector.process_frame(frame, ts).pose_landmarks.to_numpy()
+    ...     predictor.update(landmarks, ts)
+    ...     scheduler.observe(angle, ts)
+    ... else:
+    ...     landmarks = predictor.predict(ts)
+
+Author: MEMOTION Team
+Version: 1.0.0
+"""
+
+from collections import deque
+from typing import Deque, Dict, Optional
+
+import numpy as np
+
+from .kinematics import compute_angle_velocity
+
+
+class LandmarkPredictor:
+    """
+    Kalman filter vận tốc không đổi, vector hoá cho N landmarks x 3 trục.
+
+    Mỗi toạ độ là một filter 1D độc lập với state [vị trí, vận tốc];
+    covariance 2x2 lưu dưới dạng 3 mảng (p00, p01, p11) shape (N, 3).
+
+    Attributes:
+        last_error: Sai số dự đoán (trung bình khoảng cách 2D, normalized)
+            đo ở keyframe gần nhất.
+    """
+
+    def __init__(
+        self,
+        process_noise: float = 50.0,
+        measurement_noise: float = 1e-5,
+        max_extrapolation_ms: int = 500
+    ):
+        """
+        Args:
+            process_noise: Phương sai gia tốc (đơn vị normalized/s^2).
+            measurement_noise: Phương sai đo của MediaPipe (normalized^2).
+            max_extrapolation_ms: Không ngoại suy xa hơn mức này.
+        """
+        self.q = process_noise
+        self.r = measurement_noise
+        self.max_extrapolation_ms = max_extrapolation_ms
+        self.reset()
+
+    def reset(self) -> None:
+        """Xoá state (session mới / mất pose)."""
+        self._pos: Optional[np.ndarray] = None
+        self._vel: Optional[np.ndarray] = None
+        self._p00 = self._p01 = self._p11 = None
+        self._ts_ms: Optional[int] = None
+
+        self.last_error: Optional[float] = None
+        self._error_sum = 0.0
+        self._error_count = 0
+
+    @property
+    def is_ready(self) -> bool:
+        """Đã có ít nhất một keyframe để dự đoán."""
+        return self._pos is not None
+
+    def predict(self, timestamp_ms: int) -> np.ndarray:
+        """
+        Ngoại suy landmarks tại ``timestamp_ms`` (không thay đổi state).
+
+        Returns:
+            np.ndarray: Shape (N, 3).
+        """
+        dt = self._dt_seconds(timestamp_ms)
+        return self._pos + self._vel * dt
+
+    def update(self, landmarks: np.ndarray, timestamp_ms: int) -> None:
+        """
+        Hiệu chỉnh filter bằng landmarks đo được ở keyframe.
+
+        Args:
+            landmarks: Shape (N, 3), normalized coordinates.
+            timestamp_ms: Timestamp keyframe.
+        """
+        z = np.asarray(landmarks, dtype=np.float64)
+
+        if self._pos is None or self._pos.shape != z.shape:
+            self._pos = z.copy()
+            self._vel = np.zeros_like(z)
+            self._p00 = np.full_like(z, self.r)
+            self._p01 = np.zeros_like(z)
+            self._p11 = np.full_like(z, 1.0)
+            self._ts_ms = timestamp_ms
+            return
+
+        dt = self._dt_seconds(timestamp_ms)
+
+        # Predict
+        pos = self._pos + self._vel * dt
+        q = self.q
+        p00 = self._p00 + dt * (2 * self._p01 + dt * self._p11) + q * dt ** 4 / 4
+        p01 = self._p01 + dt * self._p11 + q * dt ** 3 / 2
+        p11 = self._p11 + q * dt ** 2
+
+        # Sai số dự đoán (chỉ x, y) - cho monitoring
+        error = float(np.mean(np.linalg.norm(pos[:, :2] - z[:, :2], axis=1)))
+        self.last_error = error
+        self._error_sum += error
+        self._error_count += 1
+
+        # Correct
+        s = p00 + self.r
+        k0 = p00 / s
+        k1 = p01 / s
+        innovation = z - pos
+        self._pos = pos + k0 * innovation
+        self._vel = self._vel + k1 * innovation
+        self._p00 = (1 - k0) * p00
+        self._p01 = (1 - k0) * p01
+        self._p11 = p11 - k1 * p01
+        self._ts_ms = timestamp_ms
+
+    def _dt_seconds(self, timestamp_ms: int) -> float:
+        dt_ms = timestamp_ms - self._ts_ms
+        return max(0, min(dt_ms, self.max_extrapolation_ms)) / 1000.0
+
+    def get_stats(self) -> Dict[str, Optional[float]]:
+        """Sai số dự đoán gần nhất / trung bình."""
+        mean_error = self._error_sum / self._error_count if self._error_count else None
+        return {
+            "last_error": self.last_error,
+            "mean_error": mean_error,
+            "keyframes": self._error_count,
+        }
+
+
+class KeyframeScheduler:
+    """
+    Quyết định frame nào chạy MediaPipe (keyframe).
+
+    Khoảng cách keyframe N nội suy tuyến tính theo |vận tốc góc|:
+    <= velocity_low -> max_interval, >= velocity_high -> 1.
+    """
+
+    def __init__(
+        self,
+        max_interval: int = 3,
+        velocity_low: float = 30.0,
+        velocity_high: float = 120.0,
+        window: int = 3
+    ):
+        """
+        Args:
+            max_interval: N tối đa (1 = detect mọi frame).
+            velocity_low: Vận tốc góc (deg/s) dưới mức này dùng N tối đa.
+            velocity_high: Vận tốc góc (deg/s) trên mức này detect mọi frame.
+            window: Số keyframe gần nhất dùng để ước lượng vận tốc.
+        """
+        self.max_interval = max(1, max_interval)
+        self.velocity_low = velocity_low
+        self.velocity_high = max(velocity_high, velocity_low + 1e-6)
+        self._angles: Deque[float] = deque(maxlen=max(2, window))
+        self._timestamps: Deque[int] = deque(maxlen=max(2, window))
+        self._frames_since_keyframe = 0
+        self.interval = 1
+
+        # Metrics
+        self.keyframes = 0
+        self.predicted_frames = 0
+
+    def should_detect(self) -> bool:
+        """True nếu frame hiện tại phải chạy MediaPipe."""
+        if self._frames_since_keyframe + 1 >= self.interval:
+            self._frames_since_keyframe = 0
+            self.keyframes += 1
+            return True
+        self._frames_since_keyframe += 1
+        self.predicted_frames += 1
+        return False
+
+    def force_keyframe(self) -> None:
+        """Frame sau bắt buộc detect (vd. predictor chưa sẵn sàng)."""
+        self._frames_since_keyframe = self.interval
+
+    def observe(self, angle: float, timestamp_ms: int) -> None:
+        """Cập nhật N từ góc khớp chính đo ở keyframe."""
+        self._angles.append(angle)
+        self._timestamps.append(timestamp_ms)
+
+        velocities = compute_angle_velocity(list(self._angles), list(self._timestamps))
+        if not velocities:
+            self.interval = 1
+            return
+
+        speed = max(abs(v) for v in velocities)
+        ratio = (speed - self.velocity_low) / (self.velocity_high - self.velocity_low)
+        ratio = min(1.0, max(0.0, ratio))
+        self.interval = max(1, int(round(self.max_interval - ratio * (self.max_interval - 1))))
+
+    def reset(self) -> None:
+        self._angles.clear()
+        self._timestamps.clear()
+        self._frames_since_keyframe = 0
+        self.interval = 1
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "interval": self.interval,
+            "keyframes": self.keyframes,
+            "predicted_frames": self.predicted_frames,
+        }
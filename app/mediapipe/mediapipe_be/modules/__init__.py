@@ -5,6 +5,7 @@ Chứa các module chức năng:
 - calibration: Safe-Max Calibration cho người già
 - target_generator: Cá nhân hóa mục tiêu bài tập
 - video_engine: Smart Video Player
+- reference_motion: Cache chuyển động mẫu (góc khớp, mốc pha) theo video
 - pain_detection: Nhận diện đau qua FACS
 - scoring: Ma trận chấm điểm đa chiều
 
@@ -37,6 +38,15 @@ from .video_engine import (
     SyncedVideoPlayer,
 )
 
+from .reference_motion import (
+    ReferenceMotion,
+    ReferenceMotionCache,
+    get_reference_motion,
+    get_reference_motion_nowait,
+    get_reference_motion_stats,
+    align_exercise_checkpoints,
+)
+
 from .pain_detection import (
     PainDetector,
     PainLevel,
@@ -73,6 +83,13 @@ __all__ = [
     "PlaybackState",
     "PlaybackStatus",
     "SyncedVideoPlayer",
+    # Reference Motion
+    "ReferenceMotion",
+    "ReferenceMotionCache",
+    "get_reference_motion",
+    "get_reference_motion_nowait",
+    "get_reference_motion_stats",
+    "align_exercise_checkpoints",
     # Pain Detection
     "PainDetector",
     "PainLevel",
@@ -279,7 +279,8 @@ class SafeMaxCalibrator:
     def add_frame(
         self,
         landmarks: LandmarkSet,
-        timestamp_ms: int
+        timestamp_ms: int,
+        angle: Optional[float] = None
     ) -> Tuple[bool, float]:
         """
         Thêm một frame vào quá trình calibration.
@@ -287,6 +288,7 @@ class SafeMaxCalibrator:
         Args:
             landmarks: Pose landmarks từ detector.
             timestamp_ms: Timestamp của frame.
+            angle: Góc khớp đang đo nếu caller đã tính (tránh tính lại).
             
         Returns:
             Tuple[bool, float]: (is_valid, current_angle)
@@ -300,14 +302,11 @@ class SafeMaxCalibrator:
             return False, 0.0
         
         # Tính góc
-        try:
-            angle = calculate_joint_angle(
-                landmarks.to_numpy(),
-                self._current_joint,
-                use_3d=True
-            )
-        except (ValueError, IndexError) as e:
-            return False, 0.0
+        if angle is None:
+            try:
+                angle = calculate_joint_angle(landmarks, self._current_joint, use_3d=True)
+            except (ValueError, IndexError):
+                return False, 0.0
         
         # Ghi nhận timestamp bắt đầu
         if self._start_timestamp is None:
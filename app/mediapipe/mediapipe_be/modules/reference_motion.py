@@ -0,0 +1,520 @@
+"""
+Reference Motion Cache Module for MEMOTION.
+
+Trích xuất chuyển động mẫu từ video bài tập một lần cho mỗi video:
+- Quỹ đạo góc của tất cả khớp (JOINT_ORDER) theo từng frame
+- Các mốc pha (bắt đầu giơ, giữ, bắt đầu hạ, nghỉ) của từng khớp
+- Metadata (fps, số frame thực sự decode được, kích thước)
+
+Kết quả được khóa theo hash nội dung video, lưu thành file ``.npz`` nén
+cạnh video (``exercise.mp4`` -> ``exercise.motion.npz``) và giữ trong
+cache của process. Mọi session dùng cùng video nhận chung một
+ReferenceMotion chỉ đọc, nên Phase 3 không phải decode + chạy pose trên
+video mẫu cho mỗi session.
+
+Session dùng get_reference_motion_nowait(): nếu chưa có trong bộ nhớ thì
+việc đọc .npz / trích xuất chạy ở thread nền và session dùng tỉ lệ mặc định
+của bài tập, không chặn frame (session sau nhận kết quả khi đã xong).
+
+Example:
+    >>> motion = get_reference_motion("./videos/exercise.mp4", create_detector)
+    >>> motion.total_frames, motion.fps
+    >>> motion.joint_angles(JointType.LEFT_SHOULDER)   # (T,) degrees
+    >>> align_exercise_checkpoints(exercise, motion, JointType.LEFT_SHOULDER)
+
+Author: MEMOTION Team
+Version: 1.0.0
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+import numpy as np
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+# Use relative imports when imported from backend
+try:
+    from ..core.kinematics import JointType, JOINT_ORDER, compute_joint_angles
+    from ..core.synchronizer import ExerciseDefinition, MotionPhase
+except ImportError:
+    # Fallback for standalone usage
+    from core.kinematics import JointType, JOINT_ORDER, compute_joint_angles
+    from core.synchronizer import ExerciseDefinition, MotionPhase
+
+logger = logging.getLogger(__name__)
+
+# Tăng khi đổi định dạng / thuật toán trích xuất (file cũ bị trích xuất lại)
+REFERENCE_MOTION_VERSION = 1
+REFERENCE_MOTION_SUFFIX = ".motion.npz"
+
+# Biên độ tối thiểu (degrees) để coi một khớp là có chuyển động trong video
+MIN_MOTION_AMPLITUDE = 15.0
+# Ngưỡng theo biên độ: rời baseline (bắt đầu / kết thúc chuyển động) và gần đỉnh (giữ)
+MOVING_FRACTION = 0.1
+PEAK_FRACTION = 0.9
+# Cửa sổ làm mượt quỹ đạo (giây) và đoạn đầu video dùng làm baseline (giây)
+SMOOTHING_SECONDS = 0.2
+BASELINE_SECONDS = 0.5
+
+# Thứ tự pha của checkpoints[1:] trong create_*_exercise
+_PHASE_SEQUENCE = (MotionPhase.ECCENTRIC, MotionPhase.HOLD, MotionPhase.CONCENTRIC, MotionPhase.IDLE)
+
+
+@dataclass(frozen=True)
+class ReferenceMotion:
+    """
+    Chuyển động mẫu trích xuất từ một video (dùng chung, chỉ đọc).
+
+    Attributes:
+        content_hash: Hash nội dung file video.
+        fps: Frame rate của video.
+        total_frames: Số frame decode được (chính xác hơn CAP_PROP_FRAME_COUNT).
+        width: Chiều rộng frame.
+        height: Chiều cao frame.
+        joints: Thứ tự khớp của các cột ``angles``.
+        angles: Góc khớp shape (T, J) float32, NaN khi frame không có pose.
+        phase_frames: Shape (J, 4) int32: frame bắt đầu giơ, giữ, bắt đầu hạ,
+                      nghỉ của từng khớp; -1 nếu khớp không chuyển động.
+    """
+    content_hash: str
+    fps: float
+    total_frames: int
+    width: int
+    height: int
+    joints: Tuple[JointType, ...]
+    angles: np.ndarray
+    phase_frames: np.ndarray
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.total_frames / self.fps if self.fps > 0 else 0.0
+
+    def joint_angles(self, joint_type: JointType) -> Optional[np.ndarray]:
+        """Quỹ đạo góc (T,) của một khớp, None nếu khớp không được trích xuất."""
+        if joint_type not in self.joints:
+            return None
+        return self.angles[:, self.joints.index(joint_type)]
+
+    def phase_boundaries(self, joint_type: JointType) -> Optional[Tuple[int, int, int, int]]:
+        """(giơ, giữ, hạ, nghỉ) của khớp, None nếu khớp không chuyển động trong video."""
+        if joint_type not in self.joints:
+            return None
+        row = self.phase_frames[self.joints.index(joint_type)]
+        if row[0] < 0:
+            return None
+        return tuple(int(frame) for frame in row)
+
+
+# ==================== TRÍCH XUẤT ====================
+
+def hash_video_file(path: str, chunk_size: int = 1 << 20) -> str:
+    """Hash BLAKE2b (128 bit) của nội dung file."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def detect_phase_frames(angles: np.ndarray, fps: float) -> np.ndarray:
+    """
+    Tìm các mốc pha của từng khớp từ quỹ đạo góc.
+
+    Với mỗi cột: nội suy frame thiếu pose, làm mượt, lấy baseline là trung vị
+    đoạn đầu video. Độ lệch so với baseline đạt đỉnh tại ``peak``:
+        - giơ: frame đầu tiên lệch >= 10% biên độ
+        - giữ: frame đầu tiên lệch >= 90% biên độ
+        - hạ: frame cuối cùng lệch >= 90% biên độ
+        - nghỉ: frame đầu tiên sau đó lệch < 10% biên độ
+
+    Args:
+        angles: Shape (T, J) degrees, NaN = không có pose.
+        fps: Frame rate (để đổi cửa sổ làm mượt / baseline ra frame).
+
+    Returns:
+        np.ndarray: Shape (J, 4) int32, -1 nếu khớp không chuyển động.
+    """
+    total, joints = angles.shape
+    result = np.full((joints, 4), -1, dtype=np.int32)
+    frames = np.arange(total)
+    window = max(1, int(round(fps * SMOOTHING_SECONDS)))
+    baseline_frames = max(1, int(round(fps * BASELINE_SECONDS)))
+
+    for j in range(joints):
+        column = angles[:, j]
+        valid = ~np.isnan(column)
+        if valid.sum() < max(10, total // 5):
+            continue
+
+        filled = np.interp(frames, frames[valid], column[valid])
+        padded = np.pad(filled, (window // 2, window - 1 - window // 2), mode="edge")
+        smooth = np.convolve(padded, np.ones(window) / window, mode="valid")
+
+        deviation = np.abs(smooth - np.median(smooth[:baseline_frames]))
+        peak = int(np.argmax(deviation))
+        amplitude = float(deviation[peak])
+        if amplitude < MIN_MOTION_AMPLITUDE:
+            continue
+
+        moving = deviation >= MOVING_FRACTION * amplitude
+        near_peak = np.flatnonzero(deviation >= PEAK_FRACTION * amplitude)
+        eccentric = int(np.argmax(moving))
+        hold, concentric = int(near_peak[0]), int(near_peak[-1])
+        settled = np.flatnonzero(~moving[concentric:])
+        rest = concentric + int(settled[0]) if settled.size else total - 1
+        result[j] = (eccentric, hold, concentric, rest)
+
+    return result
+
+
+def extract_reference_motion(
+    video_path: str,
+    detector: Any,
+    content_hash: str
+) -> ReferenceMotion:
+    """
+    Decode toàn bộ video, chạy pose trên từng frame và tính góc mọi khớp.
+
+    Args:
+        video_path: Đường dẫn video mẫu.
+        detector: VisionDetector riêng (VIDEO mode, timestamp bắt đầu từ 0).
+        content_hash: Hash nội dung video.
+
+    Returns:
+        ReferenceMotion.
+
+    Raises:
+        RuntimeError: Không mở được video hoặc video không có frame nào.
+    """
+    if cv2 is None:
+        raise RuntimeError("OpenCV not available")
+
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise RuntimeError(f"Cannot open video: {video_path}")
+
+    fps = capture.get(cv2.CAP_PROP_FPS)
+    if fps <= 0:
+        fps = 30.0
+    width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    poses = []
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            result = detector.process_frame(
+                frame, int(len(poses) * 1000 / fps), run_face=False
+            )
+            poses.append(result.pose_landmarks.to_numpy() if result.has_pose() else None)
+    finally:
+        capture.release()
+
+    if not poses:
+        raise RuntimeError(f"No frames decoded from {video_path}")
+
+    # Góc mọi khớp của cả video trong một lần gọi kernel (T, J)
+    landmarks = np.full((len(poses), 33, 3), np.nan, dtype=np.float32)
+    for i, pose in enumerate(poses):
+        if pose is not None:
+            landmarks[i, :pose.shape[0]] = pose[:33]
+    angles = compute_joint_angles(landmarks, JOINT_ORDER).astype(np.float32)
+
+    return _freeze(ReferenceMotion(
+        content_hash=content_hash,
+        fps=float(fps),
+        total_frames=len(poses),
+        width=width,
+        height=height,
+        joints=JOINT_ORDER,
+        angles=angles,
+        phase_frames=detect_phase_frames(angles, fps),
+    ))
+
+
+def _freeze(motion: ReferenceMotion) -> ReferenceMotion:
+    """Khóa ghi các mảng (ReferenceMotion được chia sẻ giữa các session)."""
+    motion.angles.flags.writeable = False
+    motion.phase_frames.flags.writeable = False
+    return motion
+
+
+# ==================== LƯU / ĐỌC .npz ====================
+
+def reference_motion_path(video_path: str) -> Path:
+    """File .npz cạnh video: exercise.mp4 -> exercise.motion.npz."""
+    path = Path(video_path)
+    return path.with_name(path.stem + REFERENCE_MOTION_SUFFIX)
+
+
+def save_reference_motion(motion: ReferenceMotion, path: Path) -> None:
+    """Ghi .npz nén (ghi file tạm rồi rename để worker khác không đọc file dở)."""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                version=np.int32(REFERENCE_MOTION_VERSION),
+                content_hash=np.str_(motion.content_hash),
+                fps=np.float64(motion.fps),
+                total_frames=np.int64(motion.total_frames),
+                size=np.array([motion.width, motion.height], dtype=np.int32),
+                joints=np.array([joint.value for joint in motion.joints]),
+                angles=motion.angles,
+                phase_frames=motion.phase_frames,
+            )
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def load_reference_motion(path: Path, content_hash: str) -> Optional[ReferenceMotion]:
+    """
+    Đọc .npz đã lưu.
+
+    Returns:
+        ReferenceMotion, hoặc None nếu file không có, hỏng, khác version
+        hoặc thuộc về nội dung video khác (video đã bị thay).
+    """
+    if not path.exists():
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["version"]) != REFERENCE_MOTION_VERSION:
+                return None
+            if str(data["content_hash"]) != content_hash:
+                return None
+            width, height = (int(v) for v in data["size"])
+            return _freeze(ReferenceMotion(
+                content_hash=content_hash,
+                fps=float(data["fps"]),
+                total_frames=int(data["total_frames"]),
+                width=width,
+                height=height,
+                joints=tuple(JointType(str(value)) for value in data["joints"]),
+                angles=data["angles"].astype(np.float32, copy=False),
+                phase_frames=data["phase_frames"].astype(np.int32, copy=False),
+            ))
+    except (OSError, KeyError, ValueError) as e:
+        logger.warning(f"load_reference_motion: Ignoring {path}: {e}")
+        return None
+
+
+# ==================== CACHE DÙNG CHUNG TRONG PROCESS ====================
+
+class ReferenceMotionCache:
+    """
+    Cache ReferenceMotion theo hash nội dung video (thread-safe).
+
+    Thứ tự tra cứu: bộ nhớ -> file .npz cạnh video -> trích xuất (một lần,
+    các session cùng video chờ kết quả thay vì trích xuất song song).
+    get_nowait() không chờ: chạy get() ở thread nền và trả None ngay.
+    """
+
+    def __init__(self):
+        self._motions: Dict[str, ReferenceMotion] = {}
+        # (realpath, size, mtime_ns) -> hash, tránh hash lại file không đổi
+        self._hashes: Dict[Tuple[str, int, int], str] = {}
+        self._extract_locks: Dict[str, threading.Lock] = {}
+        # Khóa file (như _hashes) của các video đang chuẩn bị ở thread nền
+        self._pending: Set[Tuple[str, int, int]] = set()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.disk_loads = 0
+        self.extractions = 0
+
+    @staticmethod
+    def _file_key(video_path: str) -> Tuple[str, int, int]:
+        stat = os.stat(video_path)
+        return os.path.realpath(video_path), stat.st_size, stat.st_mtime_ns
+
+    def _content_hash(self, video_path: str) -> str:
+        key = self._file_key(video_path)
+        with self._lock:
+            content_hash = self._hashes.get(key)
+        if content_hash is None:
+            content_hash = hash_video_file(video_path)
+            with self._lock:
+                self._hashes[key] = content_hash
+        return content_hash
+
+    def get(
+        self,
+        video_path: str,
+        detector_factory: Callable[[], Any]
+    ) -> ReferenceMotion:
+        """
+        Lấy ReferenceMotion của video, trích xuất nếu chưa có.
+
+        Args:
+            video_path: Đường dẫn video mẫu.
+            detector_factory: Tạo VisionDetector riêng cho lần trích xuất
+                (được close sau khi dùng).
+        """
+        content_hash = self._content_hash(video_path)
+        with self._lock:
+            motion = self._motions.get(content_hash)
+            if motion is not None:
+                self.hits += 1
+                return motion
+            extract_lock = self._extract_locks.setdefault(content_hash, threading.Lock())
+
+        with extract_lock:
+            with self._lock:
+                motion = self._motions.get(content_hash)
+                if motion is not None:
+                    self.hits += 1
+                    return motion
+
+            npz_path = reference_motion_path(video_path)
+            motion = load_reference_motion(npz_path, content_hash)
+            if motion is not None:
+                self.disk_loads += 1
+            else:
+                detector = detector_factory()
+                try:
+                    motion = extract_reference_motion(video_path, detector, content_hash)
+                finally:
+                    detector.close()
+                self.extractions += 1
+                logger.info(
+                    f"get: Extracted reference motion {video_path} "
+                    f"({motion.total_frames} frames, hash={content_hash})"
+                )
+                try:
+                    save_reference_motion(motion, npz_path)
+                except OSError as e:
+                    # Thư mục video chỉ đọc: vẫn dùng được cache trong bộ nhớ
+                    logger.warning(f"get: Cannot write {npz_path}: {e}")
+
+            with self._lock:
+                self._motions[content_hash] = motion
+                self._extract_locks.pop(content_hash, None)
+            return motion
+
+    def get_nowait(
+        self,
+        video_path: str,
+        detector_factory: Callable[[], Any]
+    ) -> Optional[ReferenceMotion]:
+        """
+        ReferenceMotion nếu đã có trong bộ nhớ, nếu không thì None ngay.
+
+        Lần gọi đầu cho một video khởi động get() ở thread nền (hash, đọc
+        .npz hoặc trích xuất); các lần gọi trong lúc đó không tạo thêm
+        thread. Không bao giờ hash / decode video trên thread gọi.
+        """
+        key = self._file_key(video_path)
+        with self._lock:
+            content_hash = self._hashes.get(key)
+            motion = self._motions.get(content_hash) if content_hash else None
+            if motion is not None:
+                self.hits += 1
+                return motion
+            if key in self._pending:
+                return None
+            self._pending.add(key)
+
+        threading.Thread(
+            target=self._prepare,
+            args=(key, video_path, detector_factory),
+            name="reference-motion",
+            daemon=True,
+        ).start()
+        return None
+
+    def _prepare(
+        self,
+        key: Tuple[str, int, int],
+        video_path: str,
+        detector_factory: Callable[[], Any]
+    ) -> None:
+        """Thread nền của get_nowait(): lỗi chỉ được log, lần gọi sau thử lại."""
+        try:
+            self.get(video_path, detector_factory)
+        except Exception as e:
+            logger.warning(f"_prepare: Reference motion for {video_path} failed: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "motions": len(self._motions),
+                "pending": len(self._pending),
+                "hits": self.hits,
+                "disk_loads": self.disk_loads,
+                "extractions": self.extractions,
+            }
+
+
+_reference_motion_cache = ReferenceMotionCache()
+
+
+def get_reference_motion(
+    video_path: str,
+    detector_factory: Callable[[], Any]
+) -> ReferenceMotion:
+    """ReferenceMotion dùng chung trong process cho video (xem ReferenceMotionCache.get)."""
+    return _reference_motion_cache.get(video_path, detector_factory)
+
+
+def get_reference_motion_nowait(
+    video_path: str,
+    detector_factory: Callable[[], Any]
+) -> Optional[ReferenceMotion]:
+    """Như get_reference_motion nhưng không chờ (xem ReferenceMotionCache.get_nowait)."""
+    return _reference_motion_cache.get_nowait(video_path, detector_factory)
+
+
+def get_reference_motion_stats() -> Dict[str, int]:
+    """Thống kê cache chuyển động mẫu của process."""
+    return _reference_motion_cache.get_stats()
+
+
+# ==================== ÁP DỤNG VÀO BÀI TẬP ====================
+
+def align_exercise_checkpoints(
+    exercise: ExerciseDefinition,
+    motion: ReferenceMotion,
+    joint_type: JointType
+) -> bool:
+    """
+    Đặt frame_index của các checkpoint theo mốc pha đo được trong video.
+
+    create_*_exercise chia video theo tỉ lệ cố định (25% / 50% / 60% / 95%);
+    hàm này thay bằng frame thực tế của khớp ``joint_type`` (hoặc khớp chính
+    của bài tập nếu khớp đó không chuyển động trong video). Góc mục tiêu
+    giữ nguyên.
+
+    Returns:
+        bool: True nếu đã căn chỉnh, False nếu giữ tỉ lệ mặc định.
+    """
+    exercise.total_frames = motion.total_frames
+    checkpoints = exercise.checkpoints
+    if (len(checkpoints) != len(_PHASE_SEQUENCE) + 1 or
+            tuple(cp.phase_start for cp in checkpoints[1:]) != _PHASE_SEQUENCE):
+        return False
+
+    boundaries = motion.phase_boundaries(joint_type) or motion.phase_boundaries(exercise.joint_type)
+    if boundaries is None:
+        return False
+
+    for checkpoint, frame_index in zip(checkpoints[1:], boundaries):
+        checkpoint.frame_index = frame_index
+    return True
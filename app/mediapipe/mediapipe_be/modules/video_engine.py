@@ -6,6 +6,8 @@ Cung cấp Smart Video Player với khả năng:
 - Lặp lại đoạn video khi cần
 - Nhảy đến frame cụ thể
 - Điều khiển tốc độ phát
+- Chế độ headless: chỉ chạy timeline (frame index, checkpoint, loop) theo
+  thời gian, không decode pixel
 
 Thiết kế tách biệt logic và UI:
     VideoEngine chỉ quản lý frame data và trạng thái.
@@ -15,6 +17,7 @@ Author: MEMOTION Team
 Version: 1.0.0
 """
 
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from enum import Enum, auto
 from pathlib import Path
@@ -27,6 +30,10 @@ try:
 except ImportError:
     cv2 = None
 
+# Khoảng thời gian tối đa tiến timeline trong một lần gọi (giây): stream bị
+# gián đoạn lâu thì video mẫu không nhảy cóc qua nhiều đoạn
+MAX_TICK_SECONDS = 1.0
+
 
 class PlaybackState(Enum):
     """Trạng thái của video player."""
@@ -88,20 +95,38 @@ class VideoEngine:
         ...         # Chờ user
         ...         engine.pause()
         ...     cv2.imshow("Video", frame)
+    
+    Headless (server chỉ cần vị trí video mẫu, không cần pixel):
+        >>> engine = VideoEngine("exercise.mp4", headless=True)
+        >>> engine.play()
+        >>> _, status = engine.get_frame(now=timestamp_ms / 1000.0)  # frame luôn None
     """
     
-    def __init__(self, video_path: str):
+    def __init__(
+        self,
+        video_path: str,
+        headless: bool = False,
+        info: Optional[VideoInfo] = None,
+        frame_buffer_size: int = 4
+    ):
         """
         Khởi tạo VideoEngine.
         
         Args:
             video_path: Đường dẫn đến file video.
+            headless: Chỉ chạy timeline, không giữ decoder (get_frame trả frame None).
+            info: VideoInfo đã biết (vd. từ ReferenceMotion); headless + info
+                  thì không mở video lần nào.
+            frame_buffer_size: Số frame decode gần nhất giữ lại để đọc lại frame
+                               hiện tại khi pause/stop mà không seek-read-seek
+                               (0 = tắt, không dùng khi headless).
             
         Raises:
             FileNotFoundError: Nếu video không tồn tại.
             RuntimeError: Nếu không thể mở video.
         """
-        if cv2 is None:
+        self._headless = headless
+        if cv2 is None and not (headless and info is not None):
             raise RuntimeError("OpenCV not available")
         
         self._path = Path(video_path)
@@ -109,9 +134,13 @@ class VideoEngine:
             raise FileNotFoundError(f"Video not found: {video_path}")
         
         self._cap: Optional[cv2.VideoCapture] = None
-        self._info: Optional[VideoInfo] = None
+        self._info: Optional[VideoInfo] = info if headless else None
         self._state = PlaybackState.STOPPED
         
+        # Frame đã decode gần nhất: frame index -> frame (BGR)
+        self._frame_buffer: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._frame_buffer_size = 0 if headless else max(0, frame_buffer_size)
+        
         # Frame tracking
         self._current_frame = 0
         self._target_frame = 0
@@ -130,8 +159,8 @@ class VideoEngine:
         # Speed control
         self._speed_factor = 1.0
         
-        # Timing
-        self._last_frame_time = 0.0
+        # Timing (None = mốc thời gian đặt ở lần get_frame kế tiếp)
+        self._last_frame_time: Optional[float] = None
         self._frame_interval = 0.0
         
         # Callbacks
@@ -143,7 +172,11 @@ class VideoEngine:
         self._open_video()
     
     def _open_video(self) -> None:
-        """Mở video và đọc thông tin."""
+        """Mở video và đọc thông tin (headless: đóng decoder ngay sau đó)."""
+        if self._info is not None:
+            self._frame_interval = 1.0 / self._info.fps
+            return
+        
         self._cap = cv2.VideoCapture(str(self._path))
         
         if not self._cap.isOpened():
@@ -164,6 +197,10 @@ class VideoEngine:
         )
         
         self._frame_interval = 1.0 / fps
+        
+        if self._headless:
+            self._cap.release()
+            self._cap = None
     
     def _get_codec(self) -> str:
         """Lấy codec của video."""
@@ -177,6 +214,11 @@ class VideoEngine:
         """Thông tin video."""
         return self._info
     
+    @property
+    def headless(self) -> bool:
+        """Chỉ chạy timeline, không decode."""
+        return self._headless
+    
     @property
     def state(self) -> PlaybackState:
         """Trạng thái hiện tại."""
@@ -228,7 +270,7 @@ class VideoEngine:
             self.seek(0)
         
         self._state = PlaybackState.PLAYING
-        self._last_frame_time = time.time()
+        self._last_frame_time = None
     
     def pause(self) -> None:
         """Tạm dừng video."""
@@ -252,13 +294,13 @@ class VideoEngine:
         Returns:
             bool: True nếu seek thành công.
         """
-        if self._cap is None or self._info is None:
+        if self._info is None or (self._cap is None and not self._headless):
             return False
         
         frame_index = max(0, min(frame_index, self._info.total_frames - 1))
         
         self._state = PlaybackState.SEEKING
-        success = self._cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        success = self._headless or self._cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
         
         if success:
             self._current_frame = frame_index
@@ -309,19 +351,23 @@ class VideoEngine:
         self._state = PlaybackState.PLAYING
         self._loop_count = 0
     
-    def get_frame(self) -> Tuple[Optional[np.ndarray], PlaybackStatus]:
+    def get_frame(self, now: Optional[float] = None) -> Tuple[Optional[np.ndarray], PlaybackStatus]:
         """
         Lấy frame tiếp theo.
         
         Đây là hàm chính để lấy frame trong vòng lặp render.
         Tự động xử lý timing, checkpoints, và loops.
         
+        Args:
+            now: Thời điểm hiện tại (giây), vd. timestamp frame camera của
+                 người dùng để video mẫu chạy theo stream; None = đồng hồ hệ thống.
+        
         Returns:
             Tuple[frame, status]:
-                - frame: Numpy array (BGR) hoặc None nếu lỗi
+                - frame: Numpy array (BGR) hoặc None nếu lỗi / headless
                 - status: PlaybackStatus
         """
-        if self._cap is None or self._info is None:
+        if self._info is None or (self._cap is None and not self._headless):
             return None, PlaybackStatus(
                 state=PlaybackState.STOPPED,
                 current_frame=0,
@@ -330,18 +376,18 @@ class VideoEngine:
             )
         
         # Tính timing
-        current_time = time.time()
+        current_time = time.time() if now is None else now
+        if self._last_frame_time is None:
+            self._last_frame_time = current_time
+        
+        if self._headless:
+            return None, self._advance_timeline(current_time)
+        
         elapsed = current_time - self._last_frame_time
         adjusted_interval = self._frame_interval / self._speed_factor
         
         # Tạo status cơ bản
-        status = PlaybackStatus(
-            state=self._state,
-            current_frame=self._current_frame,
-            current_time_ms=int((self._current_frame / self._info.fps) * 1000),
-            progress=self._current_frame / self._info.total_frames if self._info.total_frames > 0 else 0,
-            loop_count=self._loop_count
-        )
+        status = self._build_status()
         
         # Xử lý theo state
         if self._state == PlaybackState.STOPPED:
@@ -362,6 +408,8 @@ class VideoEngine:
         
         # Đọc frame tiếp theo
         ret, frame = self._cap.read()
+        if ret:
+            self._remember_frame(self._current_frame, frame)
         
         if not ret:
             # Hết video
@@ -415,11 +463,99 @@ class VideoEngine:
         
         return frame, status
     
+    def _build_status(self) -> PlaybackStatus:
+        """PlaybackStatus của vị trí hiện tại."""
+        return PlaybackStatus(
+            state=self._state,
+            current_frame=self._current_frame,
+            current_time_ms=int((self._current_frame / self._info.fps) * 1000),
+            progress=self._current_frame / self._info.total_frames if self._info.total_frames > 0 else 0,
+            loop_count=self._loop_count
+        )
+    
+    def _advance_timeline(self, current_time: float) -> PlaybackStatus:
+        """
+        Headless: tiến frame index theo thời gian trôi qua, không decode.
+        
+        Tiến ``elapsed / interval`` frame (giữ phần dư cho lần sau), xử lý
+        hết video / loop như get_frame, và dừng lại ngay tại checkpoint để
+        caller (sync controller) quyết định pause hay chạy tiếp.
+        """
+        if self._state not in (PlaybackState.PLAYING, PlaybackState.LOOPING):
+            return self._build_status()
+        
+        # Timestamp lùi (client mới / đổi đồng hồ): đặt lại mốc
+        if current_time < self._last_frame_time:
+            self._last_frame_time = current_time
+            return self._build_status()
+        
+        adjusted_interval = self._frame_interval / self._speed_factor
+        elapsed = min(current_time - self._last_frame_time, MAX_TICK_SECONDS)
+        steps = int(elapsed / adjusted_interval)
+        if steps == 0:
+            return self._build_status()
+        self._last_frame_time = current_time - (elapsed - steps * adjusted_interval)
+        
+        at_checkpoint = False
+        for _ in range(steps):
+            if self._current_frame >= self._info.total_frames:
+                # Hết video
+                if self._state == PlaybackState.LOOPING:
+                    self._complete_loop()
+                    continue
+                self._state = PlaybackState.FINISHED
+                if self._on_finish:
+                    self._on_finish()
+                break
+            
+            self._current_frame += 1
+            
+            # Kiểm tra loop boundary
+            if self._state == PlaybackState.LOOPING and self._current_frame >= self._loop_end:
+                self._complete_loop()
+            
+            if self._check_checkpoint():
+                at_checkpoint = True
+                break
+        
+        status = self._build_status()
+        if at_checkpoint:
+            status.is_at_checkpoint = True
+            status.checkpoint_message = self._checkpoint_messages.get(
+                self._checkpoints[self._current_checkpoint_idx - 1],
+                "Checkpoint reached"
+            )
+        return status
+    
+    def _complete_loop(self) -> None:
+        """Headless: hết một vòng lặp -> quay lại đầu đoạn hoặc phát tiếp."""
+        self._loop_count += 1
+        if self._loop_count >= self._max_loops:
+            self._state = PlaybackState.PLAYING
+        else:
+            self._current_frame = self._loop_start
+            self._update_checkpoint_index()
+        if self._on_loop:
+            self._on_loop(self._loop_count)
+    
+    def _remember_frame(self, frame_index: int, frame: np.ndarray) -> None:
+        """Giữ frame vừa decode trong ring buffer (bỏ frame cũ nhất khi đầy)."""
+        if self._frame_buffer_size == 0:
+            return
+        self._frame_buffer[frame_index] = frame
+        self._frame_buffer.move_to_end(frame_index)
+        while len(self._frame_buffer) > self._frame_buffer_size:
+            self._frame_buffer.popitem(last=False)
+    
     def _read_current_frame(self) -> Optional[np.ndarray]:
-        """Đọc frame hiện tại (không advance)."""
+        """Đọc frame hiện tại (không advance), ưu tiên frame đã decode."""
         if self._cap is None:
             return None
         
+        cached = self._frame_buffer.get(self._current_frame)
+        if cached is not None:
+            return cached
+        
         # Lưu vị trí
         pos = self._cap.get(cv2.CAP_PROP_POS_FRAMES)
         
@@ -430,7 +566,10 @@ class VideoEngine:
         # Restore vị trí
         self._cap.set(cv2.CAP_PROP_POS_FRAMES, pos)
         
-        return frame if ret else None
+        if not ret:
+            return None
+        self._remember_frame(self._current_frame, frame)
+        return frame
     
     def _check_checkpoint(self) -> bool:
         """Kiểm tra và xử lý checkpoint."""
@@ -469,6 +608,13 @@ class VideoEngine:
         Returns:
             bool: True nếu còn frame.
         """
+        if self._headless:
+            if self._info is None or self._current_frame >= self._info.total_frames:
+                return False
+            self._current_frame += 1
+            self._check_checkpoint()
+            return True
+        
         if self._cap is None:
             return False
         
@@ -487,7 +633,7 @@ class VideoEngine:
             frame_index: Số frame cần lấy.
             
         Returns:
-            Frame hoặc None.
+            Frame hoặc None (luôn None khi headless).
         """
         if self._cap is None or self._info is None:
             return None
@@ -523,6 +669,7 @@ class VideoEngine:
         if self._cap is not None:
             self._cap.release()
             self._cap = None
+        self._frame_buffer.clear()
         self._state = PlaybackState.STOPPED
     
     def __enter__(self):
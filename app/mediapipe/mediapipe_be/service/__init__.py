@@ -39,6 +39,9 @@ from .schemas import (
     FinalReportOutput,
     # Composite
     EngineOutput,
+    # Wire format
+    WIRE_FIELDS,
+    build_wire_data,
     # Helpers
     get_direction_hint,
     get_feedback_text,
@@ -60,6 +63,7 @@ from .engine_service import (
     CALIBRATION_QUEUE,
     JOINT_POSITION_INSTRUCTIONS,
     PHASE_NAMES,
+    ENGINE_INPUT_MODES,
     # Factory function
     create_engine_for_user,
 )
@@ -79,6 +83,7 @@ __all__ = [
     'CALIBRATION_QUEUE',
     'JOINT_POSITION_INSTRUCTIONS',
     'PHASE_NAMES',
+    'ENGINE_INPUT_MODES',
     
     # ===== SCHEMAS =====
     # Enums
@@ -99,6 +104,8 @@ __all__ = [
     'FinalReportOutput',
     # Composite Output
     'EngineOutput',
+    'WIRE_FIELDS',
+    'build_wire_data',
     
     # ===== HELPERS =====
     'get_direction_hint',
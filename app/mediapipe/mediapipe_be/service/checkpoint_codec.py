@@ -0,0 +1,201 @@
+"""
+Checkpoint Codec - serialize state engine thanh du lieu thuan (khong pickle).
+
+Checkpoint chi chua JSON + mang numpy, nen doc checkpoint KHONG bao gio
+chay code: chi cac class co trong bang ``types`` (ten on dinh -> class,
+do engine khai bao) moi duoc tao lai.
+
+Layout (little-endian):
+    offset  size  field
+    0       4     magic b"MCKP"
+    4       2     version (uint16)
+    6       4     do dai JSON nen N (uint32)
+    10      N     JSON (zlib)
+    10+N    ...   mang numpy (npz, co the rong)
+
+JSON: moi dict Python duoc ghi thanh object co tag "__t":
+    dict / tuple / set / deque  container
+    enum                        {"type": ten, "v": value}
+    obj                         dataclass / object trong ``types``:
+                                {"type": ten, "id": n, "v": {attr: ...}};
+                                gap lai cung object -> {"__t": "ref", "id": n}
+    ndarray                     {"ref": key trong npz}
+
+Khi cau truc state thay doi (doi ten / bo attribute) thi tang version:
+checkpoint version khac bi tu choi (ValueError), khong co gang doc.
+
+Author: MEMOTION Team
+Version: 1.0.0
+"""
+
+import dataclasses
+import io
+import json
+import struct
+import zlib
+from collections import deque
+from enum import Enum
+from typing import Any, Dict
+
+import numpy as np
+
+
+CHECKPOINT_MAGIC = b"MCKP"
+_HEADER = struct.Struct("<4sHI")
+
+
+class _Encoder:
+    """Python value -> cay JSON + mang numpy."""
+
+    def __init__(self, types: Dict[str, type]):
+        self._names = {cls: name for name, cls in types.items()}
+        self._memo: Dict[int, int] = {}
+        self.arrays: Dict[str, np.ndarray] = {}
+
+    def encode(self, value: Any) -> Any:
+        if isinstance(value, Enum):
+            return {"__t": "enum", "type": self._name(value), "v": value.value}
+        if value is None or isinstance(value, (bool, int, str)):
+            return value
+        if isinstance(value, float):
+            return float(value)
+        if isinstance(value, np.ndarray):
+            key = f"a{len(self.arrays)}"
+            self.arrays[key] = value
+            return {"__t": "ndarray", "ref": key}
+        if isinstance(value, np.generic):
+            return value.item()
+        if isinstance(value, list):
+            return [self.encode(v) for v in value]
+        if isinstance(value, tuple):
+            return {"__t": "tuple", "v": [self.encode(v) for v in value]}
+        if isinstance(value, deque):
+            return {"__t": "deque", "v": [self.encode(v) for v in value], "maxlen": value.maxlen}
+        if isinstance(value, (set, frozenset)):
+            return {"__t": "set", "v": [self.encode(v) for v in value]}
+        if isinstance(value, dict):
+            return {"__t": "dict", "v": [[self.encode(k), self.encode(v)] for k, v in value.items()]}
+        return self._encode_object(value)
+
+    def _encode_object(self, value: Any) -> Dict[str, Any]:
+        name = self._name(value)
+        if id(value) in self._memo:
+            return {"__t": "ref", "id": self._memo[id(value)]}
+        ref = self._memo[id(value)] = len(self._memo)
+
+        if dataclasses.is_dataclass(value):
+            state = {f.name: getattr(value, f.name) for f in dataclasses.fields(value)}
+        else:
+            state = vars(value)
+        return {
+            "__t": "obj", "type": name, "id": ref,
+            "v": {attr: self.encode(v) for attr, v in state.items()},
+        }
+
+    def _name(self, value: Any) -> str:
+        name = self._names.get(type(value))
+        if name is None:
+            raise TypeError(f"Type not allowed in checkpoint: {type(value).__name__}")
+        return name
+
+
+class _Decoder:
+    """Cay JSON + mang numpy -> Python value (chi tao class trong ``types``)."""
+
+    def __init__(self, types: Dict[str, type], arrays: Dict[str, np.ndarray]):
+        self._types = types
+        self._arrays = arrays
+        self._memo: Dict[int, Any] = {}
+
+    def decode(self, node: Any) -> Any:
+        if isinstance(node, list):
+            return [self.decode(v) for v in node]
+        if not isinstance(node, dict):
+            return node
+
+        tag = node.get("__t")
+        if tag == "dict":
+            return {self.decode(k): self.decode(v) for k, v in node["v"]}
+        if tag == "tuple":
+            return tuple(self.decode(v) for v in node["v"])
+        if tag == "deque":
+            return deque((self.decode(v) for v in node["v"]), maxlen=node.get("maxlen"))
+        if tag == "set":
+            return {self.decode(v) for v in node["v"]}
+        if tag == "enum":
+            return self._type(node["type"])(node["v"])
+        if tag == "ndarray":
+            return self._arrays[node["ref"]]
+        if tag == "ref":
+            return self._memo[node["id"]]
+        if tag == "obj":
+            return self._decode_object(node)
+        raise ValueError(f"Unknown checkpoint node: {tag!r}")
+
+    def _decode_object(self, node: Dict[str, Any]) -> Any:
+        cls = self._type(node["type"])
+        state = {attr: self.decode(v) for attr, v in node["v"].items()}
+
+        if dataclasses.is_dataclass(cls):
+            init = {f.name for f in dataclasses.fields(cls) if f.init}
+            obj = cls(**{attr: v for attr, v in state.items() if attr in init})
+        else:
+            obj = cls.__new__(cls)
+            obj.__dict__.update(state)
+        self._memo[node["id"]] = obj
+        return obj
+
+    def _type(self, name: str) -> type:
+        cls = self._types.get(name)
+        if cls is None:
+            raise ValueError(f"Type not allowed in checkpoint: {name}")
+        return cls
+
+
+def dump_checkpoint(payload: Dict[str, Any], version: int, types: Dict[str, type]) -> bytes:
+    """
+    Ma hoa ``payload`` thanh checkpoint bytes.
+
+    Raises:
+        TypeError: Gap gia tri co kieu khong nam trong ``types``
+    """
+    encoder = _Encoder(types)
+    document = json.dumps(encoder.encode(payload), separators=(",", ":")).encode("utf-8")
+    compressed = zlib.compress(document, 6)
+
+    arrays = b""
+    if encoder.arrays:
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **encoder.arrays)
+        arrays = buffer.getvalue()
+    return _HEADER.pack(CHECKPOINT_MAGIC, version, len(compressed)) + compressed + arrays
+
+
+def load_checkpoint(data: bytes, version: int, types: Dict[str, type]) -> Dict[str, Any]:
+    """
+    Giai ma checkpoint tu dump_checkpoint().
+
+    Raises:
+        ValueError: Khong phai checkpoint, sai version, hoac du lieu hong
+    """
+    if len(data) < _HEADER.size:
+        raise ValueError("Checkpoint too short")
+    magic, found_version, length = _HEADER.unpack_from(data, 0)
+    if magic != CHECKPOINT_MAGIC:
+        raise ValueError("Not a checkpoint (unknown format)")
+    if found_version != version:
+        raise ValueError(f"Unsupported checkpoint version: {found_version}")
+
+    start = _HEADER.size
+    try:
+        document = json.loads(zlib.decompress(data[start:start + length]).decode("utf-8"))
+        arrays: Dict[str, np.ndarray] = {}
+        if len(data) > start + length:
+            with np.load(io.BytesIO(data[start + length:]), allow_pickle=False) as npz:
+                arrays = {key: npz[key] for key in npz.files}
+        payload = _Decoder(types, arrays).decode(document)
+    except (zlib.error, UnicodeDecodeError, KeyError, TypeError, OSError) as e:
+        raise ValueError(f"Corrupt checkpoint: {e}") from e
+    if not isinstance(payload, dict):
+        raise ValueError("Corrupt checkpoint: payload is not a dict")
+    return payload
@@ -29,7 +29,7 @@ Version: 2.0.0
 import logging
 import time
 from pathlib import Path
-from typing import Optional, Dict, List, Any, Tuple
+from typing import Optional, Dict, List, Any, Tuple, Callable
 from dataclasses import dataclass, field
 from enum import Enum
 from queue import Queue
@@ -41,32 +41,44 @@ import uuid
 try:
     # When imported from backend (app.mediapipe.mediapipe_be.service)
     from ..core import (
-        VisionDetector, DetectorConfig, JointType, JOINT_DEFINITIONS,
-        calculate_joint_angle, MotionPhase, SyncStatus, SyncState,
-        MotionSyncController, create_arm_raise_exercise, create_elbow_flex_exercise,
+        VisionDetector, DetectorConfig, DetectorPool, DetectorPoolExhausted, get_detector_pool,
+        LandmarkSet, LandmarkType, DetectionResult,
+        LandmarkPredictor, KeyframeScheduler,
+        encode_landmarks, resolve_landmark_indices,
+        JointType, JOINT_DEFINITIONS,
+        calculate_joint_angle, compute_joint_angles, MotionPhase, SyncStatus, SyncState,
+        MotionSyncController, PhaseCheckpoint, ExerciseDefinition,
+        create_arm_raise_exercise, create_elbow_flex_exercise,
         compute_single_joint_dtw, create_exercise_weights,
     )
     from ..modules import (
-        VideoEngine, PlaybackState, PainDetector, PainLevel,
+        VideoEngine, VideoInfo, PlaybackState, PainDetector, PainLevel,
         HealthScorer, FatigueLevel, SafeMaxCalibrator, CalibrationState,
-        UserProfile,
+        UserProfile, JointCalibrationData, RepScore as ScorerRepScore, ReferenceMotion, get_reference_motion_nowait, align_exercise_checkpoints,
     )
     from ..utils import SessionLogger
 except ImportError:
     # When running as standalone
     from core import (
-        VisionDetector, DetectorConfig, JointType, JOINT_DEFINITIONS,
-        calculate_joint_angle, MotionPhase, SyncStatus, SyncState,
-        MotionSyncController, create_arm_raise_exercise, create_elbow_flex_exercise,
+        VisionDetector, DetectorConfig, DetectorPool, DetectorPoolExhausted, get_detector_pool,
+        LandmarkSet, LandmarkType, DetectionResult,
+        LandmarkPredictor, KeyframeScheduler,
+        encode_landmarks, resolve_landmark_indices,
+        JointType, JOINT_DEFINITIONS,
+        calculate_joint_angle, compute_joint_angles, MotionPhase, SyncStatus, SyncState,
+        MotionSyncController, PhaseCheckpoint, ExerciseDefinition,
+        create_arm_raise_exercise, create_elbow_flex_exercise,
         compute_single_joint_dtw, create_exercise_weights,
     )
     from modules import (
-        VideoEngine, PlaybackState, PainDetector, PainLevel,
+        VideoEngine, VideoInfo, PlaybackState, PainDetector, PainLevel,
         HealthScorer, FatigueLevel, SafeMaxCalibrator, CalibrationState,
-        UserProfile,
+        UserProfile, JointCalibrationData, RepScore as ScorerRepScore, ReferenceMotion, get_reference_motion_nowait, align_exercise_checkpoints,
     )
     from utils import SessionLogger
 
+from .checkpoint_codec import dump_checkpoint, load_checkpoint
+
 # Schema imports
 from .schemas import (
     DetectionOutput,
@@ -127,6 +139,43 @@ JOINT_POSITION_INSTRUCTIONS: Dict[JointType, str] = {
     JointType.RIGHT_KNEE: "Moi ba dung DOC",
 }
 
+# Detector heads (pose, face) can chay theo phase.
+# Face landmarks chi duoc PainDetector dung trong Phase 3;
+# Phase 4 khong dung ket qua detect nen bo qua ca hai.
+PHASE_DETECTOR_HEADS: Dict[AppPhase, Dict[str, bool]] = {
+    AppPhase.PHASE1_DETECTION: {"pose": True, "face": False},
+    AppPhase.PHASE2_CALIBRATION: {"pose": True, "face": False},
+    AppPhase.PHASE3_SYNC: {"pose": True, "face": True},
+    AppPhase.PHASE4_SCORING: {"pose": False, "face": False},
+    AppPhase.COMPLETED: {"pose": False, "face": False},
+}
+
+# Nguon landmarks cua session:
+# - image: server decode frame + chay MediaPipe
+# - landmarks: client chay pose model tren thiet bi, gui landmarks (khong dung VisionDetector)
+ENGINE_INPUT_MODES = ("image", "landmarks")
+
+# Checkpoint (create_checkpoint / restore_checkpoint), xem checkpoint_codec.
+# Tang version khi doi ten / bo attribute cua cac class trong CHECKPOINT_TYPES.
+CHECKPOINT_VERSION: int = 2
+# Attributes luu trong checkpoint: state + cac component thuan du lieu.
+# Detector, video, logger, queue... duoc tao lai khi restore.
+CHECKPOINT_ATTRIBUTES: Tuple[str, ...] = (
+    "_state",
+    "_sync_controller",
+    "_calibrator",
+    "_scorer",
+    "_user_profile",
+    "_user_angles",
+    "_ref_angles",
+    "_score_history",
+    "_rep_scores",
+    "_free_training_state",
+    "_phase3_frame_count",
+    "_cached_final_report",
+    "_heads_override",
+)
+
 # Timing constants
 PHASE1_STABLE_FRAMES_REQUIRED: int = 30  # So frame on dinh de chuyen phase
 PHASE1_COUNTDOWN_DURATION: float = 3.0  # giay
@@ -197,6 +246,30 @@ class EngineState:
     exercise_name: str = ""
 
 
+# Kieu duoc phep trong checkpoint (ten on dinh -> class). Checkpoint chi chua
+# du lieu thuan (JSON + numpy), khi doc chi tao lai cac class nay.
+CHECKPOINT_TYPES: Dict[str, type] = {
+    "AppPhase": AppPhase,
+    "EngineState": EngineState,
+    "JointType": JointType,
+    "MotionPhase": MotionPhase,
+    "SyncStatus": SyncStatus,
+    "SyncState": SyncState,
+    "PhaseCheckpoint": PhaseCheckpoint,
+    "ExerciseDefinition": ExerciseDefinition,
+    "MotionSyncController": MotionSyncController,
+    "CalibrationState": CalibrationState,
+    "JointCalibrationData": JointCalibrationData,
+    "UserProfile": UserProfile,
+    "SafeMaxCalibrator": SafeMaxCalibrator,
+    "FatigueLevel": FatigueLevel,
+    "PainLevel": PainLevel,
+    "ScorerRepScore": ScorerRepScore,
+    "HealthScorer": HealthScorer,
+    "FinalReportOutput": FinalReportOutput,
+}
+
+
 # ==================== ENGINE CONFIG ====================
 
 @dataclass
@@ -211,6 +284,25 @@ class EngineConfig:
         default_joint: Khop mac dinh (string)
         detection_stable_threshold: So frame on dinh de chuyen Phase 2
         calibration_duration_ms: Thoi gian do moi khop (ms)
+        use_detector_pool: Muon detector tu pool dung chung (khong load model moi session)
+        detector_pool_size: So detector toi da trong pool
+        detector_lease_timeout: Thoi gian cho detector ranh (giay)
+        face_analysis_hz: Tan so chay face landmarker (Hz, 0 = moi frame)
+        use_roi: Crop frame theo vung nguoi tu pose frame truoc
+        roi_max_side: Canh dai toi da cua anh dua vao model khi bat ROI
+        keyframe_mode: Phase 3 chi chay MediaPipe moi N frame, giua cac keyframe du doan
+        keyframe_max_interval: N toi da (dieu chinh theo van toc goc)
+        keyframe_velocity_low: Van toc goc (deg/s) duoi muc nay dung N toi da
+        keyframe_velocity_high: Van toc goc (deg/s) tren muc nay detect moi frame
+        landmark_format: Landmarks gui client: none | full | compact | compact_bin
+        landmark_joints: Subset landmark (index hoac ten, vd "left_elbow"), None = 33 diem
+        input_mode: image | landmarks (client gui landmarks, xem process_landmarks)
+        collect_timings: Gan thoi gian tung stage (ms) vao output.timings / message["timings"]
+        frame_color: Thu tu kenh mau cua frame dua vao process_frame: bgr | rgb
+            (rgb = backend decode thang ra RGB, detector bo buoc cvtColor)
+        reference_cache: Trich xuat goc khop / moc pha tu video mau mot lan
+            (cache dung chung trong process + file .motion.npz canh video,
+            trich xuat o thread nen, chua xong thi dung ti le mac dinh)
     """
     models_dir: str = "./models"
     log_dir: str = "./data/logs"
@@ -218,6 +310,22 @@ class EngineConfig:
     default_joint: str = "left_shoulder"
     detection_stable_threshold: int = PHASE1_STABLE_FRAMES_REQUIRED
     calibration_duration_ms: int = 5000
+    use_detector_pool: bool = False
+    detector_pool_size: int = 4
+    detector_lease_timeout: float = 10.0
+    face_analysis_hz: float = 5.0
+    use_roi: bool = False
+    roi_max_side: int = 640
+    keyframe_mode: bool = False
+    keyframe_max_interval: int = 3
+    keyframe_velocity_low: float = 30.0
+    keyframe_velocity_high: float = 120.0
+    landmark_format: str = "none"
+    landmark_joints: Optional[List[Any]] = None
+    input_mode: str = "image"
+    collect_timings: bool = False
+    frame_color: str = "bgr"
+    reference_cache: bool = True
 
 
 # ==================== MEMOTION ENGINE (MAIN CLASS) ====================
@@ -283,6 +391,52 @@ class MemotionEngine:
         engine._state.instance_id = instance_id or str(uuid.uuid4())
         return engine
     
+    @staticmethod
+    def build_detector_config(config: EngineConfig) -> DetectorConfig:
+        """
+        Tao DetectorConfig tu EngineConfig (pose lite + face neu co model).
+        
+        Raises:
+            FileNotFoundError: Khong tim thay pose model
+        """
+        models_dir = Path(config.models_dir)
+        pose_model = models_dir / "pose_landmarker_lite.task"
+        face_model = models_dir / "face_landmarker.task"
+        
+        if not pose_model.exists():
+            raise FileNotFoundError(f"Pose model not found: {pose_model}")
+        
+        return DetectorConfig(
+            pose_model_path=str(pose_model),
+            face_model_path=str(face_model) if face_model.exists() else None,
+            running_mode="VIDEO",
+            use_roi=config.use_roi,
+            roi_max_side=config.roi_max_side
+        )
+    
+    @classmethod
+    def get_detector_pool(cls, config: Optional[EngineConfig] = None) -> DetectorPool:
+        """Pool detector dung chung trong process cho config nay."""
+        config = config or EngineConfig()
+        return get_detector_pool(
+            cls.build_detector_config(config),
+            max_size=config.detector_pool_size
+        )
+    
+    @classmethod
+    def prewarm_detector_pool(
+        cls,
+        config: Optional[EngineConfig] = None,
+        count: int = 1
+    ) -> int:
+        """
+        Load truoc model vao pool de session dau tien khong bi stall.
+        
+        Returns:
+            int: So detector vua tao them
+        """
+        return cls.get_detector_pool(config).prewarm(count)
+    
     # ==================== INITIALIZATION ====================
     
     def __init__(self, config: Optional[EngineConfig] = None):
@@ -318,8 +472,10 @@ class MemotionEngine:
         
         # Components (lazy init - chi tao khi can)
         self._detector: Optional[VisionDetector] = None
-        self._ref_detector: Optional[VisionDetector] = None
+        self._detector_pool: Optional[DetectorPool] = None
+        self._detector_lease_failed: bool = False
         self._video_engine: Optional[VideoEngine] = None
+        self._reference_motion: Optional[ReferenceMotion] = None
         self._sync_controller: Optional[MotionSyncController] = None
         self._calibrator: Optional[SafeMaxCalibrator] = None
         self._pain_detector: Optional[PainDetector] = None
@@ -337,6 +493,31 @@ class MemotionEngine:
         # Analysis queue (per-instance)
         self._analysis_queue: Queue = Queue(maxsize=5)
         
+        # Detector heads: override theo session + moc thoi gian face gan nhat
+        self._heads_override: Dict[str, bool] = {}
+        self._last_face_ts_ms: Optional[int] = None
+        
+        # Keyframe inference (Phase 3): du doan landmarks giua cac keyframe
+        self._landmark_predictor: Optional[LandmarkPredictor] = None
+        self._keyframe_scheduler: Optional[KeyframeScheduler] = None
+        self._last_keyframe_landmarks: Optional[LandmarkSet] = None
+        self._frame_predicted: bool = False
+        
+        # Landmarks gui client (skeleton overlay)
+        self._landmark_indices = resolve_landmark_indices(self._config.landmark_joints)
+        self._frame_pose: Optional[LandmarkSet] = None
+        
+        # Stage timings cua frame hien tai (collect_timings)
+        self._frame_detect_timings: Optional[Dict[str, float]] = None
+        self._phase_started: float = 0.0
+        if self._config.keyframe_mode and self._config.input_mode == "image":
+            self._landmark_predictor = LandmarkPredictor()
+            self._keyframe_scheduler = KeyframeScheduler(
+                max_interval=self._config.keyframe_max_interval,
+                velocity_low=self._config.keyframe_velocity_low,
+                velocity_high=self._config.keyframe_velocity_high,
+            )
+        
         # Init flag
         self._initialized: bool = False
     
@@ -350,27 +531,18 @@ class MemotionEngine:
             bool: True neu thanh cong
         """
         try:
-            models_dir = Path(self._config.models_dir)
-            pose_model = models_dir / "pose_landmarker_lite.task"
-            face_model = models_dir / "face_landmarker.task"
-            
-            if not pose_model.exists():
-                raise FileNotFoundError(f"Pose model not found: {pose_model}")
-            
-            # Init main detector
-            config = DetectorConfig(
-                pose_model_path=str(pose_model),
-                face_model_path=str(face_model) if face_model.exists() else None,
-                running_mode="VIDEO"
-            )
-            self._detector = VisionDetector(config)
+            config = self.build_detector_config(self._config)
             
-            # Init reference detector (for video analysis)
-            ref_config = DetectorConfig(
-                pose_model_path=str(pose_model),
-                running_mode="VIDEO"
-            )
-            self._ref_detector = VisionDetector(ref_config)
+            # Init main detector (pool: muon o frame dau tien, xem _ensure_detector)
+            # Landmarks mode: client tu detect, khong can detector
+            if self._config.input_mode == "landmarks":
+                self._detector = None
+            elif self._config.use_detector_pool:
+                self._detector_pool = get_detector_pool(
+                    config, max_size=self._config.detector_pool_size
+                )
+            else:
+                self._detector = VisionDetector(config)
             
             # Init other components
             self._calibrator = SafeMaxCalibrator(
@@ -394,7 +566,8 @@ class MemotionEngine:
     def process_frame(
         self, 
         frame: np.ndarray, 
-        timestamp_ms: int
+        timestamp_ms: int,
+        heads: Optional[Dict[str, bool]] = None
     ) -> EngineOutput:
         """
         XU LY MOT FRAME - Entry point chinh cho Backend.
@@ -406,8 +579,9 @@ class MemotionEngine:
         4. Tra ve output JSON-serializable voi key "phase"
         
         Args:
-            frame: Frame anh (BGR numpy array, shape HxWx3)
+            frame: Frame anh (numpy array HxWx3, BGR hoac RGB theo config.frame_color)
             timestamp_ms: Timestamp tinh bang milliseconds
+            heads: Override detector heads cho frame nay, vd {"face": False}
         
         Returns:
             EngineOutput: Ket qua xu ly, BAT BUOC co:
@@ -429,15 +603,197 @@ class MemotionEngine:
             if not self.initialize():
                 return self._create_error_output("Engine not initialized")
         
+        self._ensure_detector()
+        if self._detector is None:
+            return self._create_error_output("Session expects landmarks, not image frames")
+        
+        def detect(current_phase: AppPhase) -> DetectionResult:
+            # Process detection (chi cac head ma phase hien tai can)
+            run_pose, run_face = self._resolve_detector_heads(current_phase, timestamp_ms, heads)
+            return self._detector.process_frame(
+                frame, timestamp_ms, run_pose=run_pose, run_face=run_face,
+                rgb=self._config.frame_color == "rgb"
+            )
+        
+        return self._process(timestamp_ms, detect)
+    
+    def _ensure_detector(self) -> None:
+        """
+        Muon detector tu pool neu session dang khong giu (frame dau tien,
+        hoac sau release_detector()).
+        
+        Chi cho detector_lease_timeout o lan muon dau; khi pool da het thi
+        cac frame sau thu lai khong cho, session bao loi ngay thay vi treo
+        moi frame.
+        
+        Raises:
+            DetectorPoolExhausted: Pool het detector
+        """
+        if self._detector is not None or self._detector_pool is None:
+            return
+        timeout = 0.0 if self._detector_lease_failed else self._config.detector_lease_timeout
+        try:
+            self._detector = self._detector_pool.lease(timeout=timeout)
+        except DetectorPoolExhausted:
+            self._detector_lease_failed = True
+            raise
+        self._detector_lease_failed = False
+        # Detector moi (ROI bat dau lai tu full frame): khong du doan tu landmarks cu
+        self._force_keyframe()
+    
+    def release_detector(self) -> None:
+        """
+        Tra detector ve pool khi session tam ngung (vd WebSocket ngat).
+        
+        Frame tiep theo muon lai detector. Detector rieng (khong dung pool)
+        duoc giu nguyen.
+        """
+        if self._detector is not None and self._detector_pool is not None:
+            self._detector_pool.release(self._detector)
+            self._detector = None
+    
+    def process_frame_wire(
+        self,
+        frame: np.ndarray,
+        timestamp_ms: int,
+        heads: Optional[Dict[str, bool]] = None
+    ) -> Dict[str, Any]:
+        """
+        Nhu process_frame() nhung tra ve thang message gui client (to_wire).
+        
+        Returns:
+            Dict: {"phase", "phase_name", "data", "message", "warning"}
+        """
+        return self.process_frame(frame, timestamp_ms, heads=heads).to_wire()
+    
+    def process_landmarks(
+        self,
+        pose_landmarks: Optional[np.ndarray],
+        timestamp_ms: int,
+        face_landmarks: Optional[np.ndarray] = None,
+        heads: Optional[Dict[str, bool]] = None
+    ) -> EngineOutput:
+        """
+        XU LY LANDMARKS CLIENT GUI LEN (on-device pose estimation).
+        
+        Bo qua decode + VisionDetector, dua thang landmarks vao _run_phase1..4.
+        Face landmarks van bi gioi han theo phase / face_analysis_hz nhu khi detect.
+        
+        Args:
+            pose_landmarks: Shape (33, 3..5): x, y, z[, visibility[, presence]],
+                normalized theo khung hinh; None/rong = khong thay nguoi
+            timestamp_ms: Timestamp tinh bang milliseconds
+            face_landmarks: Shape (N, 3..5), N >= 468, hoac None
+            heads: Override heads cho frame nay, vd {"face": False}
+        
+        Returns:
+            EngineOutput: Nhu process_frame()
+        """
+        if not self._initialized:
+            if not self.initialize():
+                return self._create_error_output("Engine not initialized")
+        
+        has_pose = pose_landmarks is not None and len(pose_landmarks) > 0
+        has_face = face_landmarks is not None and len(face_landmarks) > 0
+        
+        def detect(current_phase: AppPhase) -> DetectionResult:
+            run_pose, run_face = self._resolve_detector_heads(
+                current_phase, timestamp_ms, heads, face_available=has_face
+            )
+            return DetectionResult(
+                pose_landmarks=(
+                    LandmarkSet.from_numpy(pose_landmarks, LandmarkType.POSE, timestamp_ms)
+                    if run_pose and has_pose else None
+                ),
+                face_landmarks=(
+                    LandmarkSet.from_numpy(face_landmarks, LandmarkType.FACE, timestamp_ms)
+                    if run_face else None
+                ),
+                timestamp_ms=timestamp_ms,
+                is_valid=True,
+            )
+        
+        return self._process(timestamp_ms, detect)
+    
+    def process_landmarks_wire(
+        self,
+        pose_landmarks: Optional[np.ndarray],
+        timestamp_ms: int,
+        face_landmarks: Optional[np.ndarray] = None,
+        heads: Optional[Dict[str, bool]] = None
+    ) -> Dict[str, Any]:
+        """Nhu process_landmarks() nhung tra ve message gui client (to_wire)."""
+        return self.process_landmarks(
+            pose_landmarks, timestamp_ms, face_landmarks=face_landmarks, heads=heads
+        ).to_wire()
+    
+    def _process(
+        self,
+        timestamp_ms: int,
+        detect: Callable[[AppPhase], DetectionResult]
+    ) -> EngineOutput:
+        """Routing + gan landmarks cho client (chung cho image / landmarks mode)."""
+        self._frame_pose = None
+        self._frame_detect_timings = None
+        self._phase_started = time.perf_counter()
+        output = self._route_frame(timestamp_ms, detect)
+        
+        # Detector stages + phase logic (_run_phase1..4), ms
+        if self._config.collect_timings:
+            timings = dict(self._frame_detect_timings or {})
+            timings["phase_logic"] = (time.perf_counter() - self._phase_started) * 1000.0
+            output.timings = timings
+        
+        # Landmarks cho skeleton overlay (neu session yeu cau)
+        if self._config.landmark_format != "none" and self._frame_pose is not None:
+            output.landmarks = encode_landmarks(
+                self._frame_pose, self._config.landmark_format, self._landmark_indices
+            )
+        return output
+    
+    def _route_frame(
+        self,
+        timestamp_ms: int,
+        detect: Callable[[AppPhase], DetectionResult]
+    ) -> EngineOutput:
+        """
+        Detect (hoac du doan) roi routing den phase hien tai.
+        
+        Args:
+            timestamp_ms: Timestamp frame
+            detect: Tra ve DetectionResult cho phase hien tai
+                (VisionDetector hoac landmarks tu client)
+        """
         # Convert timestamp
         timestamp = timestamp_ms / 1000.0
         
-        # Process detection
-        result = self._detector.process_frame(frame, timestamp_ms)
-        
         # ====== ROUTING DEN PHASE HIEN TAI ======
         current_phase = self._state.current_phase
         
+        # Phase 4 khong dung ket qua detect -> khong chay inference
+        if current_phase in (AppPhase.PHASE4_SCORING, AppPhase.COMPLETED):
+            return self._run_phase4()
+        
+        # Keyframe mode (Phase 3): giua cac keyframe dung landmarks du doan
+        self._frame_predicted = False
+        if current_phase == AppPhase.PHASE3_SYNC and self._keyframe_scheduler is not None:
+            if (self._landmark_predictor.is_ready
+                    and not self._keyframe_scheduler.should_detect()):
+                self._frame_predicted = True
+                result = self._build_predicted_result(timestamp_ms)
+                self._frame_pose = result.pose_landmarks
+                return self._run_phase3(result, timestamp)
+        
+        result = detect(current_phase)
+        self._frame_pose = result.pose_landmarks
+        self._frame_detect_timings = result.timings
+        self._phase_started = time.perf_counter()
+        
+        if current_phase == AppPhase.PHASE3_SYNC and self._keyframe_scheduler is not None:
+            output = self._run_phase3(result, timestamp)
+            self._observe_keyframe(result, timestamp_ms)
+            return output
+        
         if current_phase == AppPhase.PHASE1_DETECTION:
             return self._run_phase1(result, timestamp)
         
@@ -453,6 +809,105 @@ class MemotionEngine:
         else:  # COMPLETED
             return self._run_phase4()
     
+    def _build_predicted_result(self, timestamp_ms: int) -> DetectionResult:
+        """DetectionResult voi pose landmarks du doan tu Kalman filter."""
+        predicted = self._landmark_predictor.predict(timestamp_ms)
+        # Giu visibility/presence cua keyframe, thay toa do bang du doan
+        data = self._last_keyframe_landmarks.data.copy()
+        data[:, :3] = predicted
+        return DetectionResult(
+            pose_landmarks=LandmarkSet(data, LandmarkType.POSE, timestamp_ms),
+            timestamp_ms=timestamp_ms,
+            is_valid=True,
+        )
+    
+    def _observe_keyframe(self, result: Any, timestamp_ms: int) -> None:
+        """Cap nhat predictor + khoang cach keyframe sau mot lan detect that."""
+        if result.has_pose():
+            self._last_keyframe_landmarks = result.pose_landmarks
+            self._landmark_predictor.update(result.pose_landmarks.to_numpy(), timestamp_ms)
+            self._keyframe_scheduler.observe(self._state.user_angle, timestamp_ms)
+        else:
+            # Mat pose: khong du doan tiep, detect lai frame sau
+            self._landmark_predictor.reset()
+            self._keyframe_scheduler.reset()
+    
+    def _force_keyframe(self) -> None:
+        """Frame sau bat buoc detect that (keyframe mode), vd sau pause / doi detector."""
+        if self._keyframe_scheduler is not None:
+            self._keyframe_scheduler.force_keyframe()
+    
+    def get_keyframe_stats(self) -> Optional[Dict[str, Any]]:
+        """Thong ke keyframe mode (None neu khong bat)."""
+        if self._keyframe_scheduler is None:
+            return None
+        stats = self._keyframe_scheduler.get_stats()
+        stats.update(self._landmark_predictor.get_stats())
+        return stats
+    
+    def set_detector_heads(
+        self,
+        pose: Optional[bool] = None,
+        face: Optional[bool] = None
+    ) -> None:
+        """
+        Override detector heads cho ca session (None = theo phase).
+        
+        Args:
+            pose: Bat/tat pose landmarker
+            face: Bat/tat face landmarker (tat = khong phan tich dau)
+        """
+        for head, enabled in (("pose", pose), ("face", face)):
+            if enabled is None:
+                self._heads_override.pop(head, None)
+            else:
+                self._heads_override[head] = bool(enabled)
+    
+    def _resolve_detector_heads(
+        self,
+        phase: AppPhase,
+        timestamp_ms: int,
+        heads: Optional[Dict[str, bool]] = None,
+        face_available: Optional[bool] = None
+    ) -> Tuple[bool, bool]:
+        """
+        Quyet dinh head nao chay cho frame nay.
+        
+        Thu tu uu tien: request > session override > mac dinh theo phase.
+        Face con bi gioi han boi face_analysis_hz va cho trong analysis queue.
+        
+        Args:
+            face_available: Co face input khong (None = detector co face model)
+        
+        Returns:
+            Tuple[bool, bool]: (run_pose, run_face)
+        """
+        resolved = dict(PHASE_DETECTOR_HEADS.get(phase, {"pose": True, "face": False}))
+        resolved.update(self._heads_override)
+        if heads:
+            resolved.update({k: bool(v) for k, v in heads.items() if k in resolved})
+        
+        if face_available is None:
+            face_available = self._detector.has_face_model
+        
+        run_pose = resolved["pose"]
+        run_face = (
+            resolved["face"]
+            and face_available
+            and not self._analysis_queue.full()
+        )
+        
+        if run_face and self._config.face_analysis_hz > 0:
+            interval_ms = 1000.0 / self._config.face_analysis_hz
+            last = self._last_face_ts_ms
+            # Timestamp lui (session moi / client reset) -> chay lai ngay
+            if last is not None and 0 <= timestamp_ms - last < interval_ms:
+                run_face = False
+        if run_face:
+            self._last_face_ts_ms = timestamp_ms
+        
+        return run_pose, run_face
+    
     def _create_error_output(self, error_msg: str) -> EngineOutput:
         """Tao output loi voi phase hien tai."""
         phase_num = self._get_phase_number()
@@ -667,7 +1122,7 @@ class MemotionEngine:
                         angle = calculate_joint_angle(landmarks, current_joint, use_3d=True)
                         self._state.user_angle = angle
                         output.current_angle = angle
-                        self._calibrator.add_frame(result.pose_landmarks, timestamp_ms)
+                        self._calibrator.add_frame(result.pose_landmarks, timestamp_ms, angle=angle)
                         
                         # Kiem tra hoan thanh
                         if self._calibrator.state == CalibrationState.COMPLETED:
@@ -803,7 +1258,8 @@ class MemotionEngine:
                         if self._video_engine.state != PlaybackState.PLAYING:
                             self._video_engine.play()
                 
-                ref_frame, ref_status = self._video_engine.get_frame()
+                # Headless: chi tien timeline theo timestamp frame, khong decode video mau
+                _, ref_status = self._video_engine.get_frame(timestamp)
                 
                 # Video progress
                 output.video_progress = (self._video_engine.current_frame / 
@@ -940,6 +1396,9 @@ class MemotionEngine:
         output.direction_hint = get_direction_hint(output.user_angle, output.target_angle)
         output.warning = self._state.warning if self._state.warning else None
         output.status = "paused" if self._state.is_paused else "syncing"
+        if self._landmark_predictor is not None:
+            output.is_predicted = self._frame_predicted
+            output.prediction_error = self._landmark_predictor.last_error
         
         # Track angles
         self._user_angles.append(self._state.user_angle)
@@ -979,16 +1438,15 @@ class MemotionEngine:
         return joint_errors
     
     def _calculate_all_joint_angles(self, landmarks: np.ndarray) -> Dict[JointType, float]:
-        """Tinh goc tat ca khop dang tracking."""
+        """Tinh goc tat ca khop dang tracking (mot lan goi kernel vector hoa)."""
+        joints = self._state.active_joints
         angles: Dict[JointType, float] = {}
-        for joint_type in self._state.active_joints:
-            try:
-                angle = calculate_joint_angle(landmarks, joint_type, use_3d=True)
+        for joint_type, angle in zip(joints, compute_joint_angles(landmarks, joints).tolist()):
+            if angle == angle:
                 angles[joint_type] = angle
-            except (ValueError, IndexError):
-                # Giu gia tri cu neu khong tinh duoc
-                if joint_type in self._state.user_angles_dict:
-                    angles[joint_type] = self._state.user_angles_dict[joint_type]
+            elif joint_type in self._state.user_angles_dict:
+                # Giu gia tri cu neu khong tinh duoc (NaN)
+                angles[joint_type] = self._state.user_angles_dict[joint_type]
         return angles
     
     def _interpolate_target_angle(
@@ -1240,16 +1698,23 @@ class MemotionEngine:
         Returns:
             EngineOutput voi phase=4 va final_report data
         """
-        # Cache report de tranh goi nhieu lan
-        if not hasattr(self, '_cached_final_report') or self._cached_final_report is None:
-            self._cached_final_report = self._generate_final_report()
-        
         return EngineOutput(
             current_phase=4,
             phase_name="scoring",
-            final_report=self._cached_final_report.to_dict()
+            final_report=self.get_final_report().to_dict()
         )
     
+    def get_final_report(self) -> FinalReportOutput:
+        """
+        Bao cao tong ket cua session (tinh 1 lan, cac lan sau dung cache).
+        
+        Goi duoc o bat ky phase nao (vd. ket thuc session som, het video offline).
+        """
+        # Cache report de tranh goi nhieu lan
+        if getattr(self, '_cached_final_report', None) is None:
+            self._cached_final_report = self._generate_final_report()
+        return self._cached_final_report
+    
     def _generate_final_report(self) -> FinalReportOutput:
         """Tao bao cao cuoi cung."""
         
@@ -1352,8 +1817,11 @@ class MemotionEngine:
         fps = 30.0
         
         if has_video:
+            # Chuyen dong mau dung chung (trich xuat mot lan cho moi video)
+            self._reference_motion = self._load_reference_motion()
+            
             # Setup video engine
-            self._video_engine = VideoEngine(self._config.ref_video_path)
+            self._video_engine = self._create_video_engine()
             total_frames = self._video_engine.total_frames
             fps = self._video_engine.fps
         else:
@@ -1391,6 +1859,10 @@ class MemotionEngine:
         else:
             exercise = create_arm_raise_exercise(total_frames, fps, max_angle=max_angle)
         
+        # Checkpoint theo moc pha do duoc trong video mau (thay ti le co dinh)
+        if self._reference_motion is not None:
+            align_exercise_checkpoints(exercise, self._reference_motion, primary_joint)
+        
         self._state.exercise_name = exercise.name
         
         # Tao sync controller
@@ -1406,9 +1878,7 @@ class MemotionEngine:
         
         # Setup video playback (only if has video)
         if self._video_engine:
-            checkpoint_frames = [cp.frame_index for cp in exercise.checkpoints]
-            self._video_engine.set_checkpoints(checkpoint_frames)
-            self._video_engine.set_speed(0.7)
+            self._setup_video_playback(exercise)
         
         # Session ID
         session_id = f"session_{int(time.time())}"
@@ -1424,6 +1894,55 @@ class MemotionEngine:
         if self._video_engine:
             self._video_engine.play()
     
+    def _load_reference_motion(self) -> Optional[ReferenceMotion]:
+        """
+        ReferenceMotion cua video mau tu cache, khong chan frame.
+
+        None (-> ti le mac dinh) neu tat, loi, hoac video chua san sang: lan
+        dau gap video, viec trich xuat chay o thread nen cua cache, cac
+        session sau moi dung moc pha do duoc.
+        """
+        if not self._config.reference_cache:
+            return None
+        
+        def create_detector() -> VisionDetector:
+            # Detector rieng: khong dung chung timestamp / ROI voi detector cua session
+            config = self.build_detector_config(self._config)
+            config.face_model_path = None
+            config.use_roi = False
+            return VisionDetector(config)
+        
+        try:
+            return get_reference_motion_nowait(self._config.ref_video_path, create_detector)
+        except Exception as e:
+            logging.warning(f"_load_reference_motion: {self._config.ref_video_path}: {e}")
+            return None
+    
+    def _create_video_engine(self) -> VideoEngine:
+        """
+        VideoEngine headless cho video mau: server chi can vi tri / checkpoint /
+        loop cua video (client tu phat video), khong decode pixel. Co
+        ReferenceMotion thi dung luon metadata cua no, khong mo video.
+        """
+        info = None
+        motion = self._reference_motion
+        if motion is not None:
+            info = VideoInfo(
+                path=self._config.ref_video_path,
+                width=motion.width,
+                height=motion.height,
+                fps=motion.fps,
+                total_frames=motion.total_frames,
+                duration_seconds=motion.duration_seconds
+            )
+        return VideoEngine(self._config.ref_video_path, headless=True, info=info)
+    
+    def _setup_video_playback(self, exercise: Any) -> None:
+        """Checkpoints + toc do phat video mau theo bai tap."""
+        checkpoint_frames = [cp.frame_index for cp in exercise.checkpoints]
+        self._video_engine.set_checkpoints(checkpoint_frames)
+        self._video_engine.set_speed(0.7)
+    
     def _transition_to_phase4(self) -> None:
         """Chuyen sang Phase 4: Scoring."""
         self._state.current_phase = AppPhase.PHASE4_SCORING
@@ -1447,6 +1966,8 @@ class MemotionEngine:
             self._state.is_paused = False
             if self._video_engine:
                 self._video_engine.play()
+            # Nguoi dung co the da doi tu the trong luc pause
+            self._force_keyframe()
     
     def restart(self) -> None:
         """Restart tu dau - reset toan bo state."""
@@ -1556,6 +2077,75 @@ class MemotionEngine:
             "session_duration_seconds": int(time.time() - self._state.session_start_time),
         }
     
+    # ==================== CHECKPOINT ====================
+    
+    def create_checkpoint(self) -> bytes:
+        """
+        Serialize state session (phase, khop da calibrate, lich su scorer, ...).
+        
+        Dung de resume session o worker khac / sau khi restart ma khong phai
+        calibrate lai. Khong chua detector, video hay file log.
+        
+        Returns:
+            bytes: Checkpoint du lieu thuan, co version (vai KB)
+        
+        Raises:
+            TypeError: State chua kieu ngoai CHECKPOINT_TYPES
+        """
+        payload = {
+            "attributes": {
+                name: getattr(self, name)
+                for name in CHECKPOINT_ATTRIBUTES
+                if hasattr(self, name)
+            },
+            "video_frame": self._video_engine.current_frame if self._video_engine else None,
+        }
+        return dump_checkpoint(payload, CHECKPOINT_VERSION, CHECKPOINT_TYPES)
+    
+    def restore_checkpoint(self, data: bytes) -> None:
+        """
+        Khoi phuc state tu create_checkpoint() vao engine moi (cung config).
+        
+        Khong bao gio unpickle: chi tao lai cac class trong CHECKPOINT_TYPES.
+        
+        Raises:
+            ValueError: Checkpoint khong dung version / format, hoac hong
+            RuntimeError: Khong khoi tao duoc engine
+        """
+        payload = load_checkpoint(data, CHECKPOINT_VERSION, CHECKPOINT_TYPES)
+        
+        if not self._initialized and not self.initialize():
+            raise RuntimeError(self._state.message or "Engine not initialized")
+        
+        instance_id = self._state.instance_id
+        for name, value in payload["attributes"].items():
+            setattr(self, name, value)
+        self._state.instance_id = instance_id
+        
+        # Landmarks du doan / analysis queue bat dau lai
+        if self._landmark_predictor is not None:
+            self._landmark_predictor.reset()
+            self._keyframe_scheduler.reset()
+        self._last_face_ts_ms = None
+        
+        if self._state.current_phase == AppPhase.PHASE3_SYNC:
+            self._resume_phase3(payload.get("video_frame"))
+    
+    def _resume_phase3(self, video_frame: Optional[int]) -> None:
+        """Mo lai video mau + log session sau khi restore o Phase 3."""
+        has_video = (self._config.ref_video_path and
+                     Path(self._config.ref_video_path).exists())
+        if has_video and video_frame is not None and self._sync_controller:
+            self._reference_motion = self._load_reference_motion()
+            self._video_engine = self._create_video_engine()
+            self._setup_video_playback(self._sync_controller.exercise)
+            self._video_engine.seek(video_frame)
+            if not self._state.is_paused:
+                self._video_engine.play()
+        
+        if self._logger and self._state.session_id:
+            self._logger.start_session(self._state.session_id, self._state.exercise_name)
+    
     # ==================== CLEANUP ====================
     
     def cleanup(self) -> None:
@@ -1564,11 +2154,12 @@ class MemotionEngine:
             self._video_engine.release()
             self._video_engine = None
         if self._detector:
-            self._detector.close()
+            if self._detector_pool:
+                self._detector_pool.release(self._detector)
+            else:
+                self._detector.close()
             self._detector = None
-        if self._ref_detector:
-            self._ref_detector.close()
-            self._ref_detector = None
+        self._detector_pool = None
         
         self._initialized = False
     
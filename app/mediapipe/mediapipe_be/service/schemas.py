@@ -9,7 +9,7 @@ Version: 1.0.0
 """
 
 from dataclasses import dataclass, field, asdict
-from typing import List, Optional, Dict, Literal
+from typing import Any, List, Optional, Dict, Literal, Tuple
 from enum import Enum
 
 
@@ -233,6 +233,10 @@ class SyncOutput:
         warning: Cảnh báo (nếu có)
         
         status: Trạng thái sync (syncing, paused, complete)
+        
+        # Keyframe mode
+        is_predicted: Landmarks frame này là dự đoán (không chạy MediaPipe)
+        prediction_error: Sai số dự đoán đo ở keyframe gần nhất (normalized)
     """
     # Primary joint
     user_angle: float = 0.0
@@ -267,6 +271,10 @@ class SyncOutput:
     status: str = "syncing"  # syncing, paused, complete
     is_free_training: bool = False  # True neu khong co video sync
     
+    # Keyframe mode (None = khong bat)
+    is_predicted: bool = False
+    prediction_error: Optional[float] = None
+    
     def to_dict(self) -> Dict:
         return {
             "user_angle": round(self.user_angle, 1),
@@ -286,7 +294,10 @@ class SyncOutput:
             "direction_hint": self.direction_hint,
             "warning": self.warning,
             "status": self.status,
-            "is_free_training": self.is_free_training
+            "is_free_training": self.is_free_training,
+            "is_predicted": self.is_predicted,
+            "prediction_error": (round(self.prediction_error, 4)
+                                 if self.prediction_error is not None else None)
         }
 
 
@@ -439,6 +450,49 @@ class FinalReportOutput:
 
 # ==================== COMPOSITE OUTPUT ====================
 
+# ==================== WIRE FORMAT ====================
+
+# Field (ten, mac dinh) gui cho client theo phase - dung chung cho WebSocket va REST
+WIRE_FIELDS: Dict[int, Tuple[Tuple[str, Any], ...]] = {
+    1: (
+        ("pose_detected", False), ("stable_count", 0), ("progress", 0.0),
+        ("countdown_remaining", None), ("status", ""), ("message", ""),
+        ("landmarks", []),
+    ),
+    2: (
+        ("current_joint", None), ("current_joint_name", None), ("queue_index", 0),
+        ("total_joints", 6), ("progress", 0.0), ("overall_progress", 0.0),
+        ("current_angle", 0.0), ("user_max_angle", 0.0), ("countdown_remaining", None),
+        ("status", ""), ("position_instruction", ""), ("joints_status", []),
+        ("message", ""),
+    ),
+    3: (
+        ("video_frame", None), ("current_score", 0.0), ("rep_count", 0),
+        ("fatigue_level", "FRESH"), ("joint_errors", []), ("motion_phase", ""),
+        ("feedback", ""), ("is_predicted", False), ("prediction_error", None),
+    ),
+    4: (
+        ("total_score", 0.0), ("rom_score", 0.0), ("stability_score", 0.0),
+        ("flow_score", 0.0), ("grade", ""), ("grade_color", "yellow"),
+        ("total_reps", 0), ("recommendations", []),
+    ),
+}
+
+WIRE_DEFAULT_MESSAGES: Dict[int, str] = {
+    1: "Đang phát hiện tư thế...",
+    2: "Đang hiệu chỉnh khớp...",
+    3: "Đang đồng bộ với video...",
+    4: "Hoàn thành!",
+}
+
+
+def build_wire_data(phase: int, phase_data: Optional[Dict]) -> Dict:
+    """Chon cac field cua phase gui cho client (thieu -> gia tri mac dinh)."""
+    phase_data = phase_data or {}
+    get = phase_data.get
+    return {name: get(name, default) for name, default in WIRE_FIELDS.get(phase, ())}
+
+
 @dataclass
 class EngineOutput:
     """
@@ -459,6 +513,8 @@ class EngineOutput:
         final_report: Output Phase 4 (neu phase 4)
         timestamp_ms: Timestamp cua frame (optional)
         error: Thong bao loi (neu co)
+        landmarks: Pose landmarks da ma hoa cho client (theo landmark_format), None neu khong gui
+        timings: Thoi gian tung stage cua frame (ms), None neu khong bat collect_timings
     """
     current_phase: int = 1
     phase_name: str = "detection"
@@ -469,6 +525,8 @@ class EngineOutput:
     timestamp_ms: Optional[int] = None
     error: Optional[str] = None
     transition: Optional[Dict] = None  # Thong tin chuyen phase
+    landmarks: Optional[Any] = None
+    timings: Optional[Dict[str, float]] = None
     
     @property
     def phase(self) -> int:
@@ -511,6 +569,8 @@ class EngineOutput:
             result["final_report"] = self.final_report
         if self.transition:
             result["transition"] = self.transition
+        if self.landmarks is not None:
+            result["landmarks"] = self.landmarks
         
         return result
     
@@ -518,6 +578,38 @@ class EngineOutput:
         """Convert sang JSON string."""
         import json
         return json.dumps(self.to_dict(), ensure_ascii=False)
+    
+    def to_wire(self) -> Dict:
+        """
+        Message gui thang qua WebSocket (khong qua to_dict / Pydantic).
+        
+        Returns:
+            Dict: {"phase", "phase_name", "data", "message", "warning"}
+        """
+        phase = self.current_phase
+        if phase == 1:
+            phase_data = self.detection
+        elif phase == 2:
+            phase_data = self.calibration
+        elif phase == 3:
+            phase_data = self.sync
+        else:
+            phase_data = self.final_report
+        
+        data = build_wire_data(phase, phase_data)
+        if self.landmarks is not None:
+            data["landmarks"] = self.landmarks
+        
+        message = {
+            "phase": phase,
+            "phase_name": self.phase_name,
+            "data": data,
+            "message": (phase_data or {}).get("message") or WIRE_DEFAULT_MESSAGES.get(phase),
+            "warning": None,  # EngineOutput khong co warning cap top (giong REST)
+        }
+        if self.timings is not None:
+            message["timings"] = self.timings
+        return message
 
 
 # ==================== HELPER FUNCTIONS ====================
@@ -7,7 +7,7 @@ Author: MEMOTION Team
 Version: 3.0.0
 """
 
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Union
 from pydantic import BaseModel, Field
 from enum import Enum
 
@@ -39,6 +39,15 @@ class StartSessionRequest(BaseModel):
     exercise_type: Optional[str] = Field("arm_raise", description="Exercise type")
     ref_video_path: Optional[str] = Field(None, description="Reference video path")
     default_joint: str = Field("left_shoulder", description="Default calibration joint")
+    landmark_format: Optional[str] = Field(
+        None, description="Landmarks in frame responses: none | full | compact | compact_bin"
+    )
+    landmark_joints: Optional[List[Union[int, str]]] = Field(
+        None, description="Landmark subset (indices or names, e.g. \"left_elbow\"); default all 33"
+    )
+    input_mode: str = Field(
+        "image", description="image (server runs MediaPipe) | landmarks (client sends on-device pose landmarks)"
+    )
 
 
 class ProcessFrameRequest(BaseModel):
@@ -46,6 +55,9 @@ class ProcessFrameRequest(BaseModel):
     session_id: str = Field(..., description="Session identifier")
     frame_data: str = Field(..., description="Base64 encoded frame")
     timestamp_ms: int = Field(..., description="Frame timestamp in milliseconds")
+    heads: Optional[Dict[str, bool]] = Field(
+        None, description="Per-frame detector head override, e.g. {\"face\": false}"
+    )
 
 
 # ==================== RESPONSE SCHEMAS ====================
@@ -94,3 +106,26 @@ class PoseHealthResponse(BaseModel):
     mediapipe_available: bool = Field(..., description="MediaPipe availability")
     active_sessions: int = Field(..., description="Active sessions count")
     version: str = Field(..., description="Service version")
+    detector_pool: Optional[Dict[str, Any]] = Field(None, description="Detector pool utilisation")
+
+
+class AnalysisJobResponse(BaseModel):
+    """Response after uploading a recorded video for offline analysis."""
+    job_id: str = Field(..., description="Analysis job identifier")
+    status: str = Field(..., description="queued | running | completed | failed")
+    status_url: str = Field(..., description="Job status / result URL")
+    events_url: str = Field(..., description="Server-Sent Events URL (progress + final report)")
+
+
+class AnalysisJobStatusResponse(BaseModel):
+    """Progress (and final report once completed) of an offline analysis job."""
+    job_id: str
+    status: str = Field(..., description="queued | running | completed | failed")
+    progress: float = Field(0.0, description="Fraction of video frames processed (0-1)")
+    frames_processed: int = 0
+    frames_total: int = 0
+    phase: int = Field(1, description="Engine phase reached (1-4)")
+    phase_name: str = "detection"
+    processing_fps: float = Field(0.0, description="Analysis throughput in frames per second")
+    error: Optional[str] = None
+    report: Optional[Dict[str, Any]] = Field(None, description="Final report (FinalReportOutput)")
@@ -0,0 +1,263 @@
+"""
+Pose Session Admission Control.
+
+Every live session costs a roughly constant share of CPU (decode + MediaPipe
+at the client's frame rate). Admitting sessions beyond what the node can
+sustain makes every session's fps collapse, so ``start_session`` asks the
+admission controller first:
+
+    load(session)  = EWMA(inference seconds per frame) / EWMA(frame interval)
+                     (cores; the per-mode estimate until enough frames are seen)
+    committed      = sum(load of admitted sessions)
+    admit when       committed + estimate(new session) <= cpu_budget
+
+When the budget is exhausted the request waits in a short FIFO queue
+(``queue_timeout``) for capacity to free up; if the queue is full or the
+estimated wait is longer than the timeout it is rejected immediately with
+``PoseAdmissionRejected`` (503 + Retry-After). Sessions already admitted are
+never throttled, and sessions restored from a checkpoint are re-admitted
+unconditionally.
+
+Author: MEMOTION Team
+Version: 1.0.0
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from app.core.config import settings
+from app.helpers.exception_handler import CustomException
+
+logger = logging.getLogger(__name__)
+
+# Frames measured before a session's own load replaces the estimate
+MIN_MEASURED_FRAMES = 10
+# Smoothing of per-frame cost / interval and of per-mode estimates
+EWMA_ALPHA = 0.1
+# Pauses longer than this do not count as the client's frame interval
+MAX_FRAME_INTERVAL = 1.0
+# Expected session length before any session has finished (seconds)
+DEFAULT_SESSION_DURATION = 600.0
+MIN_RETRY_AFTER = 5
+
+
+class PoseAdmissionRejected(CustomException):
+    """Raised when a new session cannot be admitted; carries a Retry-After."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(http_code=503, code='503', message=message)
+        self.retry_after = retry_after
+        self.headers = {"Retry-After": str(retry_after)}
+
+
+class _SessionCost:
+    """Measured inference cost of one admitted session."""
+
+    __slots__ = ("input_mode", "estimate", "frame_seconds", "interval",
+                 "last_frame_at", "frames", "admitted_at")
+
+    def __init__(self, input_mode: str, estimate: float):
+        self.input_mode = input_mode
+        self.estimate = estimate
+        self.frame_seconds = 0.0
+        self.interval = 0.0
+        self.last_frame_at: Optional[float] = None
+        self.frames = 0
+        self.admitted_at = time.monotonic()
+
+    @property
+    def measured(self) -> bool:
+        return self.frames >= MIN_MEASURED_FRAMES and self.interval > 0
+
+    @property
+    def load(self) -> float:
+        """Cores used by this session (estimate until measured)."""
+        if not self.measured:
+            return self.estimate
+        return self.frame_seconds / self.interval
+
+
+class PoseAdmissionController:
+    """
+    CPU-budget admission control for new pose sessions.
+
+    Usage:
+        pose_admission_controller.admit(session_id, input_mode)   # may block / raise
+        pose_admission_controller.record_frame(session_id, seconds)
+        pose_admission_controller.release(session_id)
+    """
+
+    def __init__(
+        self,
+        cpu_budget: float,
+        default_costs: Dict[str, float],
+        enabled: bool = True,
+        max_queue: int = 8,
+        queue_timeout: float = 10.0
+    ):
+        """
+        Args:
+            cpu_budget: Cores available to pose sessions on this worker
+            default_costs: Estimated cores per session by input mode, used
+                until sessions of that mode have been measured
+            enabled: Off = every session is admitted (costs still measured)
+            max_queue: Requests allowed to wait for capacity at once
+            queue_timeout: Longest a request waits before being rejected
+        """
+        self.cpu_budget = cpu_budget
+        self.enabled = enabled
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+
+        self._mode_costs: Dict[str, float] = dict(default_costs)
+        self._sessions: Dict[str, _SessionCost] = {}
+        self._waiting: Deque[str] = deque()
+        self._avg_duration = DEFAULT_SESSION_DURATION
+        self._cond = threading.Condition()
+
+        # Counters
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+
+    # ==================== ADMISSION ====================
+
+    def admit(self, session_id: str, input_mode: str = "image", force: bool = False) -> None:
+        """
+        Reserve capacity for a new session, waiting up to ``queue_timeout``.
+
+        Args:
+            force: Admit regardless of the budget (restored sessions)
+
+        Raises:
+            PoseAdmissionRejected: Budget exhausted and queue full / wait too long.
+        """
+        with self._cond:
+            estimate = self._estimate(input_mode)
+            if force or not self.enabled or (not self._waiting and self._fits(estimate)):
+                self._add(session_id, input_mode, estimate)
+                return
+
+            wait = self._estimated_wait(estimate)
+            if len(self._waiting) >= self.max_queue or wait > self.queue_timeout:
+                self._reject(estimate, wait)
+
+            self.queued += 1
+            self._waiting.append(session_id)
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while not (self._waiting[0] == session_id and self._fits(estimate)):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._reject(estimate, self._estimated_wait(estimate))
+                    self._cond.wait(remaining)
+                self._add(session_id, input_mode, estimate)
+            finally:
+                self._waiting.remove(session_id)
+                self._cond.notify_all()
+
+    def release(self, session_id: str) -> None:
+        """Return a session's capacity (session ended, evicted or handed off)."""
+        with self._cond:
+            cost = self._sessions.pop(session_id, None)
+            if cost is None:
+                return
+            if cost.measured:
+                previous = self._mode_costs.get(cost.input_mode, cost.load)
+                self._mode_costs[cost.input_mode] = previous + EWMA_ALPHA * (cost.load - previous)
+            duration = time.monotonic() - cost.admitted_at
+            self._avg_duration += EWMA_ALPHA * (duration - self._avg_duration)
+            self._cond.notify_all()
+
+    def record_frame(self, session_id: str, seconds: float) -> None:
+        """Account the inference time of one frame of an admitted session."""
+        cost = self._sessions.get(session_id)
+        if cost is None:
+            return
+        now = time.monotonic()
+        if cost.frames == 0:
+            cost.frame_seconds = seconds
+        else:
+            cost.frame_seconds += EWMA_ALPHA * (seconds - cost.frame_seconds)
+        if cost.last_frame_at is not None:
+            interval = min(now - cost.last_frame_at, MAX_FRAME_INTERVAL)
+            if cost.interval == 0:
+                cost.interval = interval
+            else:
+                cost.interval += EWMA_ALPHA * (interval - cost.interval)
+        cost.last_frame_at = now
+        cost.frames += 1
+
+    # ==================== INTERNAL ====================
+
+    def _add(self, session_id: str, input_mode: str, estimate: float) -> None:
+        self._sessions[session_id] = _SessionCost(input_mode, estimate)
+        self.admitted += 1
+
+    def _committed(self) -> float:
+        return sum(cost.load for cost in self._sessions.values())
+
+    def _fits(self, estimate: float) -> bool:
+        return self._committed() + estimate <= self.cpu_budget
+
+    def _estimate(self, input_mode: str) -> float:
+        return self._mode_costs.get(input_mode, self._mode_costs.get("image", 1.0))
+
+    def _estimated_wait(self, estimate: float) -> float:
+        """Seconds until enough sessions are expected to end for ``estimate`` to fit."""
+        now = time.monotonic()
+        # Requests already queued are admitted first (assume the same cost)
+        needed = self._committed() + estimate * (len(self._waiting) + 1) - self.cpu_budget
+        ending = sorted(
+            (max(0.0, self._avg_duration - (now - cost.admitted_at)), cost.load)
+            for cost in self._sessions.values()
+        )
+        freed = 0.0
+        for remaining, load in ending:
+            freed += load
+            if freed >= needed:
+                return remaining
+        return self._avg_duration
+
+    def _reject(self, estimate: float, wait: float) -> None:
+        self.rejected += 1
+        retry_after = max(MIN_RETRY_AFTER, int(math.ceil(wait)))
+        logger.warning(
+            f"admit: Rejected (committed={self._committed():.2f}/{self.cpu_budget:.2f} cores, "
+            f"estimate={estimate:.2f}, wait~{retry_after}s)"
+        )
+        raise PoseAdmissionRejected(
+            f"Server at capacity, estimated wait {retry_after}s", retry_after
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "enabled": self.enabled,
+                "cpu_budget": self.cpu_budget,
+                "committed": round(self._committed(), 3),
+                "sessions": len(self._sessions),
+                "waiting": len(self._waiting),
+                "estimated_session_cost": {mode: round(cost, 3) for mode, cost in self._mode_costs.items()},
+                "avg_session_seconds": round(self._avg_duration, 1),
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "rejected": self.rejected,
+            }
+
+
+pose_admission_controller = PoseAdmissionController(
+    cpu_budget=settings.POSE_ADMISSION_CPU_BUDGET or 0.8 * (os.cpu_count() or 1),
+    default_costs={
+        "image": settings.POSE_ADMISSION_SESSION_COST,
+        "landmarks": settings.POSE_ADMISSION_LANDMARKS_SESSION_COST,
+    },
+    enabled=settings.POSE_ADMISSION_ENABLED,
+    max_queue=settings.POSE_ADMISSION_MAX_QUEUE,
+    queue_timeout=settings.POSE_ADMISSION_QUEUE_TIMEOUT
+)
@@ -0,0 +1,116 @@
+"""
+Pose Session Checkpoint Store.
+
+Persists MemotionEngine checkpoints (``create_checkpoint()``) plus the
+session metadata needed to rebuild the engine, so that a reconnecting
+client - or a different uvicorn worker on the same host - resumes a
+session without repeating Phase 1/2 calibration.
+
+One file per session in ``directory``:
+
+    offset  size  field
+    0       4     metadata length N (uint32, little-endian)
+    4       N     metadata (UTF-8 JSON: user_id, input_mode, config, phase, saved_at)
+    4+N     ...   engine checkpoint (versioned data-only format written by the
+                  engine, see mediapipe_be/service/checkpoint_codec.py)
+
+Files are written to a temporary name and renamed, so readers never see a
+partial checkpoint. Nothing in a checkpoint is unpickled: the engine
+rebuilds only an allowlist of state classes and rejects other versions.
+
+Author: MEMOTION Team
+Version: 1.0.0
+"""
+
+import json
+import logging
+import os
+import re
+import struct
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_META_LENGTH = struct.Struct("<I")
+_SAFE_ID = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+class PoseCheckpointStore:
+    """Local-filesystem store of session checkpoints, expired after ``ttl_seconds``."""
+
+    def __init__(self, directory: str, ttl_seconds: int = 3600, enabled: bool = True):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.saves = 0
+        self.restores = 0
+        self.last_bytes = 0
+
+    def _path(self, session_id: str) -> str:
+        return os.path.join(self.directory, f"{_SAFE_ID.sub('_', session_id)}.ckpt")
+
+    def save(self, session_id: str, metadata: Dict[str, Any], checkpoint: bytes) -> None:
+        """Atomically write (replace) the checkpoint of a session."""
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        meta = json.dumps({**metadata, "saved_at": time.time()}).encode("utf-8")
+
+        path = self._path(session_id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_META_LENGTH.pack(len(meta)))
+            f.write(meta)
+            f.write(checkpoint)
+        os.replace(tmp_path, path)
+
+        self.saves += 1
+        self.last_bytes = _META_LENGTH.size + len(meta) + len(checkpoint)
+
+    def load(self, session_id: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        """(metadata, checkpoint) of a session, or None if missing / expired / corrupt."""
+        if not self.enabled:
+            return None
+        path = self._path(session_id)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                self.delete(session_id)
+                return None
+            with open(path, "rb") as f:
+                data = f.read()
+            (meta_length,) = _META_LENGTH.unpack_from(data, 0)
+            start = _META_LENGTH.size
+            metadata = json.loads(data[start:start + meta_length].decode("utf-8"))
+            checkpoint = data[start + meta_length:]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"load: Ignoring unreadable checkpoint for {session_id}: {e}")
+            return None
+
+        self.restores += 1
+        return metadata, checkpoint
+
+    def delete(self, session_id: str) -> None:
+        try:
+            os.remove(self._path(session_id))
+        except OSError:
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "saves": self.saves,
+            "restores": self.restores,
+            "last_bytes": self.last_bytes,
+        }
+
+
+pose_checkpoint_store = PoseCheckpointStore(
+    directory=settings.POSE_CHECKPOINT_DIR,
+    ttl_seconds=settings.POSE_SESSION_TIMEOUT,
+    enabled=settings.POSE_CHECKPOINT_ENABLED
+)
@@ -0,0 +1,276 @@
+"""
+Pose Inference Executor.
+
+Runs the CPU-heavy part of pose streaming (frame decode + MemotionEngine
+inference) off the asyncio event loop so that one patient's frames never
+stall other sockets, HTTP requests or health checks on the same worker.
+
+Guarantees:
+    - Per-session ordering: frames of one session are processed strictly
+      in arrival order (one in flight per session at a time).
+    - Bounded queue: at most ``max_pending`` frames wait or run globally,
+      and at most ``max_pending_per_session`` per session.
+    - Explicit overload: when a bound is hit, ``PoseExecutorOverloaded``
+      (a CustomException with http_code 503) is raised immediately instead
+      of queueing more work.
+    - No orphaned work: cancelling a caller (e.g. the socket closed) does
+      not stop a call already running on a pool thread, so the caller - and
+      with it the session lane - waits for that call to finish before the
+      cancellation propagates. Nothing else touches the engine meanwhile.
+
+Author: MEMOTION Team
+Version: 1.0.0
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional, TypeVar
+
+from app.core.config import settings
+from app.helpers.exception_handler import CustomException
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+EXECUTOR_MODES = ("thread", "process")
+
+
+class PoseExecutorOverloaded(CustomException):
+    """Raised when the inference queue (global or per-session) is full."""
+
+    def __init__(self, message: str):
+        super().__init__(http_code=503, code='503', message=message)
+
+
+class _SessionLane:
+    """Per-session FIFO lane: an asyncio lock plus a pending counter."""
+
+    __slots__ = ("lock", "pending")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = 0
+
+
+class PoseInferenceExecutor:
+    """
+    Bounded, session-ordered executor for pose frame processing.
+
+    Stateful work (``MemotionEngine.process_frame``) always runs on a thread
+    pool because engines live in this process. Stateless helpers such as
+    frame decoding run on a process pool when ``mode == "process"`` so that
+    decode CPU is taken off the GIL-holding worker as well.
+
+    Usage:
+        async with pose_inference_executor.session_slot(session_id):
+            frame = await pose_inference_executor.run_stateless(decode_frame_data, data)
+            result = await pose_inference_executor.run_stateful(
+                pose_detection_service.process_frame_wire, session_id, frame, ts
+            )
+    """
+
+    def __init__(
+        self,
+        mode: str = "thread",
+        max_workers: int = 4,
+        max_pending: int = 64,
+        max_pending_per_session: int = 2
+    ):
+        """
+        Initialize executor.
+
+        Args:
+            mode: "thread" or "process" (process pool for stateless helpers)
+            max_workers: Worker count for the inference pool(s)
+            max_pending: Global bound on queued + running frames
+            max_pending_per_session: Bound on queued + running frames per session
+        """
+        if mode not in EXECUTOR_MODES:
+            logger.warning(f"PoseInferenceExecutor: unknown mode '{mode}', falling back to 'thread'")
+            mode = "thread"
+
+        self._mode = mode
+        self._max_workers = max(1, max_workers)
+        self._max_pending = max(1, max_pending)
+        self._max_pending_per_session = max(1, max_pending_per_session)
+
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+
+        self._lanes: Dict[str, _SessionLane] = {}
+        self._pending = 0
+
+        # Counters
+        self._completed = 0
+        self._rejected = 0
+        self._failed = 0
+
+        logger.info(
+            f"PoseInferenceExecutor initialized: mode={self._mode}, workers={self._max_workers}, "
+            f"max_pending={self._max_pending}, per_session={self._max_pending_per_session}"
+        )
+
+    @property
+    def mode(self) -> str:
+        return self._mode
+
+    # ==================== POOLS ====================
+
+    def _get_thread_pool(self) -> ThreadPoolExecutor:
+        """Lazily create the thread pool used for stateful engine calls."""
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self._max_workers,
+                thread_name_prefix="pose-infer"
+            )
+        return self._thread_pool
+
+    def _get_stateless_pool(self) -> Executor:
+        """Pool for stateless helpers (process pool in "process" mode)."""
+        if self._mode != "process":
+            return self._get_thread_pool()
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=self._max_workers)
+        return self._process_pool
+
+    # ==================== ADMISSION + ORDERING ====================
+
+    @asynccontextmanager
+    async def session_slot(self, session_id: str) -> AsyncIterator[None]:
+        """
+        Reserve a queue slot for one frame of ``session_id`` and hold the
+        session lane while the frame is processed.
+
+        Raises:
+            PoseExecutorOverloaded: If the global or per-session bound is hit.
+        """
+        lane = self._lanes.get(session_id)
+        if lane is None:
+            lane = _SessionLane()
+            self._lanes[session_id] = lane
+
+        if self._pending >= self._max_pending:
+            self._rejected += 1
+            raise PoseExecutorOverloaded(
+                f"Pose inference queue full ({self._max_pending} pending frames)"
+            )
+        if lane.pending >= self._max_pending_per_session:
+            self._rejected += 1
+            raise PoseExecutorOverloaded(
+                f"Too many pending frames for session {session_id} "
+                f"(max {self._max_pending_per_session})"
+            )
+
+        self._pending += 1
+        lane.pending += 1
+        try:
+            # asyncio.Lock wakes waiters in FIFO order -> per-session ordering
+            async with lane.lock:
+                yield
+            self._completed += 1
+        except PoseExecutorOverloaded:
+            raise
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            self._pending -= 1
+            lane.pending -= 1
+
+    @asynccontextmanager
+    async def session_exclusive(self, session_id: str) -> AsyncIterator[None]:
+        """
+        Hold the session lane without taking a queue slot.
+
+        For housekeeping that must not overlap a frame of the same session
+        (checkpoint on disconnect) and must not be rejected as overload.
+        """
+        lane = self._lanes.get(session_id)
+        if lane is None:
+            lane = _SessionLane()
+            self._lanes[session_id] = lane
+        async with lane.lock:
+            yield
+
+    async def run_stateful(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run ``fn`` on the inference thread pool (engine calls)."""
+        loop = asyncio.get_running_loop()
+        return await _finish_before_cancel(loop.run_in_executor(
+            self._get_thread_pool(), functools.partial(fn, *args, **kwargs)
+        ))
+
+    async def run_stateless(self, fn: Callable[..., T], *args: Any) -> T:
+        """
+        Run a picklable, stateless ``fn`` (e.g. frame decode).
+
+        Uses the process pool in "process" mode, otherwise the thread pool.
+        """
+        loop = asyncio.get_running_loop()
+        return await _finish_before_cancel(
+            loop.run_in_executor(self._get_stateless_pool(), fn, *args)
+        )
+
+    def release_session(self, session_id: str) -> None:
+        """Forget the lane of a finished session (no-op if frames still pending)."""
+        lane = self._lanes.get(session_id)
+        if lane is not None and lane.pending == 0:
+            del self._lanes[session_id]
+
+    # ==================== STATS / LIFECYCLE ====================
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get executor statistics."""
+        return {
+            "mode": self._mode,
+            "workers": self._max_workers,
+            "pending": self._pending,
+            "max_pending": self._max_pending,
+            "max_pending_per_session": self._max_pending_per_session,
+            "sessions": len(self._lanes),
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "failed": self._failed,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shutdown worker pools."""
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=wait)
+            self._thread_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=wait)
+            self._process_pool = None
+        logger.info("PoseInferenceExecutor shutdown")
+
+
+async def _finish_before_cancel(future: "asyncio.Future[T]") -> T:
+    """
+    Await a pool future; if the awaiting task is cancelled, keep waiting
+    until the pool call has finished, then re-raise the cancellation.
+
+    A pool thread cannot be interrupted, so returning early would let the
+    caller release the session lane while the engine is still being mutated.
+    """
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        while not future.done():
+            try:
+                await asyncio.wait({future})
+            except asyncio.CancelledError:
+                continue
+        raise
+
+
+# ==================== GLOBAL INSTANCE ====================
+
+pose_inference_executor = PoseInferenceExecutor(
+    mode=settings.POSE_EXECUTOR_MODE,
+    max_workers=settings.POSE_EXECUTOR_WORKERS,
+    max_pending=settings.POSE_EXECUTOR_MAX_PENDING,
+    max_pending_per_session=settings.POSE_EXECUTOR_MAX_PENDING_PER_SESSION
+)
@@ -0,0 +1,138 @@
+"""
+Pose Pipeline Stage Metrics.
+
+Fixed-bucket latency histograms per (stage, phase) for the real-time frame
+pipeline, rendered in the Prometheus text exposition format.
+
+Stages (milliseconds):
+    b64_decode       base64 -> bytes (JSON frames only)
+    imdecode         cv2.imdecode
+    rgb_convert      ROI crop + BGR -> RGB copy (VisionDetector)
+    pose_inference   pose landmarker
+    face_inference   face landmarker (only on frames where it runs)
+    phase_logic      MemotionEngine._run_phase1..4
+    serialize        response encoding (json / orjson / msgpack)
+    send             websocket send
+
+Decode timings come back from the inference executor with the frame and
+engine timings inside the wire message (``message["timings"]``), so stages
+measured in a process pool or a shard worker are still recorded here, on
+the event loop. The histograms are only touched from the event loop: the
+``/metrics`` and ``/ws-stats`` routes are ``async def`` so they render on the
+same loop instead of FastAPI's threadpool, and no lock is needed. Any reader
+running on another thread must take a lock shared with the writers.
+
+Author: MEMOTION Team
+Version: 1.0.0
+"""
+
+import bisect
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+
+# Upper bounds (ms) of the histogram buckets, +Inf is implicit
+LATENCY_BUCKETS_MS = (0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 35.0, 50.0, 75.0, 100.0, 250.0, 500.0, 1000.0)
+
+class LatencyHistogram:
+    """Cumulative-bucket histogram (Prometheus semantics), O(log buckets) per sample."""
+
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value_ms: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, value_ms)] += 1
+        self.total += value_ms
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Bucket upper bound containing quantile ``q`` (None if empty or past the last bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+
+class PoseStageMetrics:
+    """Per-stage, per-phase latency histograms plus frame counters."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._histograms: Dict[Tuple[str, int], LatencyHistogram] = {}
+        self.frames = 0
+
+    def observe(self, stage: str, phase: int, value_ms: float) -> None:
+        key = (stage, phase)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = LatencyHistogram()
+        histogram.observe(value_ms)
+
+    def observe_frame(self, phase: int, timings: Dict[str, float]) -> None:
+        """Record every stage timing of one processed frame."""
+        if not self.enabled:
+            return
+        self.frames += 1
+        for stage, value_ms in timings.items():
+            self.observe(stage, phase, value_ms)
+
+    def get_summary(self) -> Dict[str, Dict[str, Any]]:
+        """{"stage/phase": {count, mean_ms, p50_ms, p95_ms}} for JSON stats."""
+        summary = {}
+        for (stage, phase), histogram in sorted(self._histograms.items()):
+            summary[f"{stage}/{phase}"] = {
+                "count": histogram.count,
+                "mean_ms": round(histogram.total / histogram.count, 3) if histogram.count else None,
+                "p50_ms": histogram.quantile(0.5),
+                "p95_ms": histogram.quantile(0.95),
+            }
+        return summary
+
+    def render_prometheus(
+        self,
+        gauges: Iterable[Tuple[str, str, float]] = (),
+        counters: Iterable[Tuple[str, str, float]] = (),
+    ) -> str:
+        """
+        Prometheus text format (version 0.0.4).
+
+        Args:
+            gauges: Extra (name, help, value) gauges, e.g. WebSocket stats
+            counters: Extra (name, help, value) monotonic counters (name ends in ``_total``)
+        """
+        lines: List[str] = [
+            "# HELP pose_stage_latency_ms Pose frame pipeline stage latency in milliseconds",
+            "# TYPE pose_stage_latency_ms histogram",
+        ]
+        for (stage, phase), histogram in sorted(self._histograms.items()):
+            labels = f'stage="{stage}",phase="{phase}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS_MS, histogram.counts):
+                cumulative += count
+                lines.append(f'pose_stage_latency_ms_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'pose_stage_latency_ms_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"pose_stage_latency_ms_sum{{{labels}}} {histogram.total:.3f}")
+            lines.append(f"pose_stage_latency_ms_count{{{labels}}} {histogram.count}")
+
+        lines.append("# HELP pose_frames_processed_total Frames processed by the WebSocket pipeline")
+        lines.append("# TYPE pose_frames_processed_total counter")
+        lines.append(f"pose_frames_processed_total {self.frames}")
+
+        for kind, metrics in (("counter", counters), ("gauge", gauges)):
+            for name, help_text, value in metrics:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+pose_stage_metrics = PoseStageMetrics(enabled=settings.POSE_METRICS_ENABLED)
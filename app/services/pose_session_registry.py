@@ -0,0 +1,293 @@
+"""
+Pose Session Registry (multi-worker session affinity).
+
+``uvicorn --workers N`` runs N processes behind one listening socket, so a
+WebSocket for a session can land on a worker that never saw
+``start_session``. The registry is a small SQLite database shared by the
+workers of one host that maps ``session_id -> owning worker``:
+
+    sessions(session_id, worker_id, handoff_to, metadata, updated_at)
+    workers(worker_id, pid, heartbeat_at)
+
+When a request reaches a worker that does not hold the session in memory,
+that worker claims it:
+
+    - owner dead (no heartbeat for ``worker_timeout``): take it over directly
+    - owner alive: set ``handoff_to``; the owner's heartbeat thread
+      checkpoints the session, drops it from memory and transfers ownership
+      (see PoseDetectionService._handoff_session), or declines if the session
+      is still streaming there
+
+The new owner then restores the engine from the checkpoint store (or
+recreates it from the registered config when no checkpoint exists yet).
+
+Author: MEMOTION Team
+Version: 1.0.0
+"""
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    worker_id TEXT NOT NULL,
+    handoff_to TEXT,
+    metadata TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    heartbeat_at REAL NOT NULL
+);
+"""
+
+
+class PoseSessionRegistry:
+    """
+    Shared session_id -> worker map with ownership handoff.
+
+    Each call opens its own short-lived SQLite connection, so the registry
+    is safe to use from the event loop's threadpool, the inference executor
+    and the heartbeat thread alike.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        worker_id: Optional[str] = None,
+        enabled: bool = False,
+        heartbeat_interval: float = 1.0,
+        worker_timeout: float = 10.0,
+        handoff_timeout: float = 5.0
+    ):
+        """
+        Args:
+            path: SQLite database file (shared by all workers of the host)
+            worker_id: Stable id of this worker (default: hostname-pid)
+            enabled: Registry off = single-process behaviour, every call is a no-op
+            heartbeat_interval: Seconds between heartbeats / handoff checks
+            worker_timeout: Worker considered dead after this long without heartbeat
+            handoff_timeout: How long a claiming worker waits for the owner
+        """
+        self.path = path
+        self.enabled = enabled
+        self._configured_id = worker_id
+        self.worker_id = worker_id or _default_worker_id()
+        self.heartbeat_interval = heartbeat_interval
+        self.worker_timeout = worker_timeout
+        self.handoff_timeout = handoff_timeout
+
+        # Called on the heartbeat thread: (session_id) -> True if released
+        self.on_handoff: Optional[Callable[[str], bool]] = None
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.claims = 0
+        self.handoffs = 0
+
+    # ==================== LIFECYCLE ====================
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def start(self) -> None:
+        """Create tables, announce this worker and start heartbeating."""
+        if not self.enabled or self._thread is not None:
+            return
+        # Forked workers inherit the parent's id: re-derive it unless configured
+        if not self._configured_id:
+            self.worker_id = _default_worker_id()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+        self._heartbeat()
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._heartbeat_loop, name="pose-registry-heartbeat", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"start: Session registry worker_id={self.worker_id} ({self.path})")
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=self.heartbeat_interval * 2)
+        self._thread = None
+        with self._connect() as conn:
+            conn.execute("DELETE FROM workers WHERE worker_id = ?", (self.worker_id,))
+
+    def _heartbeat(self) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO workers (worker_id, pid, heartbeat_at) VALUES (?, ?, ?)",
+                (self.worker_id, os.getpid(), time.time())
+            )
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.wait(self.heartbeat_interval):
+            try:
+                self._heartbeat()
+                self._serve_handoffs()
+            except Exception as e:
+                logger.warning(f"_heartbeat_loop: {e}")
+
+    # ==================== SESSIONS ====================
+
+    def register_session(self, session_id: str, metadata: Dict[str, Any]) -> None:
+        """Record a new session as owned by this worker."""
+        if not self.enabled:
+            return
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, worker_id, handoff_to, metadata, updated_at) "
+                "VALUES (?, ?, NULL, ?, ?)",
+                (session_id, self.worker_id, json.dumps(metadata), time.time())
+            )
+
+    def lookup(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """{"worker_id", "handoff_to", "metadata"} of a session, None if unknown."""
+        if not self.enabled:
+            return None
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT worker_id, handoff_to, metadata FROM sessions WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"worker_id": row[0], "handoff_to": row[1], "metadata": json.loads(row[2])}
+
+    def remove_session(self, session_id: str) -> None:
+        if not self.enabled:
+            return
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def is_worker_alive(self, worker_id: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT heartbeat_at FROM workers WHERE worker_id = ?", (worker_id,)
+            ).fetchone()
+        return row is not None and time.time() - row[0] <= self.worker_timeout
+
+    def claim(self, session_id: str) -> bool:
+        """
+        Make this worker the owner of ``session_id``.
+
+        Returns:
+            True when this worker owns the session afterwards, False if the
+            session is unknown or the live owner did not hand it over in time.
+        """
+        entry = self.lookup(session_id)
+        if entry is None:
+            return False
+        owner = entry["worker_id"]
+        if owner == self.worker_id:
+            return True
+
+        if not self.is_worker_alive(owner):
+            with self._connect() as conn:
+                cursor = conn.execute(
+                    "UPDATE sessions SET worker_id = ?, handoff_to = NULL, updated_at = ? "
+                    "WHERE session_id = ? AND worker_id = ?",
+                    (self.worker_id, time.time(), session_id, owner)
+                )
+            if cursor.rowcount:
+                self.claims += 1
+                logger.info(f"claim: Took over {session_id} from dead worker {owner}")
+                return True
+            # Lost the race: someone else updated the row first
+            entry = self.lookup(session_id)
+            return entry is not None and entry["worker_id"] == self.worker_id
+
+        # Live owner: ask for a handoff and wait for its heartbeat thread
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE sessions SET handoff_to = ?, updated_at = ? WHERE session_id = ? AND worker_id = ?",
+                (self.worker_id, time.time(), session_id, owner)
+            )
+        deadline = time.time() + self.handoff_timeout
+        while time.time() < deadline:
+            time.sleep(min(0.05, self.heartbeat_interval / 4))
+            entry = self.lookup(session_id)
+            if entry is None:
+                return False
+            if entry["worker_id"] == self.worker_id:
+                self.claims += 1
+                logger.info(f"claim: {session_id} handed over by {owner}")
+                return True
+            if entry["handoff_to"] != self.worker_id:
+                break  # declined (or another worker asked after us)
+
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE sessions SET handoff_to = NULL WHERE session_id = ? AND handoff_to = ?",
+                (session_id, self.worker_id)
+            )
+        return False
+
+    def _serve_handoffs(self) -> None:
+        """Owner side: release sessions other workers asked for."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT session_id, handoff_to FROM sessions WHERE worker_id = ? AND handoff_to IS NOT NULL",
+                (self.worker_id,)
+            ).fetchall()
+
+        for session_id, requester in rows:
+            released = bool(self.on_handoff and self.on_handoff(session_id))
+            with self._connect() as conn:
+                if released:
+                    conn.execute(
+                        "UPDATE sessions SET worker_id = ?, handoff_to = NULL, updated_at = ? "
+                        "WHERE session_id = ? AND worker_id = ?",
+                        (requester, time.time(), session_id, self.worker_id)
+                    )
+                    self.handoffs += 1
+                    logger.info(f"_serve_handoffs: Handed {session_id} to {requester}")
+                else:
+                    conn.execute(
+                        "UPDATE sessions SET handoff_to = NULL WHERE session_id = ?", (session_id,)
+                    )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "worker_id": self.worker_id if self.enabled else None,
+            "claims": self.claims,
+            "handoffs": self.handoffs,
+        }
+
+
+def _default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+pose_session_registry = PoseSessionRegistry(
+    path=settings.POSE_REGISTRY_PATH,
+    worker_id=settings.POSE_WORKER_ID or None,
+    enabled=settings.POSE_REGISTRY_ENABLED,
+    worker_timeout=settings.POSE_REGISTRY_WORKER_TIMEOUT,
+    handoff_timeout=settings.POSE_REGISTRY_HANDOFF_TIMEOUT
+)
@@ -0,0 +1,578 @@
+"""
+Pose Engine Shard Host - Multi-process MemotionEngine sharding.
+
+MediaPipe inference plus the per-frame phase logic of MemotionEngine are
+CPU- and GIL-bound, so one process only sustains a handful of sessions.
+PoseShardHost starts N worker processes; each worker owns the engines of
+the sessions pinned to it (``crc32(session_id) % N``) and the API process
+only moves frames and results.
+
+Frame transfer:
+    Each shard has a ``multiprocessing.shared_memory`` ring of fixed-size
+    slots. The API process copies the decoded frame into a free slot and
+    sends only (slot, shape, timestamp) through the command queue; the
+    worker wraps the slot with np.ndarray (no pickling of pixel data).
+    Frames larger than a slot fall back to being pickled through the queue.
+
+Worker crashes:
+    Each shard's reader thread watches its process. When a worker dies the
+    pending requests fail with ShardLostError and the shard is respawned;
+    the engines it held are gone, so callers drop those sessions and
+    restore them from their last checkpoint.
+
+Usage:
+    engine = pose_shard_host.create_engine(session_id, config)
+    output = engine.process_frame(frame, timestamp_ms)   # blocking, thread-safe
+
+Author: MEMOTION Team
+Version: 1.0.0
+"""
+
+import itertools
+import logging
+import multiprocessing as mp
+import queue
+import threading
+import zlib
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# How often a reader thread checks that its worker is still alive
+_LIVENESS_POLL_SECONDS = 1.0
+
+
+class ShardLostError(RuntimeError):
+    """The shard worker holding an engine died; the engine state is gone."""
+
+
+# ==================== SHARED MEMORY RING ====================
+
+class SharedFrameRing:
+    """Fixed-size frame slots in one shared memory block."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, slots: int, slot_bytes: int, owner: bool):
+        self._shm = shm
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self._owner = owner
+
+    @classmethod
+    def create(cls, slots: int, slot_bytes: int) -> "SharedFrameRing":
+        """Create a new ring (API process side)."""
+        shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        return cls(shm, slots, slot_bytes, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, slots: int, slot_bytes: int) -> "SharedFrameRing":
+        """Attach to an existing ring (worker process side)."""
+        shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, slots, slot_bytes, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def fits(self, frame: np.ndarray) -> bool:
+        return frame.dtype == np.uint8 and frame.nbytes <= self.slot_bytes
+
+    def view(self, slot: int, shape: Tuple[int, ...]) -> np.ndarray:
+        """Wrap a slot as a uint8 array (no copy)."""
+        return np.ndarray(shape, dtype=np.uint8, buffer=self._shm.buf, offset=slot * self.slot_bytes)
+
+    def write(self, slot: int, frame: np.ndarray) -> Tuple[int, ...]:
+        """Copy a frame into a slot, returns its shape."""
+        np.copyto(self.view(slot, frame.shape), frame, casting="no")
+        return frame.shape
+
+    def close(self) -> None:
+        self._shm.close()
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+# ==================== WORKER PROCESS ====================
+
+def _shard_worker_main(
+    shard_index: int,
+    shm_name: str,
+    slots: int,
+    slot_bytes: int,
+    cmd_queue: "mp.Queue",
+    result_queue: "mp.Queue"
+) -> None:
+    """
+    Worker process loop: owns MemotionEngine instances of its sessions.
+
+    Commands: (req_id, op, session_id, payload)
+        - "create": payload = EngineConfig
+        - "frame":  payload = (slot, shape, timestamp_ms, heads, wire) or (None, frame, ...);
+                    returns to_wire() when ``wire`` else to_dict()
+        - "call":   payload = (method_name, args, kwargs)
+        - "close":  payload = None
+        - "prewarm": payload = (EngineConfig, count) - fill this worker's detector pool
+        - "pool_stats": payload = None
+    Results: (req_id, ok, value_or_error_message); DetectorPoolExhausted is
+    sent as the exception itself so callers can tell "busy" from "failed".
+    """
+    from app.mediapipe.mediapipe_be.core import DetectorPoolExhausted, get_detector_pool_stats
+    from app.mediapipe.mediapipe_be.service.engine_service import MemotionEngine
+
+    ring = SharedFrameRing.attach(shm_name, slots, slot_bytes)
+    engines: Dict[str, Any] = {}
+    logger.info(f"shard[{shard_index}]: worker started")
+
+    while True:
+        message = cmd_queue.get()
+        if message is None:
+            break
+
+        req_id, op, session_id, payload = message
+        try:
+            if op == "create":
+                engines[session_id] = MemotionEngine.create_instance(
+                    config=payload, instance_id=session_id
+                )
+                result = None
+            elif op == "frame":
+                slot, frame_or_shape, timestamp_ms, heads, wire = payload
+                frame = frame_or_shape if slot is None else ring.view(slot, frame_or_shape)
+                output = engines[session_id].process_frame(frame, timestamp_ms, heads=heads)
+                result = output.to_wire() if wire else output.to_dict()
+            elif op == "call":
+                method, args, kwargs = payload
+                result = getattr(engines[session_id], method)(*args, **kwargs)
+            elif op == "close":
+                engine = engines.pop(session_id, None)
+                if engine is not None:
+                    engine.cleanup()
+                result = None
+            elif op == "prewarm":
+                config, count = payload
+                result = MemotionEngine.prewarm_detector_pool(config, count)
+            elif op == "pool_stats":
+                result = get_detector_pool_stats()
+            else:
+                raise ValueError(f"Unknown shard command: {op}")
+            result_queue.put((req_id, True, result))
+        except DetectorPoolExhausted as e:
+            result_queue.put((req_id, False, e))
+        except Exception as e:
+            logger.error(f"shard[{shard_index}]: {op} failed for {session_id}: {e}", exc_info=True)
+            result_queue.put((req_id, False, f"{type(e).__name__}: {e}"))
+
+    for engine in engines.values():
+        try:
+            engine.cleanup()
+        except Exception:
+            pass
+    ring.close()
+    result_queue.put(None)
+
+
+# ==================== API-SIDE SHARD ====================
+
+class _Shard:
+    """API-process handle of one worker: queues, ring, pending futures."""
+
+    def __init__(
+        self,
+        index: int,
+        ctx: Any,
+        slots: int,
+        slot_bytes: int,
+        on_crash: Optional[Callable[["_Shard"], None]] = None
+    ):
+        self.index = index
+        self.crashed = False
+        self._stopping = False
+        self._on_crash = on_crash
+        self.ring = SharedFrameRing.create(slots, slot_bytes)
+        self.cmd_queue = ctx.Queue()
+        self.result_queue = ctx.Queue()
+        self.sessions = 0
+
+        self._free_slots: "queue.Queue[int]" = queue.Queue()
+        for slot in range(slots):
+            self._free_slots.put(slot)
+
+        self._futures: Dict[int, Tuple[Future, Optional[int]]] = {}
+        self._futures_lock = threading.Lock()
+        self._ids = itertools.count()
+        self.inline_frames = 0
+
+        self.process = ctx.Process(
+            target=_shard_worker_main,
+            args=(index, self.ring.name, slots, slot_bytes, self.cmd_queue, self.result_queue),
+            name=f"pose-shard-{index}",
+            daemon=True
+        )
+        self.process.start()
+
+        self._reader = threading.Thread(
+            target=self._read_results, name=f"pose-shard-{index}-results", daemon=True
+        )
+        self._reader.start()
+
+    def submit(self, op: str, session_id: str, payload: Any, slot: Optional[int] = None) -> Future:
+        """Send a command, returns a Future resolved by the reader thread."""
+        future: Future = Future()
+        req_id = next(self._ids)
+        with self._futures_lock:
+            if self.crashed:
+                if slot is not None:
+                    self._free_slots.put(slot)
+                future.set_exception(ShardLostError(f"Pose shard {self.index} crashed"))
+                return future
+            self._futures[req_id] = (future, slot)
+        self.cmd_queue.put((req_id, op, session_id, payload))
+        return future
+
+    def submit_frame(
+        self,
+        session_id: str,
+        frame: np.ndarray,
+        timestamp_ms: int,
+        slot_timeout: float,
+        heads: Optional[Dict[str, bool]] = None,
+        wire: bool = False
+    ) -> Future:
+        """Send a frame through a ring slot (or inline if it does not fit / no slot is free)."""
+        slot = None
+        if self.ring.fits(frame):
+            try:
+                slot = self._free_slots.get(timeout=slot_timeout)
+            except queue.Empty:
+                slot = None
+
+        if slot is None:
+            self.inline_frames += 1
+            return self.submit("frame", session_id, (None, frame, timestamp_ms, heads, wire))
+
+        shape = self.ring.write(slot, frame)
+        return self.submit("frame", session_id, (slot, shape, timestamp_ms, heads, wire), slot=slot)
+
+    def _read_results(self) -> None:
+        while True:
+            try:
+                message = self.result_queue.get(timeout=_LIVENESS_POLL_SECONDS)
+            except queue.Empty:
+                if self.process.is_alive() or self._stopping:
+                    continue
+                # Died without its final None: crashed (segfault, OOM kill, ...)
+                with self._futures_lock:
+                    self.crashed = True
+                break
+            except (EOFError, OSError):
+                break
+            if message is None:
+                break
+
+            req_id, ok, value = message
+            with self._futures_lock:
+                future, slot = self._futures.pop(req_id, (None, None))
+            if slot is not None:
+                self._free_slots.put(slot)
+            if future is None:
+                continue
+            if ok:
+                future.set_result(value)
+            elif isinstance(value, Exception):
+                future.set_exception(value)
+            else:
+                future.set_exception(RuntimeError(value))
+
+        # Fail whatever is still waiting (worker exited)
+        with self._futures_lock:
+            pending = list(self._futures.values())
+            self._futures.clear()
+        if self.crashed:
+            logger.error(
+                f"shard[{self.index}]: worker exited with code {self.process.exitcode}, "
+                f"{self.sessions} sessions lost, {len(pending)} requests failed"
+            )
+        for future, _ in pending:
+            if not future.done():
+                if self.crashed:
+                    future.set_exception(ShardLostError(f"Pose shard {self.index} crashed"))
+                else:
+                    future.set_exception(RuntimeError(f"Pose shard {self.index} stopped"))
+        if self.crashed and self._on_crash is not None:
+            self._on_crash(self)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "pid": self.process.pid,
+            "alive": self.process.is_alive(),
+            "crashed": self.crashed,
+            "sessions": self.sessions,
+            "pending": len(self._futures),
+            "free_slots": self._free_slots.qsize(),
+            "inline_frames": self.inline_frames,
+        }
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping = True
+        try:
+            self.cmd_queue.put(None)
+            self.process.join(timeout)
+        finally:
+            if self.process.is_alive():
+                self.process.terminate()
+            self.ring.close()
+
+
+# ==================== ENGINE PROXY ====================
+
+class ShardedEngineProxy:
+    """
+    Stand-in for a MemotionEngine that lives in a shard worker.
+
+    Methods block until the worker replies, so call them from the inference
+    executor, not from the event loop. process_frame() returns the output
+    dict (``EngineOutput.to_dict()``), which srv_pose already accepts.
+    """
+
+    def __init__(self, host: "PoseShardHost", shard: _Shard, session_id: str):
+        self._host = host
+        self._shard = shard
+        self._session_id = session_id
+        self._closed = False
+
+    @property
+    def shard_index(self) -> int:
+        return self._shard.index
+
+    @property
+    def lost(self) -> bool:
+        """The worker holding this engine crashed (calls raise ShardLostError)."""
+        return self._shard.crashed
+
+    def _wait(self, future: Future) -> Any:
+        return future.result(timeout=self._host.timeout)
+
+    def call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        """Invoke any MemotionEngine method in the worker (args/result must pickle)."""
+        return self._wait(self._shard.submit("call", self._session_id, (method, args, kwargs)))
+
+    def process_frame(
+        self,
+        frame: np.ndarray,
+        timestamp_ms: int,
+        heads: Optional[Dict[str, bool]] = None
+    ) -> Dict[str, Any]:
+        frame = np.ascontiguousarray(frame)
+        return self._wait(
+            self._shard.submit_frame(
+                self._session_id, frame, timestamp_ms, self._host.slot_timeout, heads
+            )
+        )
+
+    def process_frame_wire(
+        self,
+        frame: np.ndarray,
+        timestamp_ms: int,
+        heads: Optional[Dict[str, bool]] = None
+    ) -> Dict[str, Any]:
+        """Same as MemotionEngine.process_frame_wire, run in the shard."""
+        frame = np.ascontiguousarray(frame)
+        return self._wait(
+            self._shard.submit_frame(
+                self._session_id, frame, timestamp_ms, self._host.slot_timeout, heads, wire=True
+            )
+        )
+
+    def process_landmarks_wire(
+        self,
+        pose_landmarks: Optional[np.ndarray],
+        timestamp_ms: int,
+        face_landmarks: Optional[np.ndarray] = None,
+        heads: Optional[Dict[str, bool]] = None
+    ) -> Dict[str, Any]:
+        """Client landmarks are small, so they go through the command queue (no ring slot)."""
+        return self.call(
+            "process_landmarks_wire", pose_landmarks, timestamp_ms,
+            face_landmarks=face_landmarks, heads=heads
+        )
+
+    def get_final_report(self) -> Any:
+        return self.call("get_final_report")
+
+    def create_checkpoint(self) -> bytes:
+        return self.call("create_checkpoint")
+
+    def restore_checkpoint(self, data: bytes) -> None:
+        self.call("restore_checkpoint", data)
+
+    def release_detector(self) -> None:
+        self.call("release_detector")
+
+    def get_state_snapshot(self) -> Dict[str, Any]:
+        return self.call("get_state_snapshot")
+
+    def get_instance_id(self) -> str:
+        return self._session_id
+
+    def cleanup(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._shard.sessions = max(0, self._shard.sessions - 1)
+        if self._shard.crashed:
+            # Engine died with its worker, nothing to close
+            return
+        self._wait(self._shard.submit("close", self._session_id, None))
+
+
+# ==================== HOST ====================
+
+class PoseShardHost:
+    """
+    Owns the shard worker processes and pins sessions to them.
+
+    Disabled when ``workers == 0`` (engines then run in the API process).
+    """
+
+    def __init__(
+        self,
+        workers: int = 0,
+        ring_slots: int = 8,
+        slot_bytes: int = 1920 * 1080 * 3,
+        timeout: float = 30.0,
+        slot_timeout: float = 0.5
+    ):
+        """
+        Initialize shard host (processes start lazily or via start()).
+
+        Args:
+            workers: Number of worker processes (0 = disabled)
+            ring_slots: Shared-memory frame slots per shard
+            slot_bytes: Size of one slot (largest frame sent zero-pickle)
+            timeout: Seconds to wait for a worker reply
+            slot_timeout: Seconds to wait for a free slot before sending inline
+        """
+        self.workers = max(0, workers)
+        self.ring_slots = max(1, ring_slots)
+        self.slot_bytes = slot_bytes
+        self.timeout = timeout
+        self.slot_timeout = slot_timeout
+
+        self._shards: List[_Shard] = []
+        self._lock = threading.Lock()
+        self._ctx: Any = None
+        self.crashes = 0
+        self.respawns = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def start(self) -> None:
+        """Start worker processes (idempotent)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._shards:
+                return
+            # spawn: never fork the server process with its threads / MediaPipe state
+            self._ctx = mp.get_context("spawn")
+            self._shards = [self._new_shard(i) for i in range(self.workers)]
+        logger.info(
+            f"PoseShardHost started: workers={self.workers}, slots={self.ring_slots}, "
+            f"slot_bytes={self.slot_bytes}"
+        )
+
+    def _new_shard(self, index: int) -> _Shard:
+        return _Shard(index, self._ctx, self.ring_slots, self.slot_bytes, on_crash=self._respawn)
+
+    def _respawn(self, crashed: _Shard) -> None:
+        """Replace a crashed shard (runs on its reader thread)."""
+        with self._lock:
+            self.crashes += 1
+            if crashed.index >= len(self._shards) or self._shards[crashed.index] is not crashed:
+                return  # shut down meanwhile
+            try:
+                self._shards[crashed.index] = self._new_shard(crashed.index)
+                self.respawns += 1
+                logger.warning(f"PoseShardHost: respawned shard {crashed.index}")
+            except Exception as e:
+                # Shard stays marked crashed: its sessions keep failing fast
+                logger.error(f"PoseShardHost: failed to respawn shard {crashed.index}: {e}", exc_info=True)
+        try:
+            crashed.ring.close()
+        except BufferError:
+            pass  # a frame copy into the old ring is still in progress
+
+    def shard_for(self, session_id: str) -> _Shard:
+        """Pin a session to a shard (stable across processes, unlike hash())."""
+        self.start()
+        return self._shards[zlib.crc32(session_id.encode("utf-8")) % len(self._shards)]
+
+    def create_engine(self, session_id: str, config: Any) -> ShardedEngineProxy:
+        """Create a MemotionEngine for ``session_id`` inside its shard."""
+        shard = self.shard_for(session_id)
+        shard.submit("create", session_id, config).result(timeout=self.timeout)
+        shard.sessions += 1
+        return ShardedEngineProxy(self, shard, session_id)
+
+    def prewarm(self, config: Any, count: int) -> int:
+        """Pre-load ``count`` detectors in every shard's detector pool."""
+        self.start()
+        futures = [shard.submit("prewarm", "", (config, count)) for shard in self._shards]
+        return sum(future.result(timeout=self.timeout) or 0 for future in futures)
+
+    def get_detector_pool_stats(self) -> Dict[str, Any]:
+        """Detector pool stats per shard (keyed ``shard-<index>``)."""
+        stats = {}
+        for shard in self._shards:
+            try:
+                stats[f"shard-{shard.index}"] = shard.submit("pool_stats", "", None).result(
+                    timeout=self.timeout
+                )
+            except Exception as e:
+                stats[f"shard-{shard.index}"] = {"error": str(e)}
+        return stats
+
+    def get_worker_pids(self) -> Dict[int, Optional[int]]:
+        """PID of each running shard worker, keyed by shard index."""
+        return {shard.index: shard.process.pid for shard in list(self._shards) if not shard.crashed}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "workers": self.workers,
+            "crashes": self.crashes,
+            "respawns": self.respawns,
+            "shards": [shard.get_stats() for shard in self._shards],
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            shards, self._shards = self._shards, []
+        for shard in shards:
+            try:
+                shard.stop()
+            except Exception as e:
+                logger.warning(f"PoseShardHost: failed to stop shard {shard.index}: {e}")
+        if shards:
+            logger.info("PoseShardHost shutdown")
+
+
+# ==================== GLOBAL INSTANCE ====================
+
+pose_shard_host = PoseShardHost(
+    workers=settings.POSE_SHARD_WORKERS,
+    ring_slots=settings.POSE_SHARD_RING_SLOTS,
+    slot_bytes=settings.POSE_SHARD_SLOT_BYTES,
+    timeout=settings.POSE_SHARD_TIMEOUT
+)
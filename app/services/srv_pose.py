@@ -10,16 +10,27 @@ Version: 3.0.0
 
 from __future__ import annotations
 
+import asyncio
+import dataclasses
 import logging
+import os
+import threading
 import time
+import uuid
 import base64
-from typing import Dict, Optional, Any, List, TYPE_CHECKING
+from typing import Dict, Optional, Any, List, Tuple, TYPE_CHECKING
 from pathlib import Path
 import numpy as np
 import cv2
+from starlette.concurrency import run_in_threadpool
 
 from app.helpers.exception_handler import CustomException
 from app.core.config import settings
+from app.services.pose_shard_host import ShardLostError, pose_shard_host
+from app.services.pose_admission import pose_admission_controller
+from app.services.pose_checkpoint_store import pose_checkpoint_store
+from app.services.pose_executor import pose_inference_executor
+from app.services.pose_session_registry import pose_session_registry
 from app.schemas.sche_pose import (
     StartSessionRequest, StartSessionResponse, ProcessFrameRequest,
     ProcessFrameResponse, SessionResultsResponse, PoseHealthResponse,
@@ -37,6 +48,7 @@ try:
     from app.mediapipe.mediapipe_be.service.engine_service import (
         MemotionEngine, EngineConfig
     )
+    from app.mediapipe.mediapipe_be.core import DetectorPoolExhausted
     MEDIAPIPE_AVAILABLE = True
 except ImportError as e:
     MEDIAPIPE_AVAILABLE = False
@@ -49,18 +61,152 @@ SERVICE_VERSION = "3.0.0"
 SESSION_TIMEOUT_SECONDS = 3600  # 1 hour
 
 
+# ==================== FRAME DECODING ====================
+
+# OpenCV >= 4.10 can decode straight to RGB; older builds convert after decoding
+_IMREAD_COLOR_RGB = getattr(cv2, "IMREAD_COLOR_RGB", None)
+
+
+class FrameBuffer:
+    """
+    Reusable RGB destination for one frame stream (one WebSocket connection).
+    
+    Reallocated only when the incoming resolution changes. Reuse is safe
+    because a session processes one frame at a time and the engine keeps no
+    reference to the frame once process_frame returns.
+    """
+    
+    __slots__ = ("array", "allocations")
+    
+    def __init__(self):
+        self.array: Optional[np.ndarray] = None
+        self.allocations = 0
+    
+    def get(self, shape: Tuple[int, ...]) -> np.ndarray:
+        if self.array is None or self.array.shape != shape:
+            self.array = np.empty(shape, dtype=np.uint8)
+            self.allocations += 1
+        return self.array
+
+
+def _imdecode(np_arr: np.ndarray, rgb: bool = False, out: Optional[FrameBuffer] = None) -> np.ndarray:
+    """cv2.imdecode to BGR, or to RGB (native decode, else converted into ``out``)."""
+    if not rgb:
+        frame = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+    elif _IMREAD_COLOR_RGB is not None:
+        frame = cv2.imdecode(np_arr, _IMREAD_COLOR_RGB)
+    else:
+        frame = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+        if frame is not None:
+            dst = out.get(frame.shape) if out is not None else None
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=dst)
+    
+    if frame is None:
+        raise ValueError("Failed to decode image")
+    return frame
+
+
+def decode_frame_data(
+    frame_data: str,
+    timings: Optional[Dict[str, float]] = None,
+    rgb: bool = False,
+    out: Optional[FrameBuffer] = None
+) -> np.ndarray:
+    """
+    Decode a base64 (optionally data-URI prefixed) image to a BGR array
+    (RGB when ``rgb``, see EngineConfig.frame_color).
+    
+    Module-level and stateless so it can run in a process pool.
+    ``timings`` (if given) receives b64_decode / imdecode in ms.
+    """
+    started = time.perf_counter()
+    
+    # Remove data URI prefix if present
+    if ',' in frame_data:
+        frame_data = frame_data.split(',')[1]
+    
+    # Decode base64
+    frame_bytes = base64.b64decode(frame_data)
+    decoded = time.perf_counter()
+    
+    # Convert to numpy array
+    np_arr = np.frombuffer(frame_bytes, np.uint8)
+    frame = _imdecode(np_arr, rgb, out)
+    
+    if timings is not None:
+        timings["b64_decode"] = (decoded - started) * 1000.0
+        timings["imdecode"] = (time.perf_counter() - decoded) * 1000.0
+    return frame
+
+
+def decode_frame_bytes(
+    buffer: bytes,
+    offset: int = 0,
+    rgb: bool = False,
+    out: Optional[FrameBuffer] = None
+) -> np.ndarray:
+    """
+    Decode raw encoded image bytes (JPEG/WebP/PNG) to a BGR (or RGB) array.
+
+    Used by the binary WebSocket protocol: ``offset`` skips the frame
+    header so the message buffer is wrapped zero-copy by np.frombuffer.
+    """
+    np_arr = np.frombuffer(buffer, np.uint8, offset=offset)
+    return _imdecode(np_arr, rgb, out)
+
+
+def decode_frame_data_timed(
+    frame_data: str,
+    rgb: bool = False,
+    out: Optional[FrameBuffer] = None
+) -> Tuple[np.ndarray, Dict[str, float]]:
+    """decode_frame_data() plus its stage timings (picklable result for process pools)."""
+    timings: Dict[str, float] = {}
+    return decode_frame_data(frame_data, timings, rgb, out), timings
+
+
+def decode_frame_bytes_timed(
+    buffer: bytes,
+    offset: int = 0,
+    rgb: bool = False,
+    out: Optional[FrameBuffer] = None
+) -> Tuple[np.ndarray, Dict[str, float]]:
+    """decode_frame_bytes() plus its imdecode time."""
+    started = time.perf_counter()
+    frame = decode_frame_bytes(buffer, offset, rgb, out)
+    return frame, {"imdecode": (time.perf_counter() - started) * 1000.0}
+
+
 # ==================== SESSION CLASS ====================
 
 class PoseSession:
     """Represents a single pose detection session."""
     
-    def __init__(self, session_id: str, engine: Any, user_id: Optional[str] = None):
+    def __init__(
+        self,
+        session_id: str,
+        engine: Any,
+        user_id: Optional[str] = None,
+        input_mode: str = "image",
+        config: Optional[Any] = None,
+        created_at: Optional[float] = None
+    ):
         self.session_id = session_id
         self.engine = engine
         self.user_id = user_id
-        self.created_at = time.time()
+        self.input_mode = input_mode
+        self.config = config
+        self.created_at = created_at or time.time()
         self.last_activity = time.time()
         self.status = SessionStatus.ACTIVE
+        # Checkpoint bookkeeping (see PoseDetectionService._maybe_checkpoint)
+        self.last_checkpoint_at = 0.0
+        self.last_checkpoint_phase: Optional[int] = None
+    
+    @property
+    def frame_rgb(self) -> bool:
+        """Engine expects RGB frames (EngineConfig.frame_color == "rgb")."""
+        return getattr(self.config, "frame_color", "bgr") == "rgb"
     
     def update_activity(self) -> None:
         """Update last activity timestamp."""
@@ -84,7 +230,19 @@ class PoseDetectionService:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self._sessions: Dict[str, PoseSession] = {}
+        self._restore_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        pose_session_registry.on_handoff = self._handoff_session
         self._last_cleanup = time.time()
+        self._reap_lock = threading.Lock()
+        self._reaper_stats = {
+            "runs": 0,
+            "expired": 0,
+            "evicted_lru": 0,
+            "evicted_memory": 0,
+            "eviction_blocked": 0,
+            "eviction_skipped": 0,
+        }
         self.logger.info("PoseDetectionService initialized")
     
     # ==================== SESSION MANAGEMENT ====================
@@ -100,39 +258,55 @@ class PoseDetectionService:
         if not MEDIAPIPE_AVAILABLE:
             raise CustomException(http_code=503, code='503', message="MediaPipe service not available")
         
-        # Cleanup expired sessions
+        # Cleanup expired sessions and make room for the new engine
         self._cleanup_expired_sessions()
+        with self._reap_lock:
+            self._evict_idle_sessions(reserve=1)
         
         # Create engine config
-        config = EngineConfig(
-            models_dir=str(Path(settings.MEDIAPIPE_MODELS_DIR)),
-            log_dir=str(Path(settings.MEDIAPIPE_LOG_DIR)),
+        landmark_format, landmark_joints = self._resolve_landmark_options(request)
+        input_mode = self._resolve_input_mode(request)
+        config = self.build_engine_config(
             ref_video_path=request.ref_video_path,
-            default_joint=request.default_joint
+            default_joint=request.default_joint,
+            landmark_format=landmark_format,
+            landmark_joints=landmark_joints,
+            input_mode=input_mode
         )
         
-        # Create engine instance
+        # Generate session ID (random suffix: unique across workers)
+        user_hash = hash(request.user_id or 'anonymous') % 10000
+        session_id = f"pose_{int(time.time())}_{user_hash}_{uuid.uuid4().hex[:6]}"
+        
+        # Reserve CPU budget (may wait briefly, or raise 503 with Retry-After)
+        pose_admission_controller.admit(session_id, input_mode)
+        
+        # Create engine instance (in a shard worker process when sharding is enabled)
         try:
-            engine = MemotionEngine.create_instance(config=config)
-            self.logger.debug(f"start_session: Created MemotionEngine: {engine._state.instance_id}")
+            engine = self._create_engine(session_id, config)
+            self.logger.debug(f"start_session: Created MemotionEngine: {engine.get_instance_id()}")
         except Exception as e:
+            pose_admission_controller.release(session_id)
             self.logger.error(f"start_session error: {e}", exc_info=True)
             raise CustomException(http_code=500, code='500', message=f"Failed to initialize engine: {str(e)}")
         
-        # Generate session ID
-        user_hash = hash(request.user_id or 'anonymous') % 10000
-        session_id = f"pose_{int(time.time())}_{user_hash}"
-        
         # Create and store session
         session = PoseSession(
             session_id=session_id,
             engine=engine,
-            user_id=request.user_id
+            user_id=request.user_id,
+            input_mode=input_mode,
+            config=config
         )
         self._sessions[session_id] = session
+        pose_session_registry.register_session(session_id, self._session_metadata(session))
         
-        # Generate WebSocket URL
+        # Generate WebSocket URL. Multi-worker: ?worker= names the owning worker as a
+        # routing hint for a sticky proxy; the server itself ignores it (the registry
+        # hands the session over when another worker is reached).
         websocket_url = f"/api/pose/sessions/{session_id}/ws"
+        if pose_session_registry.enabled:
+            websocket_url += f"?worker={pose_session_registry.worker_id}"
         
         self.logger.info(f"start_session success: session_id={session_id}")
         
@@ -144,9 +318,42 @@ class PoseDetectionService:
             message="Session started. Connect to WebSocket for real-time streaming."
         )
     
+    def warm_up(self) -> int:
+        """
+        Pre-load MediaPipe models into the detector pool(s).
+
+        Called at startup so the first session does not pay model load time.
+        Returns number of detectors created.
+        """
+        if not MEDIAPIPE_AVAILABLE or not settings.POSE_DETECTOR_POOL_ENABLED:
+            return 0
+        
+        count = settings.POSE_DETECTOR_POOL_PREWARM
+        if count <= 0:
+            return 0
+        
+        try:
+            config = self.build_engine_config()
+            if pose_shard_host.enabled:
+                created = pose_shard_host.prewarm(config, count)
+            else:
+                created = MemotionEngine.prewarm_detector_pool(config, count)
+            self.logger.info(f"warm_up: Pre-loaded {created} detectors")
+            return created
+        except Exception as e:
+            self.logger.warning(f"warm_up: Detector pre-warm failed: {e}")
+            return 0
+    
     def get_session(self, session_id: str) -> PoseSession:
-        """Get session by ID, validate not expired."""
+        """
+        Get session by ID, validate not expired.
+        
+        Sessions not in memory (worker restart, other worker) are restored
+        from their last checkpoint when one exists.
+        """
         session = self._sessions.get(session_id)
+        if not session:
+            session = self._restore_session(session_id)
         
         if not session:
             raise CustomException(http_code=404, code='404', message=f"Session not found: {session_id}")
@@ -164,151 +371,309 @@ class PoseDetectionService:
         """
         Process a video frame through MemotionEngine.
         
-        Called by WebSocket endpoint for real-time streaming.
+        Decodes the base64 frame and forwards it to process_decoded_frame().
         """
         session = self.get_session(request.session_id)
         
-        # Decode frame
+        # Decode frame (straight to RGB when the engine expects it)
         try:
-            frame = self._decode_frame(request.frame_data)
+            frame = decode_frame_data(request.frame_data, rgb=session.frame_rgb)
         except Exception as e:
             raise CustomException(http_code=400, code='400', message=f"Invalid frame data: {str(e)}")
         
+        return self.process_decoded_frame(
+            request.session_id, frame, request.timestamp_ms, heads=request.heads
+        )
+    
+    def process_decoded_frame(
+        self,
+        session_id: str,
+        frame: np.ndarray,
+        timestamp_ms: Optional[int] = None,
+        heads: Optional[Dict[str, bool]] = None
+    ) -> ProcessFrameResponse:
+        """
+        Process an already decoded frame (RGB if session.frame_rgb, else BGR)
+        and wrap it in the REST schema.
+        
+        ``heads`` optionally overrides which detector heads run for this
+        frame, e.g. {"face": False}.
+        """
+        message = self.process_frame_wire(session_id, frame, timestamp_ms, heads)
+        return ProcessFrameResponse(session_id=session_id, **message)
+    
+    def process_frame_wire(
+        self,
+        session_id: str,
+        frame: np.ndarray,
+        timestamp_ms: Optional[int] = None,
+        heads: Optional[Dict[str, bool]] = None
+    ) -> Dict[str, Any]:
+        """
+        Lean per-frame path used by the WebSocket endpoint.
+        
+        Returns the engine's wire-ready message (phase, phase_name, data,
+        message, warning) plus "timestamp", without Pydantic or re-shaping.
+        Called from the inference executor (never on the event loop).
+        """
+        session = self.get_session(session_id)
+        
         # Get timestamp (from request or generate current time)
-        timestamp_ms = request.timestamp_ms if request.timestamp_ms else int(time.time() * 1000)
+        timestamp_ms = timestamp_ms if timestamp_ms else int(time.time() * 1000)
         
         # Process frame through engine (NO AI logic here - just forward)
+        started = time.perf_counter()
         try:
-            output = session.engine.process_frame(frame, timestamp_ms)
-            output_dict = output.to_dict() if hasattr(output, 'to_dict') else output
+            message = session.engine.process_frame_wire(frame, timestamp_ms, heads=heads)
+        except ShardLostError:
+            raise self._drop_lost_session(session)
+        except DetectorPoolExhausted as e:
+            # Every pooled detector is leased: fail this frame now, retried on the next one
+            raise CustomException(http_code=503, code='503', message=f"Pose detector busy: {str(e)}")
         except Exception as e:
             self.logger.error(f"process_frame error: {e}", exc_info=True)
             raise CustomException(http_code=500, code='500', message=f"Engine processing failed: {str(e)}")
+        pose_admission_controller.record_frame(session_id, time.perf_counter() - started)
         
-        # Extract response data
-        phase = output_dict.get('phase', 1)
-        phase_name = output_dict.get('phase_name', 'detection')
-        data = self._extract_phase_data(output_dict)
-        message = self._get_phase_message(output_dict)
-        warning = output_dict.get('warning')
-        
-        return ProcessFrameResponse(
-            session_id=request.session_id,
-            phase=phase,
-            phase_name=phase_name,
-            data=data,
-            message=message,
-            warning=warning,
-            timestamp=time.time()
+        self._maybe_checkpoint(session, message["phase"])
+        message["timestamp"] = time.time()
+        return message
+    
+    def process_landmarks_wire(
+        self,
+        session_id: str,
+        landmarks: Tuple[Optional[np.ndarray], Optional[np.ndarray]],
+        timestamp_ms: Optional[int] = None,
+        heads: Optional[Dict[str, bool]] = None
+    ) -> Dict[str, Any]:
+        """
+        Per-frame path for ``input_mode="landmarks"`` sessions.
+        
+        ``landmarks`` is the (pose, face) pair from parse_landmark_message;
+        the engine skips decoding and MediaPipe entirely. Same return value
+        as process_frame_wire().
+        """
+        session = self.get_session(session_id)
+        timestamp_ms = timestamp_ms if timestamp_ms else int(time.time() * 1000)
+        pose, face = landmarks
+        
+        started = time.perf_counter()
+        try:
+            message = session.engine.process_landmarks_wire(
+                pose, timestamp_ms, face_landmarks=face, heads=heads
+            )
+        except ShardLostError:
+            raise self._drop_lost_session(session)
+        except Exception as e:
+            self.logger.error(f"process_landmarks error: {e}", exc_info=True)
+            raise CustomException(http_code=500, code='500', message=f"Engine processing failed: {str(e)}")
+        pose_admission_controller.record_frame(session_id, time.perf_counter() - started)
+        
+        self._maybe_checkpoint(session, message["phase"])
+        message["timestamp"] = time.time()
+        return message
+    
+    def _drop_lost_session(self, session: PoseSession) -> CustomException:
+        """
+        Forget a session whose shard worker crashed (engine state is gone).
+        
+        Its checkpoint and registry entry are kept, so the next frame (or
+        reconnect) restores it through get_session. Returns the error to raise.
+        """
+        if self._sessions.get(session.session_id) is session:
+            self._sessions.pop(session.session_id, None)
+            pose_admission_controller.release(session.session_id)
+        self.logger.warning(f"_drop_lost_session: Shard worker lost {session.session_id}")
+        return CustomException(
+            http_code=503, code='503',
+            message="Pose worker restarted, session resumes from its last checkpoint"
         )
     
-    def _decode_frame(self, frame_data: str) -> np.ndarray:
-        """Decode base64 frame to numpy array."""
-        # Remove data URI prefix if present
-        if ',' in frame_data:
-            frame_data = frame_data.split(',')[1]
+    def release_detector(self, session_id: str) -> None:
+        """
+        Return the session's pooled detector while no client streams to it
+        (WebSocket closed); the engine leases one again on its next frame.
+        """
+        session = self._sessions.get(session_id)
+        if session is None:
+            return
+        try:
+            session.engine.release_detector()
+        except Exception as e:
+            self.logger.warning(f"release_detector: Failed for {session_id}: {e}")
+    
+    # ==================== CHECKPOINTS ====================
+    
+    def checkpoint_session(self, session_id: str) -> bool:
+        """Persist a session checkpoint now (e.g. when its WebSocket drops)."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return False
+        return self._save_checkpoint(session)
+    
+    def _maybe_checkpoint(self, session: PoseSession, phase: int) -> None:
+        """
+        Checkpoint on every phase change from Phase 2 on, and every
+        POSE_CHECKPOINT_INTERVAL seconds during calibration / sync.
+        """
+        if not pose_checkpoint_store.enabled or phase < 2:
+            return
+        if (phase != session.last_checkpoint_phase
+                or (phase in (2, 3)
+                    and time.time() - session.last_checkpoint_at >= settings.POSE_CHECKPOINT_INTERVAL)):
+            self._save_checkpoint(session, phase)
+    
+    def _save_checkpoint(self, session: PoseSession, phase: Optional[int] = None) -> bool:
+        if not pose_checkpoint_store.enabled or session.config is None:
+            return False
+        try:
+            checkpoint = session.engine.create_checkpoint()
+            metadata = self._session_metadata(session)
+            metadata["phase"] = phase
+            pose_checkpoint_store.save(session.session_id, metadata, checkpoint)
+        except Exception as e:
+            self.logger.warning(f"_save_checkpoint: Failed for {session.session_id}: {e}")
+            return False
+        session.last_checkpoint_at = time.time()
+        if phase is not None:
+            session.last_checkpoint_phase = phase
+        return True
+    
+    @staticmethod
+    def _session_metadata(session: PoseSession) -> Dict[str, Any]:
+        """What another worker needs to rebuild the session's engine."""
+        return {
+            "user_id": session.user_id,
+            "input_mode": session.input_mode,
+            "created_at": session.created_at,
+            "config": dataclasses.asdict(session.config) if session.config else None,
+        }
+    
+    def _restore_session(self, session_id: str) -> Optional[PoseSession]:
+        """
+        Rebuild a session that is not in memory (None if unknown).
         
-        # Decode base64
-        frame_bytes = base64.b64decode(frame_data)
+        With the session registry enabled the session is first claimed from
+        its owning worker, which checkpoints and releases it.
+        """
+        if not MEDIAPIPE_AVAILABLE:
+            return None
+        with self._restore_lock:
+            # Another request may have restored it while we waited
+            session = self._sessions.get(session_id)
+            if session is not None:
+                return session
+            return self._restore_session_locked(session_id)
+    
+    def _restore_session_locked(self, session_id: str) -> Optional[PoseSession]:
+        entry = pose_session_registry.lookup(session_id)
+        if entry is not None and not pose_session_registry.claim(session_id):
+            raise CustomException(
+                http_code=409, code='409',
+                message=f"Session is active on another worker, retry: {session_id}"
+            )
         
-        # Convert to numpy array
-        np_arr = np.frombuffer(frame_bytes, np.uint8)
-        frame = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+        loaded = pose_checkpoint_store.load(session_id)
+        if loaded is not None:
+            metadata, checkpoint = loaded
+        elif entry is not None and entry["metadata"].get("config"):
+            # Owned elsewhere but never checkpointed (Phase 1): start from its config
+            metadata, checkpoint = entry["metadata"], None
+        else:
+            return None
         
-        if frame is None:
-            raise ValueError("Failed to decode image")
+        started = time.time()
+        engine = None
+        try:
+            config = EngineConfig(**metadata["config"])
+            engine = self._create_engine(session_id, config)
+            if checkpoint is not None:
+                engine.restore_checkpoint(checkpoint)
+        except Exception as e:
+            self.logger.error(f"_restore_session: Failed for {session_id}: {e}", exc_info=True)
+            if engine is not None:
+                engine.cleanup()
+            pose_checkpoint_store.delete(session_id)
+            return None
         
-        return frame
+        session = PoseSession(
+            session_id=session_id,
+            engine=engine,
+            user_id=metadata.get("user_id"),
+            input_mode=metadata.get("input_mode", "image"),
+            config=config,
+            created_at=metadata.get("created_at")
+        )
+        session.last_checkpoint_at = time.time()
+        session.last_checkpoint_phase = metadata.get("phase")
+        self._sessions[session_id] = session
+        # Resumed sessions were admitted before: never turned away here
+        pose_admission_controller.admit(session_id, session.input_mode, force=True)
+        
+        self.logger.info(
+            f"_restore_session: Restored {session_id} (phase={metadata.get('phase')}) "
+            f"in {(time.time() - started) * 1000:.0f}ms"
+        )
+        return session
     
-    def _extract_phase_data(self, output_dict: Dict[str, Any]) -> Dict[str, Any]:
-        """Extract phase-specific data from engine output.
+    def bind_event_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Event loop whose session lanes housekeeping threads must go through (set at startup)."""
+        self._loop = loop
+    
+    def _handoff_session(self, session_id: str) -> bool:
+        """
+        Release a session another worker claimed (registry heartbeat thread).
         
-        Engine trả về data trong các field riêng biệt:
-        - phase 1: detection
-        - phase 2: calibration  
-        - phase 3: sync
-        - phase 4: final_report
+        Declined while a WebSocket of the session is open here or it was
+        active recently. Otherwise the checkpoint and engine cleanup run in
+        the session's executor lane on the event loop, so they never overlap
+        a frame, and the session is dropped from memory.
         """
-        phase = output_dict.get('phase', 1)
-        
-        if phase == 1:  # Detection
-            # Lấy data từ field 'detection'
-            detection = output_dict.get('detection', {}) or {}
-            return {
-                'pose_detected': detection.get('pose_detected', False),
-                'stable_count': detection.get('stable_count', 0),
-                'progress': detection.get('progress', 0.0),
-                'countdown_remaining': detection.get('countdown_remaining'),
-                'status': detection.get('status', ''),
-                'message': detection.get('message', ''),
-                'landmarks': detection.get('landmarks', [])
-            }
-        elif phase == 2:  # Calibration
-            # Lấy data từ field 'calibration'
-            calibration = output_dict.get('calibration', {}) or {}
-            return {
-                'current_joint': calibration.get('current_joint'),
-                'current_joint_name': calibration.get('current_joint_name'),
-                'queue_index': calibration.get('queue_index', 0),
-                'total_joints': calibration.get('total_joints', 6),
-                'progress': calibration.get('progress', 0.0),
-                'overall_progress': calibration.get('overall_progress', 0.0),
-                'current_angle': calibration.get('current_angle', 0.0),
-                'user_max_angle': calibration.get('user_max_angle', 0.0),
-                'countdown_remaining': calibration.get('countdown_remaining'),
-                'status': calibration.get('status', ''),
-                'position_instruction': calibration.get('position_instruction', ''),
-                'joints_status': calibration.get('joints_status', []),
-                'message': calibration.get('message', '')
-            }
-        elif phase == 3:  # Sync
-            # Lấy data từ field 'sync'
-            sync = output_dict.get('sync', {}) or {}
-            return {
-                'video_frame': sync.get('video_frame'),
-                'current_score': sync.get('current_score', 0.0),
-                'rep_count': sync.get('rep_count', 0),
-                'fatigue_level': sync.get('fatigue_level', 'FRESH'),
-                'joint_errors': sync.get('joint_errors', []),
-                'motion_phase': sync.get('motion_phase', ''),
-                'feedback': sync.get('feedback', '')
-            }
-        elif phase == 4:  # Scoring
-            # Lấy data từ field 'final_report'
-            report = output_dict.get('final_report', {}) or {}
-            return {
-                'total_score': report.get('total_score', 0.0),
-                'rom_score': report.get('rom_score', 0.0),
-                'stability_score': report.get('stability_score', 0.0),
-                'flow_score': report.get('flow_score', 0.0),
-                'grade': report.get('grade', ''),
-                'grade_color': report.get('grade_color', 'yellow'),
-                'total_reps': report.get('total_reps', 0),
-                'recommendations': report.get('recommendations', [])
-            }
-        
-        return {}
-    
-    def _get_phase_message(self, output_dict: Dict[str, Any]) -> Optional[str]:
-        """Get user-friendly message for current phase."""
-        phase = output_dict.get('phase', 1)
-        
-        # Lấy message từ nested field
-        phase_key_map = {1: 'detection', 2: 'calibration', 3: 'sync', 4: 'final_report'}
-        phase_key = phase_key_map.get(phase)
-        if phase_key:
-            nested_data = output_dict.get(phase_key, {}) or {}
-            if nested_data.get('message'):
-                return nested_data.get('message')
-        
-        # Fallback messages
-        messages = {
-            1: "Đang phát hiện tư thế...",
-            2: "Đang hiệu chỉnh khớp...",
-            3: "Đang đồng bộ với video...",
-            4: "Hoàn thành!"
-        }
-        return output_dict.get('message') or messages.get(phase)
+        from app.services.ws_manager import ws_connection_manager
+        
+        session = self._sessions.get(session_id)
+        if session is None:
+            return True
+        if ws_connection_manager.get_session_count(session_id) > 0:
+            return False
+        if time.time() - session.last_activity < settings.POSE_REGISTRY_HANDOFF_IDLE:
+            return False
+        if self._loop is None or not self._loop.is_running():
+            return False
+        
+        future = asyncio.run_coroutine_threadsafe(self._release_for_handoff(session), self._loop)
+        try:
+            return future.result(timeout=settings.POSE_REGISTRY_HANDOFF_TIMEOUT)
+        except Exception as e:
+            future.cancel()
+            self.logger.warning(f"_handoff_session: Declined {session_id}: {e!r}")
+            return False
+    
+    async def _release_for_handoff(self, session: PoseSession) -> bool:
+        from app.services.ws_manager import ws_connection_manager
+        
+        async with pose_inference_executor.session_exclusive(session.session_id):
+            # A client may have connected while we waited for the lane
+            if ws_connection_manager.get_session_count(session.session_id) > 0:
+                return False
+            released = await pose_inference_executor.run_stateful(self._checkpoint_and_drop, session)
+        if released:
+            pose_inference_executor.release_session(session.session_id)
+        return released
+    
+    def _checkpoint_and_drop(self, session: PoseSession) -> bool:
+        """Checkpoint, then free the engine (checkpoint and registry entry kept)."""
+        if not self._save_checkpoint(session, session.last_checkpoint_phase):
+            return False
+        
+        self._sessions.pop(session.session_id, None)
+        pose_admission_controller.release(session.session_id)
+        try:
+            session.engine.cleanup()
+        except Exception as e:
+            self.logger.warning(f"_handoff_session: Engine cleanup failed: {e}")
+        self.logger.info(f"_handoff_session: Released {session.session_id}")
+        return True
     
     # ==================== SESSION END ====================
     
@@ -365,20 +730,98 @@ class PoseDetectionService:
             status="healthy" if MEDIAPIPE_AVAILABLE else "degraded",
             mediapipe_available=MEDIAPIPE_AVAILABLE,
             active_sessions=len(self._sessions),
-            version=SERVICE_VERSION
+            version=SERVICE_VERSION,
+            detector_pool=self._get_detector_pool_stats()
         )
     
     # ==================== INTERNAL METHODS ====================
     
+    def build_engine_config(
+        self,
+        ref_video_path: Optional[str] = None,
+        default_joint: str = "left_shoulder",
+        landmark_format: Optional[str] = None,
+        landmark_joints: Optional[List[int]] = None,
+        input_mode: str = "image",
+        frame_color: Optional[str] = None
+    ) -> EngineConfig:
+        """Build EngineConfig from settings (shared by sessions and warm-up)."""
+        return EngineConfig(
+            models_dir=str(Path(settings.MEDIAPIPE_MODELS_DIR)),
+            log_dir=str(Path(settings.MEDIAPIPE_LOG_DIR)),
+            ref_video_path=ref_video_path,
+            default_joint=default_joint,
+            use_detector_pool=settings.POSE_DETECTOR_POOL_ENABLED,
+            detector_pool_size=settings.POSE_DETECTOR_POOL_SIZE,
+            detector_lease_timeout=settings.POSE_DETECTOR_LEASE_TIMEOUT,
+            face_analysis_hz=settings.POSE_FACE_ANALYSIS_HZ,
+            use_roi=settings.POSE_ROI_ENABLED,
+            roi_max_side=settings.POSE_ROI_MAX_SIDE,
+            keyframe_mode=settings.POSE_KEYFRAME_MODE,
+            keyframe_max_interval=settings.POSE_KEYFRAME_MAX_INTERVAL,
+            reference_cache=settings.POSE_REFERENCE_CACHE_ENABLED,
+            landmark_format=landmark_format or settings.POSE_LANDMARK_FORMAT,
+            landmark_joints=landmark_joints,
+            input_mode=input_mode,
+            collect_timings=settings.POSE_METRICS_ENABLED,
+            frame_color=frame_color or ("rgb" if settings.POSE_RGB_DECODE else "bgr")
+        )
+    
+    def _resolve_landmark_options(self, request: StartSessionRequest):
+        """Validate the requested landmark format / joint subset."""
+        from app.mediapipe.mediapipe_be.core import LANDMARK_FORMATS, resolve_landmark_indices
+        
+        landmark_format = (request.landmark_format or settings.POSE_LANDMARK_FORMAT).lower()
+        if landmark_format not in LANDMARK_FORMATS:
+            raise CustomException(
+                http_code=400, code='400',
+                message=f"landmark_format must be one of {', '.join(LANDMARK_FORMATS)}"
+            )
+        try:
+            landmark_joints = resolve_landmark_indices(request.landmark_joints)
+        except ValueError as e:
+            raise CustomException(http_code=400, code='400', message=str(e))
+        return landmark_format, landmark_joints
+    
+    def _resolve_input_mode(self, request: StartSessionRequest) -> str:
+        """Validate the session input mode (image frames or client landmarks)."""
+        from app.mediapipe.mediapipe_be.service.engine_service import ENGINE_INPUT_MODES
+        
+        input_mode = (request.input_mode or "image").lower()
+        if input_mode not in ENGINE_INPUT_MODES:
+            raise CustomException(
+                http_code=400, code='400',
+                message=f"input_mode must be one of {', '.join(ENGINE_INPUT_MODES)}"
+            )
+        return input_mode
+    
+    def _get_detector_pool_stats(self) -> Optional[Dict[str, Any]]:
+        """Detector pool utilisation (local process or per shard)."""
+        if not MEDIAPIPE_AVAILABLE or not settings.POSE_DETECTOR_POOL_ENABLED:
+            return None
+        if pose_shard_host.enabled:
+            return pose_shard_host.get_detector_pool_stats()
+        from app.mediapipe.mediapipe_be.core import get_detector_pool_stats
+        return get_detector_pool_stats()
+    
+    def _create_engine(self, session_id: str, config: EngineConfig) -> Any:
+        """Engine instance, in a shard worker process when sharding is enabled."""
+        if pose_shard_host.enabled:
+            return pose_shard_host.create_engine(session_id, config)
+        return MemotionEngine.create_instance(config=config)
+    
     def _remove_session(self, session_id: str) -> None:
-        """Remove session from memory."""
+        """Remove session from memory, its checkpoint and registry entry."""
+        pose_checkpoint_store.delete(session_id)
+        pose_session_registry.remove_session(session_id)
+        pose_admission_controller.release(session_id)
         if session_id in self._sessions:
             del self._sessions[session_id]
             self.logger.debug(f"_remove_session: Removed {session_id}")
     
     def _cleanup_expired_sessions(self) -> int:
         """Cleanup expired sessions. Returns count of removed sessions."""
-        expired = [sid for sid, s in self._sessions.items() if s.is_expired()]
+        expired = [sid for sid, s in list(self._sessions.items()) if s.is_expired()]
         
         for sid in expired:
             try:
@@ -389,9 +832,191 @@ class PoseDetectionService:
             self._remove_session(sid)
         
         if expired:
+            self._reaper_stats["expired"] += len(expired)
             self.logger.info(f"_cleanup_expired_sessions: Removed {len(expired)} sessions")
         
         return len(expired)
+    
+    # ==================== REAPER / EVICTION ====================
+    
+    async def run_reaper(self) -> None:
+        """
+        Background task (started at app startup): every POSE_REAPER_INTERVAL
+        seconds drop expired sessions and evict idle engines over the limits.
+        """
+        while True:
+            await asyncio.sleep(settings.POSE_REAPER_INTERVAL)
+            try:
+                await run_in_threadpool(self.reap_sessions)
+            except Exception as e:
+                self.logger.error(f"run_reaper: {e}", exc_info=True)
+    
+    def reap_sessions(self) -> Dict[str, int]:
+        """One reaper pass. Returns counts of expired / evicted sessions."""
+        with self._reap_lock:
+            self._reaper_stats["runs"] += 1
+            expired = self._cleanup_expired_sessions()
+            evicted = self._evict_idle_sessions()
+        return {"expired": expired, "evicted": evicted}
+    
+    def _evict_idle_sessions(self, reserve: int = 0) -> int:
+        """
+        Evict least-recently-active sessions while more than
+        POSE_MAX_LIVE_SESSIONS - ``reserve`` engines are live, plus up to
+        POSE_EVICT_BATCH sessions per engine process whose RSS is above
+        POSE_MAX_RSS_MB.
+        
+        RSS is read once per pass, from the processes that hold the engines
+        (the shard workers when sharding is enabled): freed memory shows up
+        in RSS late, so re-reading it after every eviction would evict
+        every idle session in one pass.
+        
+        Sessions with an open WebSocket are never evicted, and sessions
+        whose checkpoint cannot be saved are skipped (kept live) rather than
+        destroyed. Evicted sessions are restored transparently by get_session.
+        Called from worker threads (reaper, start_session), never on the
+        event loop: each eviction waits for the session's lane there.
+        """
+        from app.services.ws_manager import ws_connection_manager
+        
+        max_sessions = settings.POSE_MAX_LIVE_SESSIONS
+        max_rss_mb = settings.POSE_MAX_RSS_MB
+        candidates = sorted(
+            (s for s in list(self._sessions.values())
+             if ws_connection_manager.get_session_count(s.session_id) == 0),
+            key=lambda s: s.last_activity
+        )
+        
+        evicted = 0
+        # Session count: drops with every eviction, so it is re-checked each time
+        if max_sessions > 0:
+            limit = max(0, max_sessions - reserve)
+            while len(self._sessions) > limit and candidates:
+                if self._evict_session(candidates.pop(0)):
+                    self._reaper_stats["evicted_lru"] += 1
+                    evicted += 1
+            if len(self._sessions) > limit:
+                self._reaper_stats["eviction_blocked"] += 1
+                self.logger.warning(
+                    f"_evict_idle_sessions: {len(self._sessions)} sessions over the limit of {limit} "
+                    f"but none left that can be evicted"
+                )
+        
+        # Memory: one RSS reading per engine process, a bounded batch per pass
+        if max_rss_mb > 0:
+            for owner, rss_mb in _engine_process_rss_mb().items():
+                if rss_mb is None or rss_mb <= max_rss_mb:
+                    continue
+                owned = [s for s in candidates if _engine_owner(s) == owner]
+                batch = 0
+                while owned and batch < settings.POSE_EVICT_BATCH:
+                    session = owned.pop(0)
+                    candidates.remove(session)
+                    if self._evict_session(session):
+                        self._reaper_stats["evicted_memory"] += 1
+                        evicted += 1
+                        batch += 1
+                if batch == 0:
+                    self._reaper_stats["eviction_blocked"] += 1
+                    self.logger.warning(
+                        f"_evict_idle_sessions: {_owner_name(owner)} rss={rss_mb} MB over "
+                        f"{max_rss_mb} MB but none of its sessions can be evicted"
+                    )
+        
+        if evicted:
+            self.logger.info(f"_evict_idle_sessions: Evicted {evicted} sessions, {len(self._sessions)} live")
+        return evicted
+    
+    def _evict_session(self, session: PoseSession) -> bool:
+        """
+        Checkpoint a session, then release its engine (checkpoint kept).
+        
+        Runs in the session's executor lane on the event loop, like
+        _handoff_session, so it never overlaps a frame of the session.
+        Returns False, leaving the session live, when the lane could not be
+        taken in time, a WebSocket connected meanwhile, or no checkpoint
+        could be saved (evicting it would lose the session).
+        """
+        if self._loop is None or not self._loop.is_running():
+            return False
+        
+        future = asyncio.run_coroutine_threadsafe(self._evict_in_lane(session), self._loop)
+        try:
+            return future.result(timeout=settings.POSE_EVICT_TIMEOUT)
+        except Exception as e:
+            future.cancel()
+            self._reaper_stats["eviction_skipped"] += 1
+            self.logger.warning(f"_evict_session: Skipped {session.session_id}: {e!r}")
+            return False
+    
+    async def _evict_in_lane(self, session: PoseSession) -> bool:
+        from app.services.ws_manager import ws_connection_manager
+        
+        session_id = session.session_id
+        async with pose_inference_executor.session_exclusive(session_id):
+            # A client may have connected, or the session ended, while we waited for the lane
+            if (ws_connection_manager.get_session_count(session_id) > 0
+                    or self._sessions.get(session_id) is not session):
+                return False
+            evicted = await pose_inference_executor.run_stateful(self._checkpoint_and_evict, session)
+        if evicted:
+            pose_inference_executor.release_session(session_id)
+        return evicted
+    
+    def _checkpoint_and_evict(self, session: PoseSession) -> bool:
+        if not self._save_checkpoint(session, session.last_checkpoint_phase):
+            self._reaper_stats["eviction_skipped"] += 1
+            self.logger.warning(f"_evict_session: Skipped {session.session_id} (checkpoint failed)")
+            return False
+        self._sessions.pop(session.session_id, None)
+        pose_admission_controller.release(session.session_id)
+        try:
+            session.engine.cleanup()
+        except Exception as e:
+            self.logger.warning(f"_evict_session: Engine cleanup failed: {e}")
+        self.logger.info(f"_evict_session: {session.session_id}")
+        return True
+    
+    def get_reaper_stats(self) -> Dict[str, Any]:
+        return {
+            **self._reaper_stats,
+            "live_sessions": len(self._sessions),
+            "max_live_sessions": settings.POSE_MAX_LIVE_SESSIONS,
+            "rss_mb": _current_rss_mb(),
+            "engine_rss_mb": {
+                _owner_name(owner): rss_mb for owner, rss_mb in _engine_process_rss_mb().items()
+            },
+            "max_rss_mb": settings.POSE_MAX_RSS_MB,
+        }
+
+
+def _current_rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    """Resident set size of a process (default: this one) in MB (Linux /proc), None if unknown."""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+
+
+def _engine_process_rss_mb() -> Dict[Optional[int], Optional[float]]:
+    """RSS of the processes holding engines: shard index -> MB, or None -> this process."""
+    if pose_shard_host.enabled:
+        return {
+            index: _current_rss_mb(pid)
+            for index, pid in pose_shard_host.get_worker_pids().items() if pid is not None
+        }
+    return {None: _current_rss_mb()}
+
+
+def _engine_owner(session: PoseSession) -> Optional[int]:
+    """Shard index of the session's engine (None: engine in this process)."""
+    return getattr(session.engine, "shard_index", None)
+
+
+def _owner_name(owner: Optional[int]) -> str:
+    return "api" if owner is None else f"shard-{owner}"
 
 
 # ==================== SINGLETON INSTANCE ====================
@@ -0,0 +1,364 @@
+"""
+Offline Pose Analysis Service.
+
+Runs a recorded exercise video through MemotionEngine as fast as decode and
+inference allow (instead of the real-time paced WebSocket loop) and exposes
+progress plus the final report as Server-Sent Events.
+
+Pipeline per job:
+    decode thread:    cv2.VideoCapture -> bounded queue (frame, timestamp_ms)
+    inference thread: queue -> MemotionEngine.process_frame (VIDEO running mode,
+                      timestamps taken from the video, not the wall clock)
+
+Jobs run on a small dedicated thread pool so uploads never compete with the
+live-session inference executor for its bounded queue, and each job's engine
+owns its detector instead of leasing one from the live-session pool.
+
+Jobs live in the memory of the worker that accepted the upload; they are
+not shared through the session registry. With several uvicorn workers,
+status / events requests must reach that same worker (sticky routing),
+otherwise they get 404.
+
+Author: MEMOTION Team
+Version: 1.0.0
+"""
+
+import asyncio
+import dataclasses
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Optional
+
+import cv2
+
+from app.core.config import settings
+from app.helpers.exception_handler import CustomException
+from app.services.srv_pose import pose_detection_service, MEDIAPIPE_AVAILABLE
+
+if MEDIAPIPE_AVAILABLE:
+    from app.mediapipe.mediapipe_be.service.engine_service import EngineConfig, MemotionEngine
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_VIDEO_EXTENSIONS = {'mp4', 'mov', 'avi', 'mkv', 'webm'}
+
+# SSE polling interval / keep-alive comment interval (seconds)
+EVENT_POLL_INTERVAL = 0.5
+EVENT_KEEPALIVE_INTERVAL = 15.0
+
+_END_OF_VIDEO = object()
+
+
+class AnalysisJob:
+    """State of one offline analysis job (mutated by its worker thread only)."""
+
+    def __init__(self, job_id: str, video_path: str, default_joint: str):
+        self.job_id = job_id
+        self.video_path = video_path
+        self.default_joint = default_joint
+        self.status = "queued"  # queued | running | completed | failed
+        self.frames_total = 0
+        self.frames_processed = 0
+        self.phase = 1
+        self.phase_name = "detection"
+        self.processing_fps = 0.0
+        self.video_duration_seconds = 0.0
+        self.error: Optional[str] = None
+        self.report: Optional[Dict[str, Any]] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        # Bumped on every update so event streams only send changes
+        self.version = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def to_progress(self) -> Dict[str, Any]:
+        progress = self.frames_processed / self.frames_total if self.frames_total else 0.0
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "progress": round(min(1.0, progress), 4),
+            "frames_processed": self.frames_processed,
+            "frames_total": self.frames_total,
+            "phase": self.phase,
+            "phase_name": self.phase_name,
+            "processing_fps": round(self.processing_fps, 1),
+            "error": self.error,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = self.to_progress()
+        data["report"] = self.report
+        return data
+
+
+class PoseAnalysisService:
+    """
+    Upload-and-analyze jobs for recorded exercise videos.
+
+    Usage:
+        job = pose_analysis_service.submit(video_path, default_joint="left_shoulder")
+        async for event in pose_analysis_service.stream_events(job.job_id):
+            ...  # "event: progress" ... "event: result"
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 1,
+        max_jobs: int = 8,
+        decode_queue_size: int = 16,
+        retention_seconds: int = 3600
+    ):
+        """
+        Args:
+            max_workers: Jobs analysed concurrently
+            max_jobs: Queued + running jobs accepted before rejecting with 503
+            decode_queue_size: Decoded frames buffered ahead of inference
+            retention_seconds: How long finished jobs (and reports) are kept
+        """
+        self.max_workers = max(1, max_workers)
+        self.max_jobs = max_jobs
+        self.decode_queue_size = max(1, decode_queue_size)
+        self.retention_seconds = retention_seconds
+        self._jobs: Dict[str, AnalysisJob] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    # ==================== JOBS ====================
+
+    def check_capacity(self) -> None:
+        """Raise 503 now if a job would be rejected (before the upload is saved)."""
+        if not MEDIAPIPE_AVAILABLE:
+            raise CustomException(http_code=503, code='503', message="MediaPipe service not available")
+        with self._lock:
+            self._check_capacity_locked()
+
+    def _check_capacity_locked(self) -> None:
+        self._purge_finished()
+        active = sum(1 for job in self._jobs.values() if not job.finished)
+        if active >= self.max_jobs:
+            raise CustomException(
+                http_code=503, code='503',
+                message=f"Too many analysis jobs in progress ({active}), retry later"
+            )
+
+    def submit(self, video_path: str, default_joint: str = "left_shoulder") -> AnalysisJob:
+        """Queue a saved video for analysis (the job deletes it when done)."""
+        if not MEDIAPIPE_AVAILABLE:
+            raise CustomException(http_code=503, code='503', message="MediaPipe service not available")
+
+        with self._lock:
+            self._check_capacity_locked()
+
+            job = AnalysisJob(f"analysis_{uuid.uuid4().hex[:12]}", video_path, default_joint)
+            self._jobs[job.job_id] = job
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="pose-analysis"
+                )
+            self._executor.submit(self._run_job, job)
+
+        logger.info(f"submit: job_id={job.job_id}, video={video_path}")
+        return job
+
+    def get_job(self, job_id: str) -> AnalysisJob:
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise CustomException(http_code=404, code='404', message=f"Analysis job not found: {job_id}")
+        return job
+
+    def _purge_finished(self) -> None:
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and now - (job.finished_at or now) > self.retention_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    # ==================== WORKER ====================
+
+    def _run_job(self, job: AnalysisJob) -> None:
+        job.status = "running"
+        job.version += 1
+        engine = None
+        frames: "queue.Queue[Any]" = queue.Queue(maxsize=self.decode_queue_size)
+        stop = threading.Event()
+        decoder = None
+
+        try:
+            capture = cv2.VideoCapture(job.video_path)
+            if not capture.isOpened():
+                capture.release()
+                raise ValueError("Cannot open video file")
+            fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+            job.frames_total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+            if fps > 0 and job.frames_total:
+                job.video_duration_seconds = job.frames_total / fps
+
+            decoder = threading.Thread(
+                target=self._decode_frames, args=(capture, fps, frames, stop),
+                name=f"pose-analysis-decode-{job.job_id}", daemon=True
+            )
+            decoder.start()
+
+            config = self._build_engine_config(job)
+            engine = MemotionEngine.create_instance(config=config)
+
+            started = time.time()
+            while True:
+                item = frames.get()
+                if item is _END_OF_VIDEO:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+
+                frame, timestamp_ms = item
+                output = engine.process_frame(frame, timestamp_ms)
+                if output.error:
+                    raise RuntimeError(output.error)
+
+                job.frames_processed += 1
+                job.phase = output.current_phase
+                job.phase_name = output.phase_name
+                job.processing_fps = job.frames_processed / max(1e-6, time.time() - started)
+                job.version += 1
+
+            report = engine.get_final_report().to_dict()
+            if job.video_duration_seconds:
+                report["duration_seconds"] = int(round(job.video_duration_seconds))
+            job.report = report
+            job.frames_total = max(job.frames_total, job.frames_processed)
+            job.status = "completed"
+            logger.info(
+                f"_run_job: job_id={job.job_id} completed, frames={job.frames_processed}, "
+                f"fps={job.processing_fps:.1f}"
+            )
+        except Exception as e:
+            logger.error(f"_run_job: job_id={job.job_id} failed: {e}", exc_info=True)
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            stop.set()
+            if decoder is not None:
+                # Unblock a decoder waiting on a full queue
+                while decoder.is_alive():
+                    try:
+                        frames.get_nowait()
+                    except queue.Empty:
+                        decoder.join(timeout=0.1)
+            if engine is not None:
+                engine.cleanup()
+            try:
+                os.remove(job.video_path)
+            except OSError:
+                pass
+            job.finished_at = time.time()
+            job.version += 1
+
+    @staticmethod
+    def _build_engine_config(self, job: AnalysisJob) -> "EngineConfig":
+        """
+        Engine config for an offline job.
+
+        Free training (no reference video): phase timing follows video
+        timestamps, and VideoCapture yields BGR frames. The detector is
+        private to the job (never leased from the live-session pool), and the
+        real-time shortcuts are off: ROI cropping and keyframe prediction
+        trade accuracy for latency, and per-frame landmarks / timings are
+        never read (only the final report is).
+        """
+        config = pose_detection_service.build_engine_config(
+            default_joint=job.default_joint, frame_color="bgr"
+        )
+        return dataclasses.replace(
+            config,
+            use_detector_pool=False,
+            use_roi=False,
+            keyframe_mode=False,
+            landmark_format="none",
+            landmark_joints=None,
+            collect_timings=False,
+        )
+
+    def _decode_frames(
+        capture: "cv2.VideoCapture",
+        fps: float,
+        frames: "queue.Queue[Any]",
+        stop: threading.Event
+    ) -> None:
+        """Decode thread: read frames ahead of inference into the bounded queue."""
+        index = 0
+        try:
+            while not stop.is_set():
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                if fps > 0:
+                    timestamp_ms = int(index * 1000.0 / fps)
+                else:
+                    timestamp_ms = int(capture.get(cv2.CAP_PROP_POS_MSEC))
+                frames.put((frame, timestamp_ms))
+                index += 1
+            frames.put(_END_OF_VIDEO)
+        except Exception as e:
+            frames.put(e)
+        finally:
+            capture.release()
+
+    # ==================== EVENTS ====================
+
+    async def stream_events(self, job_id: str) -> AsyncIterator[str]:
+        """
+        Server-Sent Events for a job.
+
+        ``progress`` events are sent whenever the job changes (at most every
+        EVENT_POLL_INTERVAL), then a single ``result`` (final report) or
+        ``error`` event closes the stream.
+        """
+        job = self.get_job(job_id)
+        sent_version = -1
+        last_sent = time.time()
+
+        while True:
+            if job.version != sent_version:
+                sent_version = job.version
+                last_sent = time.time()
+                yield _sse("progress", job.to_progress())
+            elif time.time() - last_sent >= EVENT_KEEPALIVE_INTERVAL:
+                last_sent = time.time()
+                yield ": keep-alive\n\n"
+
+            if job.finished and job.version == sent_version:
+                if job.status == "completed":
+                    yield _sse("result", job.to_dict())
+                else:
+                    yield _sse("error", {"job_id": job.job_id, "error": job.error})
+                return
+
+            await asyncio.sleep(EVENT_POLL_INTERVAL)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+pose_analysis_service = PoseAnalysisService(
+    max_workers=settings.POSE_ANALYSIS_WORKERS,
+    max_jobs=settings.POSE_ANALYSIS_MAX_JOBS,
+    decode_queue_size=settings.POSE_ANALYSIS_DECODE_QUEUE,
+    retention_seconds=settings.POSE_ANALYSIS_RETENTION
+)
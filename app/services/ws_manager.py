@@ -33,6 +33,8 @@ class WebSocketConnection:
         is_active: Whether connection is active
         frame_count: Number of frames processed
         error_count: Number of errors encountered
+        dropped_frames: Number of stale frames discarded by the frame mailbox
+        serializer: Negotiated response encoding (None = stdlib JSON text)
     """
     websocket: WebSocket
     session_id: str
@@ -42,6 +44,8 @@ class WebSocketConnection:
     is_active: bool = True
     frame_count: int = 0
     error_count: int = 0
+    dropped_frames: int = 0
+    serializer: Optional[Any] = None
     
     def __hash__(self) -> int:
         """Make hashable using id of websocket and session_id."""
@@ -57,6 +61,15 @@ class WebSocketConnection:
         """Update last activity timestamp."""
         self.last_activity = time.time()
     
+    async def send(self, data: Dict[str, Any]) -> None:
+        """Send a message using the connection's negotiated encoding."""
+        if self.serializer is None:
+            await self.websocket.send_json(data)
+        elif self.serializer.binary:
+            await self.websocket.send_bytes(self.serializer.dumps(data))
+        else:
+            await self.websocket.send_text(self.serializer.dumps(data))
+    
     def increment_frame(self) -> None:
         """Increment frame count."""
         self.frame_count += 1
@@ -65,6 +78,79 @@ class WebSocketConnection:
     def increment_error(self) -> None:
         """Increment error count."""
         self.error_count += 1
+    
+    def set_dropped(self, dropped: int) -> None:
+        """Update dropped frame count (reported by FrameMailbox)."""
+        self.dropped_frames = dropped
+
+
+FRAME_POLICIES = ("drop_oldest", "block")
+
+
+class FrameMailbox:
+    """
+    Single-slot, latest-frame-wins mailbox between the WebSocket receive
+    loop and the frame processing loop.
+    
+    Policies:
+        - drop_oldest: a new frame replaces the waiting one (stale frame is
+          counted in ``dropped``), so latency never grows beyond one frame.
+        - block: put() waits until the slot is free, which stops reading
+          from the socket and pushes backpressure to the client.
+    
+    Usage:
+        mailbox = FrameMailbox(policy="drop_oldest")
+        await mailbox.put(frame)      # receive loop
+        frame = await mailbox.get()   # processing loop
+    """
+    
+    def __init__(self, policy: str = "drop_oldest"):
+        """
+        Initialize mailbox.
+        
+        Args:
+            policy: "drop_oldest" or "block"
+        """
+        if policy not in FRAME_POLICIES:
+            logger.warning(f"FrameMailbox: unknown policy '{policy}', using 'drop_oldest'")
+            policy = "drop_oldest"
+        
+        self.policy = policy
+        self.dropped = 0
+        self._item: Any = None
+        self._has_item = False
+        self._ready = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+    
+    async def put(self, item: Any) -> None:
+        """Put a frame; replaces (drop_oldest) or waits for (block) a pending one."""
+        if self._has_item:
+            if self.policy == "block":
+                while self._has_item:
+                    await self._space.wait()
+            else:
+                self.dropped += 1
+        
+        self._item = item
+        self._has_item = True
+        self._space.clear()
+        self._ready.set()
+    
+    async def get(self) -> Any:
+        """Wait for and take the newest frame."""
+        while not self._has_item:
+            await self._ready.wait()
+        
+        item = self._item
+        self._item = None
+        self._has_item = False
+        self._ready.clear()
+        self._space.set()
+        return item
+    
+    def __len__(self) -> int:
+        return 1 if self._has_item else 0
 
 
 class WebSocketConnectionManager:
@@ -105,6 +191,8 @@ class WebSocketConnectionManager:
         self._websocket_map: Dict[WebSocket, WebSocketConnection] = {}
         self._max_per_session = max_connections_per_session
         self._lock = asyncio.Lock()
+        # Dropped frames of closed connections (open ones are summed on demand)
+        self._closed_dropped_frames = 0
         
         logger.info(
             f"WebSocketConnectionManager initialized: "
@@ -192,10 +280,12 @@ class WebSocketConnectionManager:
             
             # Remove from websocket map
             del self._websocket_map[websocket]
+            self._closed_dropped_frames += connection.dropped_frames
             
             logger.info(
                 f"WebSocket disconnected: session_id={session_id}, "
-                f"frames={connection.frame_count}, errors={connection.error_count}"
+                f"frames={connection.frame_count}, errors={connection.error_count}, "
+                f"dropped={connection.dropped_frames}"
             )
     
     async def send_to_connection(
@@ -218,7 +308,7 @@ class WebSocketConnectionManager:
             return False
         
         try:
-            await websocket.send_json(data)
+            await connection.send(data)
             connection.increment_frame()
             return True
         except Exception as e:
@@ -250,7 +340,7 @@ class WebSocketConnectionManager:
         for connection in self._connections[session_id]:
             try:
                 if connection.is_active:
-                    await connection.websocket.send_json(data)
+                    await connection.send(data)
                     connection.increment_frame()
                     sent_count += 1
             except Exception as e:
@@ -281,13 +371,23 @@ class WebSocketConnectionManager:
         return len(self._websocket_map)
     
     def get_stats(self) -> Dict[str, Any]:
-        """Get connection statistics."""
+        """
+        Get connection statistics.
+        
+        ``dropped_frames`` covers open connections only; ``dropped_frames_total``
+        also counts closed ones and never decreases (Prometheus counter).
+        """
+        open_dropped = sum(
+            conn.dropped_frames for conn in self._websocket_map.values()
+        )
         return {
             "total_connections": self.get_total_connections(),
             "sessions_with_connections": len(self._connections),
             "connections_per_session": {
                 sid: len(conns) for sid, conns in self._connections.items()
-            }
+            },
+            "dropped_frames": open_dropped,
+            "dropped_frames_total": self._closed_dropped_frames + open_dropped,
         }
     
     async def cleanup_session(self, session_id: str) -> int: